@@ -3,7 +3,7 @@ Admin configuration for the core application.
 """
 
 from django.contrib import admin
-from .models import ResearchSession, Paper, Note
+from .models import ResearchSession, Paper, Note, Document
 
 
 class NoteInline(admin.TabularInline):
@@ -42,6 +42,16 @@ class PaperAdmin(admin.ModelAdmin):
     inlines = [NoteInline]
 
 
+@admin.register(Document)
+class DocumentAdmin(admin.ModelAdmin):
+    """Admin for documents shared across sessions."""
+    list_display = ('canonical_id', 'title', 'total_pages', 'metadata_extracted', 'embedding_model', 'last_used_at')
+    list_filter = ('metadata_extracted', 'created_at')
+    search_fields = ('canonical_id', 'title', 'url')
+    readonly_fields = ('created_at', 'last_used_at')
+    exclude = ('text', 'page_offsets', 'page_embeddings')
+
+
 @admin.register(Note)
 class NoteAdmin(admin.ModelAdmin):
     """Admin for notes."""
@@ -0,0 +1,72 @@
+"""
+Bulk-load an arXiv metadata snapshot into the local SQLite FTS5 search index.
+
+Usage:
+    python manage.py load_arxiv_index arxiv-metadata-oai-snapshot.json
+    python manage.py load_arxiv_index snapshot.jsonl.gz --categories cs. stat.ML --limit 500000
+"""
+
+import gzip
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.services.arxiv_index_service import get_arxiv_index
+
+
+class Command(BaseCommand):
+    help = "Load an arXiv metadata snapshot (JSON lines: id, title, abstract, authors, dates) into the local search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('snapshot', help="Path of the JSON lines snapshot (.json, .jsonl or .gz)")
+        parser.add_argument('--categories', nargs='*', default=None,
+                            help="Only load papers with a category starting with one of these prefixes (e.g. cs. stat.ML)")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after this many records")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per transaction")
+
+    def handle(self, *args, **options):
+        snapshot = options['snapshot']
+        categories = tuple(options['categories'] or ())
+        limit = options['limit']
+
+        index = get_arxiv_index(create=True)
+        if index is None:
+            raise CommandError("Could not open the local arXiv index (check ARXIV_INDEX_PATH)")
+
+        opener = gzip.open if snapshot.endswith('.gz') else open
+        skipped = 0
+
+        def records(f):
+            nonlocal skipped
+            yielded = 0
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                if categories and not any(
+                    category.startswith(categories) for category in (record.get('categories') or '').split()
+                ):
+                    continue
+                yield record
+                yielded += 1
+                if limit and yielded >= limit:
+                    return
+
+        start = time.time()
+        try:
+            with opener(snapshot, 'rt', encoding='utf-8') as f:
+                written = index.load_records(records(f), batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f"Could not read snapshot {snapshot}: {e}")
+
+        self.stdout.write("Optimizing full-text index...")
+        index.optimize()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {written} papers in {time.time() - start:.1f}s "
+            f"({index.count()} total, {skipped} malformed lines skipped) into {index.path}"
+        ))
@@ -0,0 +1,59 @@
+"""
+Run a research worker that processes queued research sessions.
+
+Usage:
+    python manage.py run_research_worker
+    python manage.py run_research_worker --concurrency 4
+    python manage.py run_research_worker --once
+
+SIGTERM / SIGINT stop claiming new jobs and wait for the jobs in progress; a second
+signal exits immediately (the interrupted jobs are recovered once their lease expires).
+"""
+
+import signal
+import time
+from django.core.management.base import BaseCommand
+from core.services.job_queue_service import JobWorker
+from core.tasks import run_research_job
+
+
+class Command(BaseCommand):
+    help = "Process queued research sessions (run as a separate process from the web server)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Sessions processed at the same time (default: RESEARCH_WORKER_CONCURRENCY)")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds between polls of an empty queue (default: RESEARCH_WORKER_POLL_INTERVAL)")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is empty and the claimed jobs are done")
+
+    def handle(self, *args, **options):
+        worker = JobWorker(
+            run_research_job,
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval']
+        )
+
+        def shutdown(signum, frame):
+            if worker.stopping:
+                raise SystemExit(1)
+            self.stdout.write("Stopping: finishing the jobs in progress (signal again to exit now)")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        worker.start()
+        self.stdout.write(f"Research worker {worker.worker_id} running {worker.concurrency} job threads")
+
+        idle_since = None
+        while worker.is_alive():
+            time.sleep(1)
+            if options['once'] and not worker.stopping:
+                idle_since = (idle_since or time.monotonic()) if worker.is_idle() else None
+                # Idle for two poll intervals: nothing left that this worker could claim
+                if idle_since and time.monotonic() - idle_since > 2 * worker.poll_interval:
+                    worker.stop()
+
+        self.stdout.write(self.style.SUCCESS(f"Research worker stopped after {worker.jobs_done} jobs"))
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_note_relevance_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=100)),
+                ('task_type', models.CharField(blank=True, max_length=50)),
+                ('text_hash', models.CharField(max_length=64)),
+                ('dtype', models.CharField(choices=[('float16', 'float16'), ('int8', 'int8')], default='float16', max_length=10)),
+                ('dimensions', models.IntegerField()),
+                ('scale', models.FloatField(default=1.0)),
+                ('vector', models.BinaryField()),
+                ('nbytes', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='core_embedd_last_us_2fef86_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='embeddingcacheentry',
+            constraint=models.UniqueConstraint(fields=('provider', 'model', 'task_type', 'text_hash'), name='unique_embedding_cache_key'),
+        ),
+    ]
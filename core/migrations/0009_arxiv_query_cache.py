@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_llm_response_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArxivQueryCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('query', models.TextField()),
+                ('max_results', models.IntegerField()),
+                ('results', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='core_arxivq_expires_ba9246_idx')],
+            },
+        ),
+    ]
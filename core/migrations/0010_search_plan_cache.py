@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_arxiv_query_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPlanCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('plan_text', models.TextField()),
+                ('embedding_model', models.CharField(max_length=100)),
+                ('dimensions', models.IntegerField()),
+                ('embedding', models.BinaryField()),
+                ('search_structure', models.JSONField(default=dict)),
+                ('generated_questions', models.JSONField(default=list)),
+                ('explanation', models.TextField(blank=True)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='core_search_last_us_6d0573_idx'), models.Index(fields=['expires_at'], name='core_search_expires_edad22_idx')],
+            },
+        ),
+    ]
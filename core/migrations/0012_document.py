@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_research_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('canonical_id', models.CharField(max_length=500, unique=True)),
+                ('url', models.URLField(max_length=1000)),
+                ('text', models.TextField(blank=True)),
+                ('page_offsets', models.JSONField(default=list)),
+                ('pdf_metadata', models.JSONField(blank=True, default=dict)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('authors', models.JSONField(default=list)),
+                ('year', models.CharField(blank=True, max_length=20)),
+                ('summary', models.TextField(blank=True)),
+                ('harvard_reference', models.TextField(blank=True)),
+                ('metadata_extracted', models.BooleanField(default=False)),
+                ('total_pages', models.IntegerField(default=0)),
+                ('pdf_bytes', models.BigIntegerField(default=0)),
+                ('embedding_model', models.CharField(blank=True, max_length=100)),
+                ('embedding_dimensions', models.IntegerField(default=0)),
+                ('page_embeddings', models.BinaryField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='core_docume_last_us_657fec_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='paper',
+            name='document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='papers', to='core.document'),
+        ),
+    ]
@@ -47,10 +47,46 @@ class ResearchSession(models.Model):
             models.Index(fields=['created_at']),
         ]
 
+class Document(models.Model):
+    """A PDF parsed, described and embedded once, shared by the papers of every session that includes it."""
+    canonical_id = models.CharField(max_length=500, unique=True)  # "arxiv:<id>" or normalized PDF URL
+    url = models.URLField(max_length=1000)  # URL the document was first loaded from
+    text = models.TextField(blank=True)  # Joined text of all pages
+    page_offsets = models.JSONField(default=list)  # page_count + 1 boundaries into text
+    pdf_metadata = models.JSONField(default=dict, blank=True)  # Raw metadata embedded in the PDF
+    title = models.CharField(max_length=500, blank=True)
+    authors = models.JSONField(default=list)
+    year = models.CharField(max_length=20, blank=True)
+    summary = models.TextField(blank=True)
+    harvard_reference = models.TextField(blank=True)
+    metadata_extracted = models.BooleanField(default=False)  # Title, authors, year and summary came from the LLM
+    total_pages = models.IntegerField(default=0)
+    pdf_bytes = models.BigIntegerField(default=0)
+    embedding_model = models.CharField(max_length=100, blank=True)
+    embedding_dimensions = models.IntegerField(default=0)
+    page_embeddings = models.BinaryField(null=True, blank=True)  # float32 pages x dimensions, zero rows for empty pages
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Document {self.canonical_id} ({self.title[:50] or 'untitled'})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
 class Paper(models.Model):
     """A paper processed during a research session."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(ResearchSession, on_delete=models.CASCADE, related_name="papers")
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        related_name="papers",
+        null=True,
+        blank=True
+    )
     url = models.URLField()
     title = models.CharField(max_length=500, blank=True)
     authors = models.JSONField(default=list)
@@ -291,3 +327,137 @@ class Group(models.Model):
             'order': self.order,
             'createdAt': self.created_at.isoformat()
         }
+
+
+class EmbeddingCacheEntry(models.Model):
+    """A cached embedding vector stored in compact quantized form."""
+    provider = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    task_type = models.CharField(max_length=50, blank=True)
+    text_hash = models.CharField(max_length=64)  # sha256 of the embedded text
+    dtype = models.CharField(
+        max_length=10,
+        choices=[
+            ('float16', 'float16'),
+            ('int8', 'int8')
+        ],
+        default='float16'
+    )
+    dimensions = models.IntegerField()
+    scale = models.FloatField(default=1.0)  # Per-vector dequantization scale (int8 only)
+    vector = models.BinaryField()
+    nbytes = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Embedding {self.provider}/{self.model}/{self.task_type or '-'} {self.text_hash[:12]}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'model', 'task_type', 'text_hash'],
+                name='unique_embedding_cache_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
+
+class LLMResponseCacheEntry(models.Model):
+    """A cached LLM response keyed by model and a hash of the full prompt and schema."""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256 of model, call kind, prompt and schema
+    model = models.CharField(max_length=100)
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True)  # None = never expires
+
+    def __str__(self):
+        return f"LLM response {self.model} {self.key[:12]}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class ArxivQueryCacheEntry(models.Model):
+    """Cached ranked results of an arXiv search query."""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256 of normalized query and max_results
+    query = models.TextField()  # Normalized query string
+    max_results = models.IntegerField()
+    results = models.JSONField(default=list)  # Ranked list of paper metadata dicts
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"arXiv query '{self.query[:50]}' ({len(self.results)} results)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class SearchPlanCacheEntry(models.Model):
+    """A generated search plan (structured terms, questions, explanation) reusable by similar sessions."""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256 of the normalized plan text
+    plan_text = models.TextField()  # Normalized topics and info queries that were embedded
+    embedding_model = models.CharField(max_length=100)
+    dimensions = models.IntegerField()
+    embedding = models.BinaryField()  # float32 unit vector of plan_text
+    search_structure = models.JSONField(default=dict)
+    generated_questions = models.JSONField(default=list)  # LLM questions, without the session's own queries
+    explanation = models.TextField(blank=True)
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True)  # None = never expires
+
+    def __str__(self):
+        return f"Search plan '{self.plan_text[:50]}' ({self.hit_count} hits)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class ResearchJob(models.Model):
+    """A queued research session run, claimed and acknowledged by a worker process."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(ResearchSession, on_delete=models.CASCADE, related_name="jobs")
+    settings_data = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('queued', 'Queued'),
+            ('running', 'Running'),
+            ('done', 'Done'),
+            ('failed', 'Failed')
+        ],
+        default='queued'
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    worker_id = models.CharField(max_length=100, blank=True)  # Worker holding the lease while running
+    available_at = models.DateTimeField(default=timezone.now)  # Not claimed before this time (retry backoff)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)  # Renewed by the worker's heartbeat
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.id} for session {self.session_id} - {self.status} (attempt {self.attempts})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
@@ -0,0 +1,286 @@
+"""
+arXiv API access shared by all services.
+Every request to the arXiv API goes through one process-wide token-bucket limiter,
+so the API policy (one request every three seconds) holds across all sessions and threads.
+Search results are cached by normalized query so popular searches skip the API entirely,
+and paper metadata is fetched in batches of IDs per request through a shared cache.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
+import arxiv as arxiv_pkg
+import requests
+from django.conf import settings
+from django.utils import timezone
+from ..models import ArxivQueryCacheEntry
+from ..utils.rate_limiter import get_rate_limiter, TokenBucket
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def get_arxiv_limiter() -> TokenBucket:
+    """Return the process-wide arXiv API rate limiter."""
+    return get_rate_limiter(
+        'arxiv',
+        getattr(settings, 'ARXIV_REQUESTS_PER_SECOND', 1 / 3),
+        getattr(settings, 'ARXIV_REQUEST_BURST', 1)
+    )
+
+
+def wait_for_arxiv_slot() -> None:
+    """Block until the next arXiv API request is allowed."""
+    get_arxiv_limiter().acquire()
+
+
+class RateLimitedArxivClient(arxiv_pkg.Client):
+    """arxiv.Client whose page requests (including retries) are paced by the shared limiter."""
+
+    def __init__(self, page_size: int = 100, num_retries: int = 3):
+        # The shared limiter replaces the client's own per-instance delay
+        super().__init__(page_size=page_size, delay_seconds=0, num_retries=num_retries)
+
+    def _parse_feed(self, url, first_page=True, _try_index=0):
+        wait_for_arxiv_slot()
+        debug_print(f"arXiv API request (try {_try_index + 1}): {url}")
+        return super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
+
+
+def arxiv_results(search: arxiv_pkg.Search):
+    """
+    Iterate over the results of an arXiv search through the rate-limited client.
+
+    Results are fetched in as few pages as possible (one request for up to 2000 results).
+    """
+    page_size = min(search.max_results or 100, 2000)
+    return RateLimitedArxivClient(page_size=page_size).results(search)
+
+
+# ---------------------------------------------------------------------------
+# Search result cache
+# ---------------------------------------------------------------------------
+
+# Purge expired cache entries after this many stored searches
+PURGE_CHECK_INTERVAL = 100
+
+_stores_since_purge = 0
+_purge_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Normalize an arXiv query so trivially different spellings share a cache entry."""
+    query = re.sub(r'\s+', ' ', query.strip()).lower()
+    # 'ti: "x"' and 'ti:"x"' are the same search
+    return re.sub(r'\s*:\s*', ':', query)
+
+
+def _search_cache_key(query: str, max_results: int) -> str:
+    return hashlib.sha256(f"{normalize_query(query)}|{max_results}".encode('utf-8')).hexdigest()
+
+
+def get_cached_search(query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Return the cached ranked results of a search, or None on a miss.
+
+    Args:
+        query: arXiv query string
+        max_results: Maximum number of results the search asked for
+
+    Returns:
+        Ranked list of paper metadata dicts (id, url, title, abstract, authors, date)
+    """
+    if not getattr(settings, 'ARXIV_QUERY_CACHE_ENABLED', True):
+        return None
+    try:
+        results = ArxivQueryCacheEntry.objects.filter(
+            key=_search_cache_key(query, max_results),
+            expires_at__gt=timezone.now()
+        ).values_list('results', flat=True).first()
+    except Exception as e:
+        logger.error(f"Error reading arXiv query cache: {e}")
+        return None
+
+    if results is not None:
+        debug_print(f"arXiv query cache hit: {query} ({len(results)} results)")
+    return results
+
+
+def store_search(query: str, max_results: int, results: List[Dict[str, Any]]) -> None:
+    """
+    Cache the ranked results of a search for ARXIV_QUERY_CACHE_TTL seconds.
+
+    Args:
+        query: arXiv query string
+        max_results: Maximum number of results the search asked for
+        results: Ranked list of paper metadata dicts
+    """
+    global _stores_since_purge
+    if not getattr(settings, 'ARXIV_QUERY_CACHE_ENABLED', True) or not results:
+        return
+
+    ttl = getattr(settings, 'ARXIV_QUERY_CACHE_TTL', 24 * 60 * 60)
+    try:
+        ArxivQueryCacheEntry.objects.update_or_create(
+            key=_search_cache_key(query, max_results),
+            defaults={
+                'query': normalize_query(query),
+                'max_results': max_results,
+                'results': results,
+                'expires_at': timezone.now() + timedelta(seconds=ttl)
+            }
+        )
+
+        with _purge_lock:
+            _stores_since_purge += 1
+            if _stores_since_purge < PURGE_CHECK_INTERVAL:
+                return
+            _stores_since_purge = 0
+        deleted, _ = ArxivQueryCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        debug_print(f"Purged {deleted} expired arXiv query cache entries")
+    except Exception as e:
+        logger.error(f"Error writing arXiv query cache: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Batched metadata lookup by arXiv ID
+# ---------------------------------------------------------------------------
+
+ARXIV_QUERY_URL = "https://export.arxiv.org/api/query"
+ATOM_NAMESPACE = {'atom': 'http://www.w3.org/2005/Atom', 'arxiv': 'http://arxiv.org/schemas/atom'}
+# New-style (2101.00001) and old-style (hep-th/9901001) identifiers; one malformed ID fails a whole id_list request
+ARXIV_ID_PATTERN = re.compile(r'^(\d{4}\.\d{4,5}|[a-z\-]+(\.[A-Z]{2})?/\d{7})$')
+
+_metadata_cache: "OrderedDict[str, tuple]" = OrderedDict()  # arXiv ID -> (stored_at, metadata)
+_metadata_cache_lock = threading.Lock()
+_http_session = requests.Session()
+
+
+def strip_arxiv_version(arxiv_id: str) -> str:
+    """Remove a trailing version suffix (e.g. 1706.03762v7 -> 1706.03762)."""
+    return re.sub(r'v\d+$', '', arxiv_id.strip())
+
+
+def parse_arxiv_feed(xml_text: str) -> List[Dict[str, Any]]:
+    """
+    Parse an arXiv API Atom feed into paper metadata dicts.
+
+    Args:
+        xml_text: Atom XML returned by the arXiv query API
+
+    Returns:
+        List of dicts with id (without version), url, title, abstract, authors and date
+    """
+    root = ET.fromstring(xml_text)
+    papers = []
+    for entry in root.findall('atom:entry', ATOM_NAMESPACE):
+        entry_id = entry.findtext('atom:id', default='', namespaces=ATOM_NAMESPACE)
+        # Invalid IDs come back as error entries
+        if not entry_id or '/api/errors' in entry_id:
+            continue
+
+        arxiv_id = strip_arxiv_version(entry_id.split('/abs/')[-1])
+        title = entry.findtext('atom:title', default='', namespaces=ATOM_NAMESPACE)
+        summary = entry.findtext('atom:summary', default='', namespaces=ATOM_NAMESPACE)
+        published = entry.findtext('atom:published', default='', namespaces=ATOM_NAMESPACE)
+        authors = [
+            name.strip()
+            for name in (author.findtext('atom:name', default='', namespaces=ATOM_NAMESPACE)
+                         for author in entry.findall('atom:author', ATOM_NAMESPACE))
+            if name and name.strip()
+        ]
+        papers.append({
+            'id': arxiv_id,
+            'url': f"https://arxiv.org/pdf/{arxiv_id}",
+            'title': re.sub(r'\s+', ' ', title).strip(),
+            'abstract': re.sub(r'\s+', ' ', summary).strip(),
+            'authors': authors,
+            'date': published[:10]
+        })
+    return papers
+
+
+def _get_cached_metadata(arxiv_id: str) -> Optional[Dict[str, Any]]:
+    """Return cached metadata for an ID if present and not expired. Caller must hold the lock."""
+    cached = _metadata_cache.get(arxiv_id)
+    if cached is None:
+        return None
+    stored_at, metadata = cached
+    if time.time() - stored_at > getattr(settings, 'ARXIV_METADATA_CACHE_TTL', 24 * 60 * 60):
+        del _metadata_cache[arxiv_id]
+        return None
+    _metadata_cache.move_to_end(arxiv_id)
+    return metadata
+
+
+def remember_metadata(papers: List[Dict[str, Any]]) -> None:
+    """Add paper metadata dicts (e.g. from search results) to the shared metadata cache."""
+    max_size = getattr(settings, 'ARXIV_METADATA_CACHE_SIZE', 5000)
+    now = time.time()
+    with _metadata_cache_lock:
+        for paper in papers:
+            if paper.get('id'):
+                _metadata_cache[strip_arxiv_version(paper['id'])] = (now, paper)
+                _metadata_cache.move_to_end(strip_arxiv_version(paper['id']))
+        while len(_metadata_cache) > max_size:
+            _metadata_cache.popitem(last=False)
+
+
+def fetch_arxiv_metadata(arxiv_ids: List[str], batch_size: int = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch metadata for many arXiv IDs with one id_list request per batch.
+
+    IDs already in the shared metadata cache are not requested again. Requests are
+    paced by the shared arXiv rate limiter; a failed batch is logged and skipped.
+
+    Args:
+        arxiv_ids: arXiv IDs (with or without version suffix)
+        batch_size: IDs per request (defaults to ARXIV_ID_BATCH_SIZE)
+
+    Returns:
+        Dictionary mapping version-less arXiv ID -> metadata dict
+    """
+    batch_size = batch_size or getattr(settings, 'ARXIV_ID_BATCH_SIZE', 100)
+    ids = list(dict.fromkeys(strip_arxiv_version(arxiv_id) for arxiv_id in arxiv_ids if arxiv_id))
+    invalid = [arxiv_id for arxiv_id in ids if not ARXIV_ID_PATTERN.match(arxiv_id)]
+    if invalid:
+        debug_print(f"Skipping {len(invalid)} malformed arXiv IDs: {invalid[:5]}")
+        ids = [arxiv_id for arxiv_id in ids if ARXIV_ID_PATTERN.match(arxiv_id)]
+
+    found = {}
+    with _metadata_cache_lock:
+        for arxiv_id in ids:
+            metadata = _get_cached_metadata(arxiv_id)
+            if metadata is not None:
+                found[arxiv_id] = metadata
+    missing = [arxiv_id for arxiv_id in ids if arxiv_id not in found]
+    debug_print(f"arXiv metadata: {len(found)} cached, fetching {len(missing)} in batches of {batch_size}")
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        try:
+            wait_for_arxiv_slot()
+            response = _http_session.get(
+                ARXIV_QUERY_URL,
+                params={'id_list': ",".join(batch), 'max_results': len(batch)},
+                timeout=30
+            )
+            response.raise_for_status()
+            papers = parse_arxiv_feed(response.text)
+        except Exception as e:
+            logger.error(f"Error fetching arXiv metadata for {len(batch)} IDs: {e}")
+            continue
+
+        remember_metadata(papers)
+        for paper in papers:
+            found[paper['id']] = paper
+        debug_print(f"Fetched metadata for {len(papers)}/{len(batch)} arXiv IDs in one request")
+
+    return found
@@ -0,0 +1,313 @@
+"""
+Local arXiv metadata index backed by SQLite FTS5.
+A bulk-loaded arXiv metadata snapshot (see the load_arxiv_index management command)
+can answer the same ti:/abs:/au:/cat:/all: queries that we send to the arXiv API,
+in milliseconds, offline and without touching the API rate limit.
+"""
+
+import email.utils
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterable, Optional
+from django.conf import settings
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# arXiv field prefixes mapped to FTS5 column filters
+FIELD_COLUMNS = {
+    'ti': 'title',
+    'abs': 'abstract',
+    'au': 'authors',
+    'cat': 'categories',
+    'all': '{title abstract authors}',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY,
+    arxiv_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    abstract TEXT NOT NULL DEFAULT '',
+    authors TEXT NOT NULL DEFAULT '',
+    authors_json TEXT NOT NULL DEFAULT '[]',
+    categories TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT ''
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, authors, categories,
+    content='papers', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, abstract, authors, categories)
+    VALUES (new.rowid, new.title, new.abstract, new.authors, new.categories);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract, authors, categories)
+    VALUES ('delete', old.rowid, old.title, old.abstract, old.authors, old.categories);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract, authors, categories)
+    VALUES ('delete', old.rowid, old.title, old.abstract, old.authors, old.categories);
+    INSERT INTO papers_fts(rowid, title, abstract, authors, categories)
+    VALUES (new.rowid, new.title, new.abstract, new.authors, new.categories);
+END;
+"""
+
+_TOKEN_PATTERN = re.compile(
+    r'\(|\)'
+    r'|\b(?:ANDNOT|AND|OR)\b'
+    r'|(?P<field>[a-z_]+):\s*'
+    r'|"(?P<phrase>[^"]*)"'
+    r'|(?P<word>[^\s()"]+)'
+)
+
+
+def _fts_phrase(text: str) -> str:
+    """Quote text as an FTS5 string so punctuation is never parsed as syntax."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def translate_query(query: str) -> str:
+    """
+    Translate an arXiv API query into an FTS5 MATCH expression.
+
+    Field prefixes apply to the phrase or words that follow them, up to the next
+    operator, parenthesis or field; AND/OR/ANDNOT and parentheses are kept.
+
+    Args:
+        query: arXiv query, e.g. '(all:"deep learning" OR ti:transformers) ANDNOT cat:math'
+
+    Returns:
+        FTS5 expression, or "" if the query has no searchable terms
+    """
+    items = []
+    field = 'all'
+    for match in _TOKEN_PATTERN.finditer(query):
+        token = match.group(0)
+        if match.group('field') is not None:
+            field = match.group('field').lower()
+            continue
+
+        if token in ('(', ')'):
+            items.append(token)
+            field = 'all'
+        elif token in ('AND', 'OR', 'ANDNOT'):
+            items.append('NOT' if token == 'ANDNOT' else token)
+            field = 'all'
+        else:
+            text = match.group('phrase') if match.group('phrase') is not None else match.group('word')
+            text = text.strip()
+            if not text:
+                continue
+            column = FIELD_COLUMNS.get(field, FIELD_COLUMNS['all'])
+            items.append(f"{column} : {_fts_phrase(text)}")
+
+    # Drop operators that have no operand on one side
+    cleaned = []
+    for item in items:
+        is_operator = item in ('AND', 'OR', 'NOT')
+        if is_operator and (not cleaned or cleaned[-1] in ('AND', 'OR', 'NOT', '(')):
+            continue
+        if item == ')' and cleaned and cleaned[-1] in ('AND', 'OR', 'NOT'):
+            cleaned.pop()
+        cleaned.append(item)
+    while cleaned and cleaned[-1] in ('AND', 'OR', 'NOT', '('):
+        cleaned.pop()
+
+    return " ".join(cleaned)
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def parse_snapshot_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert one arXiv metadata snapshot record into an index row.
+
+    Accepts the public arXiv metadata snapshot format (id, title, abstract,
+    authors or authors_parsed, categories, versions, update_date) as well as
+    our own metadata dicts (id, title, abstract, authors list, date).
+
+    Returns:
+        Row dict, or None if the record has no id
+    """
+    arxiv_id = str(record.get('id') or '').strip()
+    if not arxiv_id:
+        return None
+    arxiv_id = re.sub(r'v\d+$', '', arxiv_id)
+
+    authors = record.get('authors')
+    if record.get('authors_parsed'):
+        authors = [" ".join(part for part in (parsed[1], parsed[0], *parsed[2:]) if part).strip()
+                   for parsed in record['authors_parsed']]
+    elif isinstance(authors, str):
+        authors = [name.strip() for name in re.split(r',|\band\b', _normalize_text(authors)) if name.strip()]
+    authors = authors or []
+
+    # Prefer the first version's date (matches the API's "published" date)
+    date = record.get('date') or record.get('published') or ''
+    versions = record.get('versions') or []
+    if not date and versions:
+        try:
+            date = email.utils.parsedate_to_datetime(versions[0]['created']).strftime('%Y-%m-%d')
+        except Exception:
+            date = ''
+    if not date:
+        date = record.get('update_date') or ''
+
+    return {
+        'arxiv_id': arxiv_id,
+        'title': _normalize_text(record.get('title')),
+        'abstract': _normalize_text(record.get('abstract') or record.get('summary')),
+        'authors': ", ".join(authors),
+        'authors_json': json.dumps(authors),
+        'categories': record.get('categories') or '',
+        'date': str(date)[:10]
+    }
+
+
+class ArxivIndex:
+    """SQLite FTS5 index of arXiv metadata. Safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection to the index."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def count(self) -> int:
+        """Return the number of indexed papers."""
+        return self._connect().execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def load_records(self, records: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+        """
+        Insert or update snapshot records in batches.
+
+        Args:
+            records: Iterable of snapshot records (see parse_snapshot_record)
+            batch_size: Rows per transaction
+
+        Returns:
+            Number of rows written
+        """
+        conn = self._connect()
+        sql = """
+            INSERT INTO papers (arxiv_id, title, abstract, authors, authors_json, categories, date)
+            VALUES (:arxiv_id, :title, :abstract, :authors, :authors_json, :categories, :date)
+            ON CONFLICT(arxiv_id) DO UPDATE SET
+                title=excluded.title, abstract=excluded.abstract, authors=excluded.authors,
+                authors_json=excluded.authors_json, categories=excluded.categories, date=excluded.date
+        """
+        written = 0
+        batch = []
+        for record in records:
+            row = parse_snapshot_record(record)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany(sql, batch)
+                written += len(batch)
+                batch = []
+                debug_print(f"Indexed {written} arXiv records")
+        if batch:
+            with conn:
+                conn.executemany(sql, batch)
+            written += len(batch)
+        return written
+
+    def optimize(self) -> None:
+        """Merge FTS5 index segments after a bulk load."""
+        with self._connect() as conn:
+            conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('optimize')")
+
+    def search(self, query: str, max_results: int = 50) -> List[Dict[str, Any]]:
+        """
+        Search the index with an arXiv API query.
+
+        Args:
+            query: arXiv query string (ti:/abs:/au:/cat:/all: fields, AND/OR/ANDNOT)
+            max_results: Maximum number of results
+
+        Returns:
+            Ranked list of paper metadata dicts (id, url, title, abstract, authors, date)
+        """
+        expression = translate_query(query)
+        if not expression:
+            return []
+
+        sql = """
+            SELECT p.arxiv_id, p.title, p.abstract, p.authors_json, p.date
+            FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid
+            WHERE papers_fts MATCH ?
+            ORDER BY bm25(papers_fts, 2.0, 1.0, 0.5, 0.5)
+            LIMIT ?
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, (expression, max_results)).fetchall()
+        except sqlite3.OperationalError as e:
+            # Unbalanced or unusual syntax - fall back to matching any of the terms
+            logger.warning(f"FTS query '{expression}' failed ({e}), retrying as OR query")
+            terms = [_fts_phrase(term) for term in re.findall(r'\w+', query) if term not in ('AND', 'OR', 'ANDNOT')]
+            if not terms:
+                return []
+            rows = conn.execute(sql, (" OR ".join(terms), max_results)).fetchall()
+
+        return [
+            {
+                'id': arxiv_id,
+                'url': f"https://arxiv.org/pdf/{arxiv_id}",
+                'title': title,
+                'abstract': abstract,
+                'authors': json.loads(authors_json),
+                'date': date
+            }
+            for arxiv_id, title, abstract, authors_json, date in rows
+        ]
+
+
+_arxiv_index = None
+_arxiv_index_lock = threading.Lock()
+
+
+def get_arxiv_index(create: bool = False) -> Optional[ArxivIndex]:
+    """
+    Return the process-wide local arXiv index.
+
+    Args:
+        create: Create the index file if it does not exist yet (used when loading)
+
+    Returns:
+        ArxivIndex, or None if no index has been built
+    """
+    global _arxiv_index
+    path = getattr(settings, 'ARXIV_INDEX_PATH', os.path.join(settings.BASE_DIR, 'arxiv_index.sqlite3'))
+    if _arxiv_index is None:
+        if not create and not os.path.exists(path):
+            return None
+        with _arxiv_index_lock:
+            if _arxiv_index is None:
+                try:
+                    _arxiv_index = ArxivIndex(path)
+                except Exception as e:
+                    logger.error(f"Could not open local arXiv index {path}: {e}")
+                    return None
+    return _arxiv_index
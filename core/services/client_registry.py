@@ -0,0 +1,96 @@
+"""
+Client registry holding long-lived API clients shared by all services.
+Clients are created once per process, keyed by provider, model and task type,
+so HTTP keep-alive connection pools and TLS sessions are reused across calls
+instead of being rebuilt on every embedding or LLM request.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Any, Callable, Tuple
+from openai import OpenAI, AsyncOpenAI
+from django.conf import settings
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_or_create(key: Tuple, factory: Callable[[], Any]) -> Any:
+    """Return the client registered under key, creating it on first use."""
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+                debug_print(f"Registered client {key}")
+    return client
+
+
+def get_openai_client() -> OpenAI:
+    """
+    Return the shared OpenAI client.
+
+    The client is thread-safe and its HTTP client keeps a pool of keep-alive
+    connections, so concurrent worker threads reuse open TLS connections.
+    """
+    def factory():
+        api_key = settings.OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY", "")
+        return OpenAI(api_key=api_key)
+
+    return _get_or_create(('openai',), factory)
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client.
+
+    Its connection pool belongs to the event loop it is first used on, so it must
+    only be used from the shared background loop (see core.utils.async_runtime).
+    """
+    def factory():
+        api_key = settings.OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY", "")
+        return AsyncOpenAI(api_key=api_key)
+
+    return _get_or_create(('openai-async',), factory)
+
+
+def get_google_embedder(model: str, task_type: str):
+    """
+    Return the shared Google Gemini embedder for a model and task type.
+
+    Callers must have configured GOOGLE_API_KEY (see setup_google_api_key) and
+    checked that langchain_google_genai is installed.
+
+    Args:
+        model: Embedding model name, e.g. "models/gemini-embedding-001"
+        task_type: Gemini task type, e.g. "RETRIEVAL_DOCUMENT" or "RETRIEVAL_QUERY"
+    """
+    def factory():
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model=model, task_type=task_type)
+
+    return _get_or_create(('google-embeddings', model, task_type), factory)
+
+
+def get_agent(model: str):
+    """
+    Return the shared Pydantic-AI agent for a model.
+
+    Agents hold no per-run state, so one instance can serve concurrent runs.
+
+    Args:
+        model: Pydantic-AI model identifier, e.g. "openai:gpt-4o-mini"
+    """
+    def factory():
+        from pydantic_ai import Agent
+        return Agent(model)
+
+    return _get_or_create(('agent', model), factory)
+
@@ -0,0 +1,251 @@
+"""
+Cross-session document store.
+A paper's PDF is downloaded, parsed, described by the metadata LLM and embedded page by
+page once; the results are stored in a Document keyed by the paper's canonical
+identifier (the arXiv id, or the normalized PDF URL). Every later session that includes
+the same paper loads its page text, metadata, Harvard reference and page embeddings from
+the Document, so only the query-specific work (page scoring, extraction, validation)
+runs per session. Session papers reference their Document.
+"""
+
+import logging
+import re
+import threading
+from array import array
+from typing import Any, Dict, Optional
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+from ..models import Document
+from .page_text_service import PageTextStore
+from .pdf_cache_service import normalize_cache_key
+from .pdf_parse_service import ParsedPDF
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'embedding_hits': 0, 'embedding_stores': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def store_enabled() -> bool:
+    """Return True if documents should be served from and stored in the document store."""
+    return getattr(settings, 'DOCUMENT_STORE_ENABLED', True)
+
+
+def canonical_document_id(url: str) -> str:
+    """
+    Return the identifier shared by all links to the same document.
+
+    arXiv abstract and PDF links (with or without .pdf) map to "arxiv:<id>"; an explicit
+    version stays part of the id since versions differ in content. Other URLs map to
+    their normalized form.
+    """
+    key = normalize_cache_key(url)
+    match = re.match(r'^https://arxiv\.org/pdf/(.+)$', key)
+    return f"arxiv:{match.group(1)}" if match else key
+
+
+def find_document(url: str) -> Optional[Document]:
+    """
+    Look up the stored document of a PDF URL and record the use.
+
+    Args:
+        url: Normalized PDF URL
+
+    Returns:
+        The Document without its page embeddings (see load_page_embeddings), or None
+    """
+    if not store_enabled():
+        return None
+    try:
+        document = Document.objects.defer('page_embeddings').filter(canonical_id=canonical_document_id(url)).first()
+        if document is not None:
+            Document.objects.filter(id=document.id).update(last_used_at=timezone.now())
+    except Exception as e:
+        logger.error(f"Error reading document store: {e}")
+        document = None
+
+    _count('hits' if document is not None else 'misses')
+    debug_print(f"Document store {'hit' if document is not None else 'miss'}: {url}")
+    return document
+
+
+def document_exists(url: str) -> bool:
+    """Return True if a PDF URL already has a stored document (no use is recorded)."""
+    if not store_enabled():
+        return False
+    try:
+        return Document.objects.filter(canonical_id=canonical_document_id(url)).exists()
+    except Exception as e:
+        logger.error(f"Error reading document store: {e}")
+        return False
+
+
+def document_page_store(document: Document) -> PageTextStore:
+    """Return a page text store over a stored document's text."""
+    parsed = ParsedPDF(
+        text=document.text,
+        offsets=array('q', document.page_offsets),
+        metadata=document.pdf_metadata
+    )
+    return PageTextStore.from_parsed(parsed)
+
+
+def document_metadata(document: Document) -> Optional[Dict[str, Any]]:
+    """
+    Return a stored document's enhanced metadata in the form extract_enhanced_metadata_with_llm_async returns.
+
+    Returns:
+        The metadata, or None if the LLM extraction did not succeed when the document was stored
+    """
+    if not document.metadata_extracted:
+        return None
+    return {
+        'title': document.title,
+        'authors': document.authors,
+        'year': document.year,
+        'summary': document.summary,
+        'harvard_reference': document.harvard_reference,
+        'basic_metadata': document.pdf_metadata,
+        'total_pages': document.total_pages,
+        'llm_extracted': True
+    }
+
+
+def _metadata_fields(enhanced_metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Document fields holding an enhanced metadata dict."""
+    return {
+        'title': str(enhanced_metadata.get('title') or '')[:500],
+        'authors': enhanced_metadata.get('authors') or [],
+        'year': str(enhanced_metadata.get('year') or '')[:20],
+        'summary': enhanced_metadata.get('summary') or '',
+        'harvard_reference': enhanced_metadata.get('harvard_reference') or '',
+        'metadata_extracted': bool(enhanced_metadata.get('llm_extracted'))
+    }
+
+
+def save_document(url: str, page_store: PageTextStore, enhanced_metadata: Dict[str, Any], pdf_bytes: int = 0) -> Optional[Document]:
+    """
+    Store a freshly loaded document.
+
+    Metadata is only marked as reusable when it came from the LLM; otherwise later
+    sessions run the metadata extraction again on the stored text.
+
+    Args:
+        url: Normalized PDF URL
+        page_store: Page text of the document
+        enhanced_metadata: Result of extract_enhanced_metadata_with_llm_async
+        pdf_bytes: Size of the downloaded PDF
+
+    Returns:
+        The stored Document (the existing one if another worker stored it first), or None on error
+    """
+    if not store_enabled():
+        return None
+    canonical_id = canonical_document_id(url)
+    try:
+        parsed = page_store.to_parsed()
+        defaults = {
+            'url': url,
+            'text': parsed.text,
+            'page_offsets': list(parsed.offsets),
+            'pdf_metadata': {key: str(value) for key, value in parsed.metadata.items()},
+            'total_pages': parsed.page_count,
+            'pdf_bytes': pdf_bytes or 0,
+            'last_used_at': timezone.now(),
+            **_metadata_fields(enhanced_metadata)
+        }
+        try:
+            document, created = Document.objects.get_or_create(canonical_id=canonical_id, defaults=defaults)
+        except IntegrityError:
+            # Another worker stored the same document concurrently
+            document, created = Document.objects.get(canonical_id=canonical_id), False
+    except Exception as e:
+        logger.error(f"Error writing document store: {e}")
+        return None
+
+    if created:
+        _count('stores')
+        debug_print(f"Stored document {canonical_id} ({parsed.page_count} pages)")
+    elif defaults['metadata_extracted'] and not document.metadata_extracted:
+        save_document_metadata(document.id, enhanced_metadata)
+    return document
+
+
+def save_document_metadata(document_id: int, enhanced_metadata: Dict[str, Any]) -> None:
+    """Store LLM-extracted metadata of a document whose earlier extraction failed."""
+    if not enhanced_metadata.get('llm_extracted'):
+        return
+    try:
+        Document.objects.filter(id=document_id).update(**_metadata_fields(enhanced_metadata))
+    except Exception as e:
+        logger.error(f"Error writing document metadata: {e}")
+
+
+def load_page_embeddings(document_id: int, model: str) -> Optional[np.ndarray]:
+    """
+    Return the stored page embeddings of a document.
+
+    Args:
+        document_id: Stored document
+        model: Embedding model the vectors must come from
+
+    Returns:
+        float32 array of shape (pages, dimensions) with zero rows for empty pages, or
+        None if the document has no page embeddings from that model
+    """
+    try:
+        row = (
+            Document.objects
+            .filter(id=document_id, embedding_model=model)
+            .values_list('total_pages', 'embedding_dimensions', 'page_embeddings')
+            .first()
+        )
+    except Exception as e:
+        logger.error(f"Error reading document page embeddings: {e}")
+        return None
+    if row is None or not row[2]:
+        return None
+    pages, dimensions, data = row
+    _count('embedding_hits')
+    return np.frombuffer(bytes(data), dtype=np.float32).reshape(pages, dimensions)
+
+
+def save_page_embeddings(document_id: int, model: str, embeddings: np.ndarray) -> None:
+    """
+    Store the page embeddings of a document.
+
+    Args:
+        document_id: Stored document
+        model: Embedding model of the vectors
+        embeddings: Array of shape (pages, dimensions), zero rows for empty pages
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    try:
+        Document.objects.filter(id=document_id, total_pages=embeddings.shape[0]).update(
+            embedding_model=model,
+            embedding_dimensions=embeddings.shape[1],
+            page_embeddings=embeddings.tobytes()
+        )
+    except Exception as e:
+        logger.error(f"Error writing document page embeddings: {e}")
+        return
+    _count('embedding_stores')
+    debug_print(f"Stored {embeddings.shape[0]} page embeddings of document {document_id}")
+
+
+def get_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of this process and the current hit rate."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,260 @@
+"""
+Embedding cache service for reusing embeddings across research sessions.
+Vectors are keyed by (provider, model, task_type, sha256(text)) and stored
+quantized (float16, or int8 with a per-vector scale) in a binary column,
+with bulk lookups for batches and least-recently-used eviction by byte budget.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Awaitable, List, Dict, Callable, Tuple
+import numpy as np
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from ..models import EmbeddingCacheEntry
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Check the byte budget after this many newly stored vectors
+EVICTION_CHECK_INTERVAL = 500
+
+_puts_since_eviction_check = 0
+_eviction_lock = threading.Lock()
+
+
+def text_hash(text: str) -> str:
+    """Return the sha256 hex digest used as the cache key of a text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def quantize(vector: List[float], dtype: str = 'float16') -> Tuple[bytes, float]:
+    """
+    Pack an embedding vector into compact bytes.
+
+    Args:
+        vector: Embedding vector
+        dtype: 'float16', or 'int8' (symmetric quantization with a per-vector scale)
+
+    Returns:
+        Tuple of (packed bytes, scale)
+    """
+    array = np.asarray(vector, dtype=np.float32)
+    if dtype == 'int8':
+        max_abs = float(np.abs(array).max()) if array.size else 0.0
+        scale = max_abs / 127.0 if max_abs else 1.0
+        return np.round(array / scale).astype(np.int8).tobytes(), scale
+    return array.astype(np.float16).tobytes(), 1.0
+
+
+def dequantize(data: bytes, dtype: str, scale: float) -> List[float]:
+    """Unpack bytes produced by quantize back into a float vector."""
+    if dtype == 'int8':
+        return (np.frombuffer(data, dtype=np.int8).astype(np.float32) * scale).tolist()
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32).tolist()
+
+
+def cache_enabled() -> bool:
+    """Return True if embeddings should be served from and stored in the cache."""
+    return getattr(settings, 'EMBEDDING_CACHE_ENABLED', True)
+
+
+def get_many(provider: str, model: str, task_type: str, texts: List[str]) -> Dict[str, List[float]]:
+    """
+    Look up cached embeddings for a batch of texts in a single query.
+
+    Args:
+        provider: Embedding provider, e.g. "openai" or "google"
+        model: Embedding model name
+        task_type: Provider task type ("" if the provider has none)
+        texts: Texts to look up
+
+    Returns:
+        Dictionary mapping text -> embedding for every cache hit
+    """
+    hashes = {text_hash(text): text for text in texts}
+    if not hashes:
+        return {}
+
+    entries = list(EmbeddingCacheEntry.objects.filter(
+        provider=provider,
+        model=model,
+        task_type=task_type,
+        text_hash__in=list(hashes)
+    ).values_list('id', 'text_hash', 'dtype', 'scale', 'vector'))
+
+    if entries:
+        # Touch hits in one statement so eviction keeps hot vectors
+        EmbeddingCacheEntry.objects.filter(
+            id__in=[entry[0] for entry in entries]
+        ).update(last_used_at=timezone.now())
+
+    return {
+        hashes[hash_]: dequantize(bytes(vector), dtype, scale)
+        for _, hash_, dtype, scale, vector in entries
+    }
+
+
+def put_many(provider: str, model: str, task_type: str, items: Dict[str, List[float]]) -> None:
+    """
+    Store a batch of embeddings in a single bulk insert.
+
+    Args:
+        provider: Embedding provider
+        model: Embedding model name
+        task_type: Provider task type ("" if the provider has none)
+        items: Dictionary mapping text -> embedding
+    """
+    global _puts_since_eviction_check
+    if not items:
+        return
+
+    dtype = getattr(settings, 'EMBEDDING_CACHE_DTYPE', 'float16')
+    now = timezone.now()
+    entries = []
+    for text, vector in items.items():
+        data, scale = quantize(vector, dtype)
+        entries.append(EmbeddingCacheEntry(
+            provider=provider,
+            model=model,
+            task_type=task_type,
+            text_hash=text_hash(text),
+            dtype=dtype,
+            dimensions=len(vector),
+            scale=scale,
+            vector=data,
+            nbytes=len(data),
+            last_used_at=now
+        ))
+
+    # Another worker may have stored the same text meanwhile - ignore duplicates
+    EmbeddingCacheEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    with _eviction_lock:
+        _puts_since_eviction_check += len(entries)
+        if _puts_since_eviction_check < EVICTION_CHECK_INTERVAL:
+            return
+        _puts_since_eviction_check = 0
+    evict()
+
+
+def evict(max_bytes: int = None) -> int:
+    """
+    Delete least recently used vectors until the cache fits its byte budget.
+
+    Args:
+        max_bytes: Byte budget (defaults to EMBEDDING_CACHE_MAX_BYTES)
+
+    Returns:
+        Number of evicted entries
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'EMBEDDING_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+    total = EmbeddingCacheEntry.objects.aggregate(total=Sum('nbytes'))['total'] or 0
+    if total <= max_bytes:
+        return 0
+
+    # Free a little extra so eviction does not run on every check
+    target = int(max_bytes * 0.9)
+    to_delete = []
+    for entry_id, nbytes in EmbeddingCacheEntry.objects.order_by('last_used_at').values_list('id', 'nbytes').iterator():
+        if total <= target:
+            break
+        to_delete.append(entry_id)
+        total -= nbytes
+
+    for start in range(0, len(to_delete), 1000):
+        EmbeddingCacheEntry.objects.filter(id__in=to_delete[start:start + 1000]).delete()
+
+    debug_print(f"Evicted {len(to_delete)} cached embeddings")
+    return len(to_delete)
+
+
+def embed_with_cache(
+    provider: str,
+    model: str,
+    task_type: str,
+    texts: List[str],
+    embed_fn: Callable[[List[str]], List[List[float]]]
+) -> List[List[float]]:
+    """
+    Embed texts, serving repeats from the cache and calling embed_fn only for misses.
+
+    Cache errors never fail the embedding call; the cache is simply bypassed.
+
+    Args:
+        provider: Embedding provider
+        model: Embedding model name
+        task_type: Provider task type ("" if the provider has none)
+        texts: Texts to embed
+        embed_fn: Function embedding a list of texts in one request
+
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    if not cache_enabled() or not texts:
+        return embed_fn(texts)
+
+    try:
+        cached = get_many(provider, model, task_type, texts)
+    except Exception as e:
+        logger.error(f"Error reading embedding cache: {e}")
+        cached = {}
+
+    # Each distinct missing text is embedded once
+    missing = list(dict.fromkeys(text for text in texts if text not in cached))
+    debug_print(f"Embedding cache: {len(cached)} hits, {len(missing)} misses ({provider}/{model})")
+
+    if missing:
+        fresh = dict(zip(missing, embed_fn(missing)))
+        try:
+            put_many(provider, model, task_type, fresh)
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {e}")
+        cached.update(fresh)
+
+    return [cached[text] for text in texts]
+
+
+async def embed_with_cache_async(
+    provider: str,
+    model: str,
+    task_type: str,
+    texts: List[str],
+    embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]]
+) -> List[List[float]]:
+    """
+    embed_with_cache for code running on an event loop.
+
+    Cache reads and writes cross into the ORM through database_sync_to_async; embed_fn is a
+    coroutine function embedding a list of texts in one request.
+
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    if not cache_enabled() or not texts:
+        return await embed_fn(texts)
+
+    try:
+        cached = await database_sync_to_async(get_many)(provider, model, task_type, texts)
+    except Exception as e:
+        logger.error(f"Error reading embedding cache: {e}")
+        cached = {}
+
+    missing = list(dict.fromkeys(text for text in texts if text not in cached))
+    debug_print(f"Embedding cache: {len(cached)} hits, {len(missing)} misses ({provider}/{model})")
+
+    if missing:
+        fresh = dict(zip(missing, await embed_fn(missing)))
+        try:
+            await database_sync_to_async(put_many)(provider, model, task_type, fresh)
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {e}")
+        cached.update(fresh)
+
+    return [cached[text] for text in texts]
@@ -5,15 +5,16 @@ Embedding service for generating embeddings using Google Gemini and OpenAI APIs.
 import logging
 import os
 import numpy as np
-from openai import OpenAI
 from django.conf import settings
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from .client_registry import get_openai_client, get_async_openai_client, get_google_embedder
+from .embedding_cache_service import embed_with_cache, embed_with_cache_async
 from ..utils.debug import debug_print
 
 
 # Google Gemini embeddings imports
 try:
-    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    import langchain_google_genai  # noqa: F401 - embedders are created by the client registry
     from sklearn.metrics.pairwise import cosine_similarity
     GOOGLE_EMBEDDINGS_AVAILABLE = True
 except ImportError:
@@ -22,6 +23,30 @@ except ImportError:
 # Configure logging
 logger = logging.getLogger(__name__)
 
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+GOOGLE_EMBEDDING_MODEL = "models/gemini-embedding-001"
+
+
+def _openai_embed(texts: List[str]) -> List[List[float]]:
+    """Embed a list of non-empty texts with a single OpenAI API request."""
+    # Shared OpenAI client (keeps connections alive between calls)
+    client = get_openai_client()
+    debug_print(f"Calling OpenAI embeddings API for {len(texts)} texts")
+    response = client.embeddings.create(
+        input=texts,
+        model=OPENAI_EMBEDDING_MODEL
+    )
+    return [item.embedding for item in response.data]
+
+async def _openai_embed_async(texts: List[str]) -> List[List[float]]:
+    """Embed a list of non-empty texts with a single OpenAI API request, without blocking the event loop."""
+    client = get_async_openai_client()
+    debug_print(f"Calling OpenAI embeddings API (async) for {len(texts)} texts")
+    response = await client.embeddings.create(
+        input=texts,
+        model=OPENAI_EMBEDDING_MODEL
+    )
+    return [item.embedding for item in response.data]
 
 def get_embedding(text: str) -> List[float]:
     """Generate an embedding for the given text."""
@@ -31,28 +56,12 @@ def get_embedding(text: str) -> List[float]:
         debug_print("Empty text provided, returning zero embedding")
         return [0.0] * 1536  # Default dimension for OpenAI embeddings
     try:
-        # Initialize OpenAI client
-        api_key = settings.OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY", "")
-        
-        try:
-            # Simple initialization without proxy settings
-            client = OpenAI(api_key=api_key)
-        except TypeError as e:
-            logger.error(f"Error initializing OpenAI client: {e}")
-            debug_print(f"ERROR initializing OpenAI client: {str(e)}")
-            # Fallback to minimal initialization
-            client = OpenAI(api_key=api_key)
-        
-        # Call the API
-        debug_print("Calling OpenAI embeddings API")
-        response = client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
-        )
+        # Served from the embedding cache when this text was embedded before
+        embedding = embed_with_cache('openai', OPENAI_EMBEDDING_MODEL, '', [text], _openai_embed)[0]
         
         # Return the embedding
         debug_print("Successfully generated embedding")
-        return response.data[0].embedding
+        return embedding
     
     except Exception as e:
         logger.error(f"Error generating embedding: {e}")
@@ -60,6 +69,30 @@ def get_embedding(text: str) -> List[float]:
         # Return zero vector as fallback
         return [0.0] * 1536
 
+async def get_embedding_async(text: str) -> List[float]:
+    """Generate an embedding for the given text without blocking the event loop."""
+    if not text or not text.strip():
+        return [0.0] * 1536
+    try:
+        return (await embed_with_cache_async('openai', OPENAI_EMBEDDING_MODEL, '', [text], _openai_embed_async))[0]
+    except Exception as e:
+        logger.error(f"Error generating embedding: {e}")
+        debug_print(f"ERROR generating embedding: {str(e)}")
+        return [0.0] * 1536
+
+def _align_embeddings(texts: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+    """Map embeddings of the non-empty texts back to all texts, with zero vectors for empty ones."""
+    result = []
+    valid_idx = 0
+    
+    for text in texts:
+        if text and text.strip():
+            result.append(embeddings[valid_idx])
+            valid_idx += 1
+        else:
+            result.append([0.0] * 1536)
+    return result
+
 def get_batch_embeddings(texts: List[str]) -> List[List[float]]:
     """Generate embeddings for a list of texts."""
     debug_print(f"Generating batch embeddings for {len(texts)} texts")
@@ -76,35 +109,11 @@ def get_batch_embeddings(texts: List[str]) -> List[List[float]]:
         return [[0.0] * 1536] * len(texts)
     
     try:
-        # Initialize OpenAI client
-        api_key = settings.OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY", "")
-        
-        try:
-            # Simple initialization without proxy settings
-            client = OpenAI(api_key=api_key)
-        except TypeError as e:
-            logger.error(f"Error initializing OpenAI client: {e}")
-            debug_print(f"ERROR initializing OpenAI client: {str(e)}")
-            # Fallback to minimal initialization
-            client = OpenAI(api_key=api_key)
-        
-        # Call the API
-        debug_print("Calling OpenAI batch embeddings API")
-        response = client.embeddings.create(
-            input=valid_texts,
-            model="text-embedding-3-small"
-        )
+        # Only texts missing from the embedding cache are sent to the API
+        embeddings = embed_with_cache('openai', OPENAI_EMBEDDING_MODEL, '', valid_texts, _openai_embed)
         
         # Map embeddings back to original texts
-        result = []
-        valid_idx = 0
-        
-        for text in texts:
-            if text and text.strip():
-                result.append(response.data[valid_idx].embedding)
-                valid_idx += 1
-            else:
-                result.append([0.0] * 1536)
+        result = _align_embeddings(texts, embeddings)
         
         debug_print("Successfully generated batch embeddings")
         return result
@@ -115,6 +124,19 @@ def get_batch_embeddings(texts: List[str]) -> List[List[float]]:
         # Return zero vectors as fallback
         return [[0.0] * 1536] * len(texts)
 
+async def get_batch_embeddings_async(texts: List[str]) -> List[List[float]]:
+    """Generate embeddings for a list of texts without blocking the event loop."""
+    valid_texts = [text for text in texts if text and text.strip()]
+    if not valid_texts:
+        return [[0.0] * 1536] * len(texts)
+    try:
+        embeddings = await embed_with_cache_async('openai', OPENAI_EMBEDDING_MODEL, '', valid_texts, _openai_embed_async)
+        return _align_embeddings(texts, embeddings)
+    except Exception as e:
+        logger.error(f"Error generating batch embeddings: {e}")
+        debug_print(f"ERROR generating batch embeddings: {str(e)}")
+        return [[0.0] * 1536] * len(texts)
+
 def calculate_similarity(embedding1: List[float], embedding2: List[float]) -> float:
     """Calculate cosine similarity between two embeddings."""
     debug_print("Calculating similarity between embeddings")
@@ -145,15 +167,61 @@ def calculate_similarity(embedding1: List[float], embedding2: List[float]) -> fl
         debug_print(f"ERROR calculating similarity: {str(e)}")
         return 0.0
     
-def validate_note_relevance(notes, expanded_questions, explanation, threshold=0.05):
+def cosine_scores(query_embedding: List[float], embeddings: List[List[float]]) -> np.ndarray:
+    """
+    Calculate cosine similarities between one query vector and many vectors.
+    Rows are L2-normalized once and scored with a single matrix-vector product.
+    
+    Args:
+        query_embedding: Single query embedding vector
+        embeddings: List (or 2D array) of embedding vectors
+        
+    Returns:
+        Array of similarity scores, 0.0 for zero vectors
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.size == 0:
+        return np.zeros(0, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    
+    query_norm = np.linalg.norm(query)
+    if query_norm == 0:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+    
+    row_norms = np.linalg.norm(matrix, axis=1)
+    row_norms[row_norms == 0] = np.inf  # Zero vectors score 0.0
+    return (matrix @ (query / query_norm)) / row_norms
+
+def build_intent_text(expanded_questions: List[str], explanation: str) -> str:
+    """Combine the user's questions and research intent explanation into one text."""
+    return " ".join(expanded_questions) + " / " + explanation
+
+def get_intent_embedding(expanded_questions: List[str], explanation: str) -> List[float]:
+    """
+    Embed the user's research intent once so it can be reused for every paper in a session.
+    
+    Args:
+        expanded_questions: List of search questions
+        explanation: Concise explanation of user's research intent
+        
+    Returns:
+        Intent embedding vector
+    """
+    user_intent_text = build_intent_text(expanded_questions, explanation)
+    debug_print(f"Generated user intent text: '{user_intent_text[:500]}...'")
+    return get_embedding(user_intent_text)
+
+def validate_note_relevance(notes, expanded_questions, explanation, threshold=0.05, intent_embedding=None):
     """
     Perform final validation on notes to ensure they meet relevance threshold.
+    All notes are embedded in one batched request and scored in one vectorized pass.
     
     Args:
         notes: List of extracted notes
         expanded_questions: List of search questions
         explanation: Concise explanation of user's research intent
         threshold: Minimum similarity score (default xxx)
+        intent_embedding: Precomputed session intent embedding (computed here if not given)
         
     Returns:
         validated_notes: List of notes that passed validation
@@ -161,33 +229,51 @@ def validate_note_relevance(notes, expanded_questions, explanation, threshold=0.
     """
     debug_print(f"Performing final relevance validation on {len(notes)} notes with threshold {threshold}")
     
-    # Create the user intent text by combining expanded questions and explanation
-    user_intent_text = " ".join(expanded_questions) + " / " + explanation
-    debug_print(f"Generated user intent text: '{user_intent_text[:500]}...'")
+    if not notes:
+        return [], []
     
-    # Get embedding for user intent
-    intent_embedding = get_embedding(user_intent_text)
+    # Get embedding for user intent (normally computed once per session by the caller)
+    if intent_embedding is None:
+        intent_embedding = get_intent_embedding(expanded_questions, explanation)
+    
+    # Embed all notes in a single request and score them together
+    note_embeddings = get_batch_embeddings([note['content'] for note in notes])
+    return _split_by_relevance(notes, cosine_scores(intent_embedding, note_embeddings), threshold)
 
-   
+async def validate_note_relevance_async(notes, expanded_questions, explanation, threshold=0.05, intent_embedding=None):
+    """
+    validate_note_relevance for code running on the event loop (embeddings are requested asynchronously).
+    
+    Returns:
+        validated_notes: List of notes that passed validation
+        filtered_notes: List of notes that didn't meet threshold
+    """
+    debug_print(f"Performing final relevance validation on {len(notes)} notes with threshold {threshold}")
+    
+    if not notes:
+        return [], []
+    
+    if intent_embedding is None:
+        intent_embedding = await get_embedding_async(build_intent_text(expanded_questions, explanation))
+    
+    note_embeddings = await get_batch_embeddings_async([note['content'] for note in notes])
+    return _split_by_relevance(notes, cosine_scores(intent_embedding, note_embeddings), threshold)
+
+def _split_by_relevance(notes, similarities, threshold):
+    """Record each note's relevance score and split the notes at the threshold."""
     validated_notes = []
     filtered_notes = []
     
-    for note in notes:
-        # Get embedding for note content
-        note_embedding = get_embedding(note['content'])
-        
-        # Calculate similarity
-        similarity = calculate_similarity(intent_embedding, note_embedding)
+    for note, similarity in zip(notes, similarities):
+        similarity = float(similarity)
+        note['relevance_score'] = similarity
         debug_print(f"Note similarity: {similarity:.4f} for note: '{note['content'][:5000]}...'")
-       
-       
+        
         # Apply threshold
         if similarity >= threshold:
-            note['relevance_score'] = float(similarity)
             validated_notes.append(note)
             debug_print(f"Note PASSED with score {similarity:.4f}")
         else:
-            note['relevance_score'] = float(similarity)
             filtered_notes.append(note)
             debug_print(f"Note FILTERED with score {similarity:.4f}")
     
@@ -252,27 +338,25 @@ def get_google_embeddings_batch(documents: List[Dict[str, str]], user_query: str
             debug_print("Failed to setup Google API key")
             return None, None
         
-        # Initialize embedders with task-specific models
-        doc_embedder = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001", 
-            task_type="RETRIEVAL_DOCUMENT"
-        )
-        query_embedder = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001", 
-            task_type="RETRIEVAL_QUERY"
-        )
-        
+        # Shared embedders with task-specific models
+        doc_embedder = get_google_embedder(GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_DOCUMENT")
+        query_embedder = get_google_embedder(GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_QUERY")
         
         # Extract document texts
         doc_texts = [doc["content"] for doc in documents]
         
         # Batch embed all documents
         debug_print("Generating document embeddings with Google Gemini")
-        doc_embeddings = doc_embedder.embed_documents(doc_texts)
+        doc_embeddings = embed_with_cache(
+            'google', GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_DOCUMENT", doc_texts, doc_embedder.embed_documents
+        )
         
         # Embed user query
         debug_print("Generating query embedding with Google Gemini")
-        query_embedding = query_embedder.embed_query(user_query)
+        query_embedding = embed_with_cache(
+            'google', GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_QUERY", [user_query],
+            lambda texts: [query_embedder.embed_query(texts[0])]
+        )[0]
         
         debug_print("Successfully generated Google Gemini embeddings")
         return doc_embeddings, query_embedding
@@ -282,6 +366,75 @@ def get_google_embeddings_batch(documents: List[Dict[str, str]], user_query: str
         debug_print(f"ERROR generating Google embeddings: {str(e)}")
         return None, None
 
+async def get_google_query_embedding_async(user_query: str) -> Optional[List[float]]:
+    """
+    Generate the Google Gemini retrieval-query embedding of a user query.
+    
+    Args:
+        user_query: Concatenated user queries string
+        
+    Returns:
+        Query embedding, or None on error
+    """
+    if not GOOGLE_EMBEDDINGS_AVAILABLE:
+        debug_print("Google embeddings not available - missing dependencies")
+        return None
+    
+    try:
+        if not setup_google_api_key():
+            return None
+        
+        query_embedder = get_google_embedder(GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_QUERY")
+        
+        async def embed_query(texts):
+            return [await query_embedder.aembed_query(texts[0])]
+        
+        return (await embed_with_cache_async(
+            'google', GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_QUERY", [user_query], embed_query
+        ))[0]
+        
+    except Exception as e:
+        logger.error(f"Error generating Google query embedding: {e}")
+        debug_print(f"ERROR generating Google query embedding: {str(e)}")
+        return None
+
+async def get_google_embeddings_batch_async(documents: List[Dict[str, str]], user_query: str) -> tuple:
+    """
+    get_google_embeddings_batch for code running on the event loop.
+    
+    Args:
+        documents: List of dicts with 'content' and 'id' keys
+        user_query: Concatenated user queries string
+        
+    Returns:
+        Tuple of (doc_embeddings, query_embedding) or (None, None) on error
+    """
+    debug_print(f"Generating Google embeddings (async) for {len(documents)} documents and 1 query")
+    
+    if not GOOGLE_EMBEDDINGS_AVAILABLE:
+        debug_print("Google embeddings not available - missing dependencies")
+        return None, None
+    
+    try:
+        if not setup_google_api_key():
+            return None, None
+        
+        doc_embedder = get_google_embedder(GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_DOCUMENT")
+        
+        doc_embeddings = await embed_with_cache_async(
+            'google', GOOGLE_EMBEDDING_MODEL, "RETRIEVAL_DOCUMENT",
+            [doc["content"] for doc in documents], doc_embedder.aembed_documents
+        )
+        query_embedding = await get_google_query_embedding_async(user_query)
+        if query_embedding is None:
+            return None, None
+        return doc_embeddings, query_embedding
+        
+    except Exception as e:
+        logger.error(f"Error generating Google embeddings: {e}")
+        debug_print(f"ERROR generating Google embeddings: {str(e)}")
+        return None, None
+
 def calculate_cosine_similarities(query_embedding: List[float], doc_embeddings: List[List[float]]) -> List[float]:
     """
     Calculate cosine similarities between query and documents using sklearn.
@@ -306,61 +459,26 @@ def calculate_cosine_similarities(query_embedding: List[float], doc_embeddings:
         debug_print(f"ERROR calculating similarities: {str(e)}")
         return [0.0] * len(doc_embeddings)
 
-def filter_papers_by_embedding_similarity(
-    documents: List[Dict[str, str]], 
-    user_query: str, 
-    threshold: float = 0.7
-) -> Dict[str, bool]:
+def score_documents_by_embedding_similarity(documents: List[Dict[str, str]], user_query: str) -> Optional[np.ndarray]:
     """
-    Filter papers using Google Gemini embeddings and cosine similarity.
+    Embed documents and the query once and score every document against the query.
+    Embeddings already in the embedding cache are reused rather than requested again.
     
     Args:
         documents: List of dicts with 'content' (title+abstract) and 'id' (URL) keys
         user_query: Concatenated user queries string
-        threshold: Minimum cosine similarity threshold (default: 0.7)
         
     Returns:
-        Dictionary mapping document IDs (URLs) to relevance boolean
+        Array of cosine similarities aligned with documents, or None if embeddings failed
     """
-    debug_print(f"Filtering {len(documents)} papers using Google embeddings with threshold {threshold}")
-    
     if not documents:
-        debug_print("No documents to filter")
-        return {}
+        return np.zeros(0, dtype=np.float32)
     
-    try:
-        # Generate embeddings
-        doc_embeddings, query_embedding = get_google_embeddings_batch(documents, user_query)
-        
-        if doc_embeddings is None or query_embedding is None:
-            debug_print("Failed to generate embeddings - falling back to accepting all papers")
-            # Return all as relevant if embeddings fail
-            return {doc["id"]: True for doc in documents}
-        
-        # Calculate similarities
-        similarities = calculate_cosine_similarities(query_embedding, doc_embeddings)
-        
-        # Apply threshold and create relevance map
-        relevance_map = {}
-        relevant_count = 0
-        
-        for doc, similarity in zip(documents, similarities):
-            is_relevant = similarity >= threshold
-            relevance_map[doc["id"]] = is_relevant
-            
-            if is_relevant:
-                relevant_count += 1
-            
-            debug_print(f"Paper {doc['id']}: similarity {similarity:.3f} -> {'RELEVANT' if is_relevant else 'FILTERED'}")
-        
-        debug_print(f"Filtering complete: {relevant_count}/{len(documents)} papers above {threshold} threshold")
-        return relevance_map
-        
-    except Exception as e:
-        logger.error(f"Error in embedding-based filtering: {e}")
-        debug_print(f"ERROR in embedding filtering: {str(e)}")
-        # Return all as relevant on error to avoid breaking the pipeline
-        return {doc["id"]: True for doc in documents}
+    doc_embeddings, query_embedding = get_google_embeddings_batch(documents, user_query)
+    if doc_embeddings is None or query_embedding is None:
+        return None
+    return cosine_scores(query_embedding, doc_embeddings)
+
 
 def test_google_embeddings_setup():
     """
@@ -0,0 +1,345 @@
+"""
+Durable job queue for research sessions, backed by the ResearchJob table.
+Web requests only enqueue a job; worker processes (`manage.py run_research_worker`,
+or the embedded worker of the web process) claim queued jobs with
+SELECT ... FOR UPDATE SKIP LOCKED, hold them under a lease renewed by a heartbeat,
+and acknowledge them when the session run returns. Jobs whose lease expires because
+their worker died (deploy, OOM) are queued again and resume where they stopped, up to
+max_attempts, after which the session and its unfinished papers are marked as errors.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Iterable, Optional
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from ..models import ResearchJob, ResearchSession, Paper
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _lease_seconds() -> int:
+    return getattr(settings, 'RESEARCH_JOB_LEASE_SECONDS', 120)
+
+
+def make_worker_id() -> str:
+    """Return a worker identifier unique across hosts and processes."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def enqueue_session_job(session_id: str, settings_data: dict = None) -> ResearchJob:
+    """
+    Queue a research session for processing.
+
+    A session that already has a queued job is not queued twice.
+
+    Args:
+        session_id: The ID of the session to process
+        settings_data: Optional settings data from the request
+
+    Returns:
+        The queued job
+    """
+    queued = ResearchJob.objects.filter(session_id=session_id, status='queued').first()
+    if queued is not None:
+        return queued
+    job = ResearchJob.objects.create(
+        session_id=session_id,
+        settings_data=settings_data or {},
+        max_attempts=getattr(settings, 'RESEARCH_JOB_MAX_ATTEMPTS', 3)
+    )
+    debug_print(f"Queued job {job.id} for session {session_id}")
+    return job
+
+
+def claim_job(worker_id: str) -> Optional[ResearchJob]:
+    """
+    Claim the oldest available queued job.
+
+    The candidate row is locked with SKIP LOCKED so concurrent workers never wait on
+    each other; the conditional status update makes the claim safe on databases
+    without row locks (SQLite) as well.
+
+    Args:
+        worker_id: Identifier of the claiming worker
+
+    Returns:
+        The claimed job (status 'running', attempts incremented), or None if none is available
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job_id = (
+            ResearchJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='queued', available_at__lte=now)
+            .order_by('available_at', 'created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = ResearchJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            worker_id=worker_id,
+            attempts=F('attempts') + 1,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=_lease_seconds())
+        )
+    if not claimed:
+        return None
+    return ResearchJob.objects.get(id=job_id)
+
+
+def renew_leases(worker_id: str, job_ids: Iterable) -> int:
+    """Extend the leases of a worker's running jobs; returns the number of leases renewed."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    return ResearchJob.objects.filter(id__in=job_ids, worker_id=worker_id, status='running').update(
+        lease_expires_at=timezone.now() + timedelta(seconds=_lease_seconds())
+    )
+
+
+def complete_job(job_id, worker_id: str) -> bool:
+    """Acknowledge a finished job. Returns False if the worker no longer held its lease."""
+    return bool(ResearchJob.objects.filter(id=job_id, worker_id=worker_id, status='running').update(
+        status='done',
+        lease_expires_at=None,
+        finished_at=timezone.now()
+    ))
+
+
+def _abandon_session(session_id) -> None:
+    """Mark a session whose job gave up, and its unfinished papers, as errors."""
+    Paper.objects.filter(session_id=session_id, status__in=['pending', 'processing']).update(
+        status='error',
+        error_message="Processing was interrupted"
+    )
+    ResearchSession.objects.filter(id=session_id).update(status='error')
+
+
+def _retry_or_fail(job: ResearchJob, error: str) -> str:
+    """Queue a running job again with backoff, or fail it after max_attempts. Returns the new status."""
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = getattr(settings, 'RESEARCH_JOB_RETRY_DELAY', 10) * job.attempts
+        updated = ResearchJob.objects.filter(id=job.id, status='running', worker_id=job.worker_id).update(
+            status='queued',
+            worker_id='',
+            lease_expires_at=None,
+            available_at=now + timedelta(seconds=delay),
+            error=error
+        )
+        if updated:
+            # The next attempt resumes the papers that were in flight
+            Paper.objects.filter(session_id=job.session_id, status='processing').update(status='pending')
+        return 'queued'
+
+    updated = ResearchJob.objects.filter(id=job.id, status='running', worker_id=job.worker_id).update(
+        status='failed',
+        lease_expires_at=None,
+        finished_at=now,
+        error=error
+    )
+    if updated:
+        _abandon_session(job.session_id)
+    return 'failed'
+
+
+def fail_job(job_id, worker_id: str, error: str) -> Optional[str]:
+    """
+    Report a job whose run raised.
+
+    Args:
+        job_id: Failed job
+        worker_id: Worker that ran it
+        error: Error description
+
+    Returns:
+        'queued' if it will be retried, 'failed' if it gave up, None if the worker no longer held it
+    """
+    job = ResearchJob.objects.filter(id=job_id, worker_id=worker_id, status='running').first()
+    if job is None:
+        return None
+    return _retry_or_fail(job, error)
+
+
+def recover_expired_jobs() -> int:
+    """
+    Queue again (or fail) running jobs whose worker stopped renewing their lease.
+
+    Returns:
+        Number of recovered jobs
+    """
+    expired = list(ResearchJob.objects.filter(status='running', lease_expires_at__lt=timezone.now()))
+    for job in expired:
+        outcome = _retry_or_fail(job, f"Lease of worker {job.worker_id} expired")
+        logger.warning(f"Recovered job {job.id} for session {job.session_id} from worker {job.worker_id}: {outcome}")
+    return len(expired)
+
+
+class JobWorker:
+    """
+    Runs queued research jobs on a fixed number of threads.
+
+    A heartbeat thread renews the leases of the jobs in progress and periodically
+    recovers jobs abandoned by other workers.
+    """
+
+    def __init__(self, handler: Callable[[ResearchJob], None], concurrency: int = None,
+                 poll_interval: float = None, worker_id: str = None):
+        """
+        Args:
+            handler: Runs one job; a job is acknowledged when it returns and retried when it raises
+            concurrency: Jobs run at the same time (defaults to RESEARCH_WORKER_CONCURRENCY)
+            poll_interval: Seconds between polls of an empty queue (defaults to RESEARCH_WORKER_POLL_INTERVAL)
+            worker_id: Identifier recorded on claimed jobs (defaults to host:pid:random)
+        """
+        self.handler = handler
+        self.concurrency = concurrency or getattr(settings, 'RESEARCH_WORKER_CONCURRENCY', 2)
+        self.poll_interval = poll_interval or getattr(settings, 'RESEARCH_WORKER_POLL_INTERVAL', 2.0)
+        self.worker_id = worker_id or make_worker_id()
+        self.jobs_done = 0
+        self._running_jobs = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._threads = []
+
+    @property
+    def stopping(self) -> bool:
+        """True once stop() was called."""
+        return self._stop_event.is_set()
+
+    def is_alive(self) -> bool:
+        """True while any worker thread is still running."""
+        return any(thread.is_alive() for thread in self._threads)
+
+    def is_idle(self) -> bool:
+        """True if no job is in progress and no queued job is available to claim."""
+        with self._lock:
+            if self._running_jobs:
+                return False
+        return not ResearchJob.objects.filter(status='queued', available_at__lte=timezone.now()).exists()
+
+    def wake(self) -> None:
+        """Poll the queue now instead of waiting for the next poll interval."""
+        self._wake_event.set()
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; jobs in progress run to completion."""
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def _run_job(self, job: ResearchJob) -> None:
+        with self._lock:
+            self._running_jobs.add(job.id)
+        debug_print(f"Worker {self.worker_id} running job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+        try:
+            self.handler(job)
+        except Exception as e:
+            logger.error(f"Job {job.id} for session {job.session_id} failed: {e}", exc_info=True)
+            close_old_connections()
+            fail_job(job.id, self.worker_id, str(e))
+        else:
+            close_old_connections()
+            if not complete_job(job.id, self.worker_id):
+                logger.warning(f"Job {job.id} finished after its lease was taken over")
+        finally:
+            with self._lock:
+                self._running_jobs.discard(job.id)
+                self.jobs_done += 1
+
+    def _job_loop(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    close_old_connections()
+                    job = claim_job(self.worker_id)
+                except Exception as e:
+                    logger.error(f"Error claiming research job: {e}")
+                    job = None
+                if job is None:
+                    self._wake_event.wait(self.poll_interval)
+                    self._wake_event.clear()
+                    continue
+                self._run_job(job)
+        finally:
+            connection.close()
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, _lease_seconds() / 3)
+        try:
+            while True:
+                if not self._stop_event.is_set():
+                    self._stop_event.wait(interval)
+                else:
+                    # Keep renewing while the jobs in progress finish after stop()
+                    with self._lock:
+                        if not self._running_jobs:
+                            break
+                    time.sleep(interval)
+                try:
+                    close_old_connections()
+                    with self._lock:
+                        running = list(self._running_jobs)
+                    renew_leases(self.worker_id, running)
+                    if not self._stop_event.is_set():
+                        recover_expired_jobs()
+                except Exception as e:
+                    logger.error(f"Error in research worker heartbeat: {e}")
+        finally:
+            connection.close()
+
+    def start(self) -> None:
+        """Start the job threads and the heartbeat in the background."""
+        try:
+            recover_expired_jobs()
+        except Exception as e:
+            logger.error(f"Error recovering research jobs: {e}")
+        self._threads = [
+            threading.Thread(target=self._job_loop, name=f"research-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat_loop, name="research-worker-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Research worker {self.worker_id} started with {self.concurrency} job threads")
+
+    def join(self, timeout: float = None) -> None:
+        """Wait for the worker threads to exit (after stop())."""
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+_embedded_worker: Optional[JobWorker] = None
+_embedded_worker_lock = threading.Lock()
+
+
+def start_embedded_worker(handler: Callable[[ResearchJob], None]) -> Optional[JobWorker]:
+    """
+    Run a job worker inside the current (web) process, once per process.
+
+    Only used with RESEARCH_WORKER_EMBEDDED, for deployments without a separate
+    worker process; jobs still survive restarts through the queue table.
+
+    Returns:
+        The embedded worker, or None if embedded workers are disabled
+    """
+    global _embedded_worker
+    if not getattr(settings, 'RESEARCH_WORKER_EMBEDDED', True):
+        return None
+    with _embedded_worker_lock:
+        if _embedded_worker is None:
+            _embedded_worker = JobWorker(handler)
+            _embedded_worker.start()
+    return _embedded_worker
@@ -0,0 +1,70 @@
+"""
+Lexical relevance scoring for paper pre-filtering.
+Query term coverage of title + abstract, computed locally from the metadata the arXiv
+search already returned. Deterministic, free and available even when the embedding
+provider is not.
+"""
+
+import logging
+import re
+from typing import List, Sequence
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Common English words plus the filler words of generated research questions
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over own
+same she should so some such than that the their theirs them themselves then there these they this
+those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves
+approach approaches based research study studies paper papers using use used
+""".split())
+
+
+def _normalize_token(token: str) -> str:
+    """Fold simple plurals so 'athletes' matches 'athlete' and 'sports' matches 'sport'."""
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into word tokens, dropping stopwords and single characters."""
+    return [
+        _normalize_token(token) for token in TOKEN_PATTERN.findall((text or "").lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def term_coverage_scores(documents: Sequence[str], query_parts: Sequence[str]) -> np.ndarray:
+    """
+    Score documents by how completely they cover the best-matching query part.
+
+    Each query part (a topic, question or search term) is reduced to its set of
+    content words; a document scores the largest fraction of any one part's words it
+    contains. The score depends only on the document and the query, not on the other
+    documents scored with it, so scores and thresholds compare across search batches.
+
+    Args:
+        documents: Document texts (e.g. "title. abstract")
+        query_parts: Topics, questions and search terms
+
+    Returns:
+        Array of scores in 0..1 aligned with documents (0.0 = no query term present)
+    """
+    part_terms = [terms for terms in (set(tokenize(part)) for part in query_parts) if terms]
+    scores = np.zeros(len(documents), dtype=np.float32)
+    if not part_terms:
+        return scores
+
+    for row, document in enumerate(documents):
+        tokens = set(tokenize(document))
+        scores[row] = max(len(terms & tokens) / len(terms) for terms in part_terms)
+    return scores
@@ -0,0 +1,180 @@
+"""
+LLM cache service for reusing LLM responses across research sessions.
+Responses are keyed by model plus a sha256 of the full prompt and output schema,
+expire after a TTL and are evicted least-recently-used beyond a maximum entry count.
+The cache is opt-in (LLM_CACHE_ENABLED) and can be bypassed per call.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, Any, Optional
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from ..models import LLMResponseCacheEntry
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Check the entry limit after this many stored responses
+EVICTION_CHECK_INTERVAL = 100
+
+_MISSING = object()
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0, 'evicted': 0}
+_stats_lock = threading.Lock()
+_puts_since_eviction_check = 0
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def cache_enabled() -> bool:
+    """Return True if LLM responses should be served from and stored in the cache."""
+    return getattr(settings, 'LLM_CACHE_ENABLED', False)
+
+
+def make_key(model: str, kind: str, prompt: str, output_schema: dict = None) -> str:
+    """
+    Build the cache key of an LLM request.
+
+    Args:
+        model: Model identifier
+        kind: Call kind ("call" or "structured_output")
+        prompt: Full prompt sent to the model, including any system prompt
+        output_schema: JSON schema for structured output, if any
+
+    Returns:
+        sha256 hex digest
+    """
+    payload = json.dumps({
+        'model': model,
+        'kind': kind,
+        'prompt': prompt,
+        'schema': output_schema
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get(key: str) -> Any:
+    """
+    Return the cached response for a key, or _MISSING on a miss or expired entry.
+
+    Use is_hit() to test the result.
+    """
+    try:
+        entry = LLMResponseCacheEntry.objects.filter(key=key).values_list('response', 'expires_at').first()
+        if entry is None:
+            _count('misses')
+            return _MISSING
+
+        response, expires_at = entry
+        now = timezone.now()
+        if expires_at is not None and expires_at <= now:
+            LLMResponseCacheEntry.objects.filter(key=key).delete()
+            _count('misses')
+            return _MISSING
+
+        LLMResponseCacheEntry.objects.filter(key=key).update(last_used_at=now)
+        _count('hits')
+        debug_print(f"LLM cache hit {key[:12]}")
+        return response
+    except Exception as e:
+        logger.error(f"Error reading LLM cache: {e}")
+        _count('misses')
+        return _MISSING
+
+
+def is_hit(response: Any) -> bool:
+    """Return True if a value returned by get() is a cached response."""
+    return response is not _MISSING
+
+
+def put(key: str, model: str, response: Any, ttl: Optional[int] = None) -> None:
+    """
+    Store an LLM response.
+
+    Args:
+        key: Cache key from make_key
+        model: Model identifier
+        response: JSON-serializable response
+        ttl: Seconds until the entry expires (defaults to LLM_CACHE_TTL, None/0 = never)
+    """
+    global _puts_since_eviction_check
+    if ttl is None:
+        ttl = getattr(settings, 'LLM_CACHE_TTL', 7 * 24 * 60 * 60)
+
+    now = timezone.now()
+    try:
+        LLMResponseCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'model': model,
+                'response': response,
+                'last_used_at': now,
+                'expires_at': now + timedelta(seconds=ttl) if ttl else None
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error writing LLM cache: {e}")
+        return
+    _count('stores')
+
+    with _stats_lock:
+        _puts_since_eviction_check += 1
+        if _puts_since_eviction_check < EVICTION_CHECK_INTERVAL:
+            return
+        _puts_since_eviction_check = 0
+    try:
+        evict()
+    except Exception as e:
+        logger.error(f"Error evicting LLM cache entries: {e}")
+
+
+def record_bypass() -> None:
+    """Count a call that skipped the cache on request."""
+    _count('bypassed')
+
+
+def evict(max_entries: int = None) -> int:
+    """
+    Delete expired responses, then least recently used ones beyond the entry limit.
+
+    Args:
+        max_entries: Maximum number of entries to keep (defaults to LLM_CACHE_MAX_ENTRIES)
+
+    Returns:
+        Number of evicted entries
+    """
+    if max_entries is None:
+        max_entries = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 10000)
+
+    evicted, _ = LLMResponseCacheEntry.objects.filter(
+        Q(expires_at__isnull=False) & Q(expires_at__lte=timezone.now())
+    ).delete()
+
+    excess = LLMResponseCacheEntry.objects.count() - max_entries
+    if excess > 0:
+        oldest = list(LLMResponseCacheEntry.objects.order_by('last_used_at').values_list('key', flat=True)[:excess])
+        deleted, _ = LLMResponseCacheEntry.objects.filter(key__in=oldest).delete()
+        evicted += deleted
+
+    if evicted:
+        _count('evicted', evicted)
+        debug_print(f"Evicted {evicted} cached LLM responses")
+    return evicted
+
+
+def get_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of this process and the current hit rate."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
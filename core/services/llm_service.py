@@ -6,10 +6,12 @@ import logging
 import os
 import json
 import asyncio
-import time
 from typing import List, Dict, Any, Optional
-from pydantic_ai import Agent
 from django.conf import settings
+from channels.db import database_sync_to_async
+from .client_registry import get_agent
+from . import llm_cache_service as llm_cache
+from ..utils.async_runtime import run_sync
 from ..utils.debug import debug_print
 
 # Configure logging
@@ -20,17 +22,28 @@ logger = logging.getLogger(__name__)
 class LLM:
     """Class for interacting with LLMs using Pydantic-AI."""
     
-    def __init__(self, model: str = None, max_retries: int = 3):
-        """Initialize the LLM class."""
+    def __init__(self, model: str = None, max_retries: int = 3, use_cache: bool = None):
+        """Initialize the LLM class.
+        use_cache enables the LLM response cache for this instance (defaults to LLM_CACHE_ENABLED)."""
         self.model = model or os.environ.get("DEFAULT_MODEL", 'openai:gpt-4o-mini')
         self.max_retries = max_retries
+        self.use_cache = llm_cache.cache_enabled() if use_cache is None else use_cache
         
-        # Create the Pydantic-AI agent
+        # Reuse the process-wide Pydantic-AI agent for this model
         debug_print(f"Initializing Pydantic-AI agent with model: {self.model}")
-        self.agent = Agent(self.model)
+        self.agent = get_agent(self.model)
     
-    async def call(self, prompt: str, system_prompt: str = None, attempt: int = 0) -> str:
-        """Call the LLM with the given prompt."""
+    def _cache_key(self, use_cache: bool, kind: str, full_prompt: str, output_schema: dict = None) -> Optional[str]:
+        """Return the response cache key for a request, or None if caching is off for it."""
+        if not self.use_cache:
+            return None
+        if not use_cache:
+            llm_cache.record_bypass()
+            return None
+        return llm_cache.make_key(self.model, kind, full_prompt, output_schema)
+    
+    async def call(self, prompt: str, system_prompt: str = None, attempt: int = 0, use_cache: bool = True) -> str:
+        """Call the LLM with the given prompt. Pass use_cache=False to bypass the response cache."""
         debug_print(f"Async calling LLM, attempt: {attempt+1}/{self.max_retries+1}")
         try:
             # Prepare the prompt with system prompt if provided
@@ -40,6 +53,13 @@ class LLM:
             else:
                 full_prompt = prompt
             
+            # Serve repeated prompts from the response cache (DB access runs off the event loop)
+            cache_key = self._cache_key(use_cache, "call", full_prompt) if attempt == 0 else None
+            if cache_key:
+                cached = await database_sync_to_async(llm_cache.get)(cache_key)
+                if llm_cache.is_hit(cached):
+                    return cached
+            
             debug_print(f"Calling Pydantic-AI agent with prompt (length: {len(full_prompt)})")
             
             # Call the agent
@@ -58,6 +78,11 @@ class LLM:
                     output = output[content_start:content_end].strip()
                     debug_print("Stripped markdown code block from response")
             
+            if self.use_cache and use_cache and isinstance(output, str):
+                await database_sync_to_async(llm_cache.put)(
+                    llm_cache.make_key(self.model, "call", full_prompt), self.model, output
+                )
+            
             return output
         
         except Exception as e:
@@ -69,32 +94,37 @@ class LLM:
                 retry_delay = 2 ** attempt
                 debug_print(f"Retrying in {retry_delay} seconds (attempt {attempt+1}/{self.max_retries})")
                 await asyncio.sleep(retry_delay)
-                return await self.call(prompt, system_prompt, attempt + 1)
+                return await self.call(prompt, system_prompt, attempt + 1, use_cache)
             else:
                 # Return error message after max retries
                 debug_print(f"Failed after {self.max_retries} attempts")
                 return f"Error after {self.max_retries} attempts: {str(e)}"
     
-    def call_sync(self, prompt: str, system_prompt: str = None) -> str:
+    def call_sync(self, prompt: str, system_prompt: str = None, use_cache: bool = True) -> str:
         """Synchronous version of call for non-async contexts."""
         debug_print("Sync calling LLM")
         try:
-            # Run the async call in a synchronous context
-            return asyncio.run(self.call(prompt, system_prompt))
+            # Run the async call on the shared background event loop
+            return run_sync(self.call(prompt, system_prompt, use_cache=use_cache))
         
         except Exception as e:
             logger.error(f"Error in synchronous LLM call: {e}")
             debug_print(f"ERROR in synchronous LLM call: {str(e)}")
             return f"Error: {str(e)}"
     
-    def complete(self, prompt: str, system_prompt: str = None) -> str:
+    def complete(self, prompt: str, system_prompt: str = None, use_cache: bool = True) -> str:
         """Simple completion method for text generation.
         This is a wrapper around call_sync for simpler interface."""
         debug_print("Starting complete method")
-        return self.call_sync(prompt, system_prompt)
+        return self.call_sync(prompt, system_prompt, use_cache)
     
-    def structured_output(self, prompt: str, output_schema: dict, system_prompt: str = None) -> Dict[str, Any]:
-        """Get structured output from the LLM."""
+    def structured_output(self, prompt: str, output_schema: dict, system_prompt: str = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Get structured output from the LLM. Pass use_cache=False to bypass the response cache.
+        Synchronous facade over structured_output_async, run on the shared background event loop."""
+        return run_sync(self.structured_output_async(prompt, output_schema, system_prompt, use_cache))
+    
+    async def structured_output_async(self, prompt: str, output_schema: dict, system_prompt: str = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Get structured output from the LLM without blocking the event loop."""
         debug_print("Calling LLM for structured output")
         try:
             # Create a system prompt with schema instructions
@@ -110,14 +140,21 @@ class LLM:
             full_prompt = f"{full_system_prompt}\n\n{prompt}"
             debug_print(f"Prepared prompt with schema instructions (length: {len(full_prompt)})")
             
+            # Serve repeated prompts from the response cache
+            cache_key = self._cache_key(use_cache, "structured_output", full_prompt, output_schema)
+            if cache_key:
+                cached = await database_sync_to_async(llm_cache.get)(cache_key)
+                if llm_cache.is_hit(cached):
+                    return cached
+            
             # Add retry logic for connection issues
             max_retries = 3
             retry_delay_base = 2  # seconds
             
             for attempt in range(max_retries):
                 try:
-                    # Call the agent synchronously to get JSON response
-                    result = asyncio.run(self.agent.run(full_prompt))
+                    # Call the agent to get JSON response
+                    result = await self.agent.run(full_prompt)
                     debug_print(f"Successfully received response from Pydantic-AI agent")
                     
                     # Extract the content from the output attribute
@@ -138,9 +175,13 @@ class LLM:
                         if isinstance(output, str):
                             parsed_json = json.loads(output)
                             debug_print(f"Successfully parsed JSON response")
+                            if cache_key:
+                                await database_sync_to_async(llm_cache.put)(cache_key, self.model, parsed_json)
                             return parsed_json
                         elif isinstance(output, dict):
                             # If it's already a dict, return it directly
+                            if cache_key:
+                                await database_sync_to_async(llm_cache.put)(cache_key, self.model, output)
                             return output
                         else:
                             debug_print(f"Unexpected response type: {type(output)}")
@@ -155,7 +196,7 @@ class LLM:
                     if "Connection" in str(connection_err) and attempt < max_retries - 1:
                         retry_delay = retry_delay_base ** attempt
                         debug_print(f"Connection error, retrying in {retry_delay} seconds (attempt {attempt+1}/{max_retries})")
-                        time.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay)
                         continue
                     else:
                         # Re-raise if we've exhausted retries or it's not a connection error
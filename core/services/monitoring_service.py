@@ -31,6 +31,14 @@ class ProcessMonitor:
                 'is_url_only_search': False
             },
             'search_terms': {},
+            'bootstrap': {
+                'stages': {}
+            },
+            'pipeline': {
+                'stages': {},
+                'pool_samples': []
+            },
+            'caches': {},
             'arxiv_search': {
                 'queries_generated': [],
                 'total_papers_found': 0,
@@ -101,6 +109,57 @@ class ProcessMonitor:
         total_terms = sum(len(terms) for terms in search_structure.values())
         print(f"[MONITOR] Generated {total_terms} structured search terms across {len(search_structure)} categories")
     
+    def log_bootstrap_stages(self, timings: Dict[str, tuple]):
+        """Log start offsets and durations of the session bootstrap stages."""
+        if not self.is_active:
+            return
+            
+        self.metrics['bootstrap']['stages'] = {
+            name: {'started_at': offset, 'duration': duration}
+            for name, (offset, duration) in timings.items()
+        }
+        
+        for name, (offset, duration) in sorted(timings.items(), key=lambda item: item[1][0]):
+            print(f"[MONITOR] Bootstrap stage {name}: +{offset:.2f}s, {duration:.2f}s")
+    
+    def log_pipeline_stages(self, stages: Dict[str, Dict[str, Any]]):
+        """Log the process-wide utilization of the paper processing stages."""
+        if not self.is_active:
+            return
+            
+        self.metrics['pipeline']['stages'] = stages
+        
+        for name, stats in stages.items():
+            utilization = f", utilization {stats['utilization']:.0%}" if stats.get('utilization') is not None else ""
+            print(f"[MONITOR] Stage {name}: {stats['items']} items, {stats['mean_seconds']:.2f}s mean, "
+                  f"{stats['concurrency']:.2f} busy on average{utilization}")
+    
+    def log_pool_queue_depths(self, depths: Dict[str, Dict[str, Any]]):
+        """Log a sample of the paper pool's per-session load, showing how it is shared between sessions."""
+        if not self.is_active:
+            return
+            
+        elapsed = (datetime.datetime.now() - self.start_time).total_seconds()
+        self.metrics['pipeline']['pool_samples'].append({'elapsed': elapsed, 'sessions': depths})
+        
+        loads = "; ".join(
+            f"{key[:8]}{' (this)' if key == self.session_id else ''}: {load['queued']} queued, "
+            f"{load['running']} running, {load['dispatched']} dispatched"
+            for key, load in depths.items()
+        )
+        print(f"[MONITOR] Paper pool at +{elapsed:.0f}s - {len(depths)} sessions: {loads}")
+    
+    def log_cache_stats(self, caches: Dict[str, Dict[str, Any]]):
+        """Log the process-wide hit/miss counters of the caches."""
+        if not self.is_active:
+            return
+            
+        self.metrics['caches'] = caches
+        
+        for name, stats in caches.items():
+            print(f"[MONITOR] Cache {name}: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"hit rate {stats['hit_rate']:.0%}")
+    
     def log_arxiv_search(self, queries: List[str], papers_found: int, duration: float):
         """Log arXiv search results."""
         if not self.is_active:
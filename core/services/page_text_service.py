@@ -0,0 +1,126 @@
+"""
+Page text service providing a per-document memo of extracted page text.
+Each page is extracted by PyMuPDF at most once and shared by every stage of
+PDF processing (metadata extraction, page embeddings and chunk extraction).
+"""
+
+import logging
+import threading
+from array import array
+from typing import List, Dict, Any, Optional
+import numpy as np
+from .pdf_parse_service import ParsedPDF
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Pages with fewer characters than this are treated as low-density (figures, scans, blank pages)
+LOW_DENSITY_CHARS = 200
+
+
+class PageTextStore:
+    """Lazily extracts and memoizes the text of each page of a PDF document."""
+
+    def __init__(self, doc=None, parsed: ParsedPDF = None):
+        self._doc = doc
+        self._parsed = parsed
+        self.page_count = parsed.page_count if parsed is not None else len(doc)
+        self._texts: List[Optional[str]] = [None] * self.page_count
+        # PyMuPDF documents are not thread-safe, so extraction is serialized
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_parsed(cls, parsed: ParsedPDF) -> 'PageTextStore':
+        """Create a store backed by text already extracted in the parse pool."""
+        return cls(parsed=parsed)
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Raw PDF metadata of the underlying document."""
+        if self._parsed is not None:
+            return self._parsed.metadata
+        return self._doc.metadata or {}
+
+    @property
+    def is_lazy(self) -> bool:
+        """True while some pages would still be extracted from the open PyMuPDF document on access."""
+        return self._doc is not None and None in self._texts
+
+    def close(self) -> None:
+        """Close the underlying PyMuPDF document, if any."""
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def get(self, index: int) -> str:
+        """Return the text of a page (0-based), extracting it on first access."""
+        text = self._texts[index]
+        if text is None:
+            with self._lock:
+                text = self._texts[index]
+                if text is None:
+                    if self._parsed is not None:
+                        text = self._parsed.page_text(index)
+                    else:
+                        text = self._doc[index].get_text()
+                    self._texts[index] = text
+        return text
+
+    def page_block(self, index: int) -> str:
+        """Return a page's text wrapped in the [PAGE N] markers used in LLM prompts."""
+        return f"[PAGE {index+1}]\n{self.get(index)}\n[END PAGE {index+1}]\n"
+
+    def pages_block(self, start: int, end: int) -> str:
+        """Return the marked-up text of pages start..end (0-based, inclusive)."""
+        return "".join(self.page_block(i) for i in range(start, min(end, self.page_count - 1) + 1))
+
+    def page_lengths(self) -> List[int]:
+        """Return the character count of every page."""
+        return [len(self.get(i)) for i in range(self.page_count)]
+
+    def to_parsed(self) -> ParsedPDF:
+        """Return the text of every page as a ParsedPDF, extracting pages not read yet."""
+        if self._parsed is not None:
+            return self._parsed
+        texts = [self.get(i) for i in range(self.page_count)]
+        offsets = array('q', [0])
+        for text in texts:
+            offsets.append(offsets[-1] + len(text))
+        metadata = {key: value for key, value in self.metadata.items() if value}
+        return ParsedPDF(text="".join(texts), offsets=offsets, metadata=metadata)
+
+    def density_stats(self) -> Dict[str, Any]:
+        """
+        Return text-density statistics for the document.
+
+        Returns:
+            Dictionary with total/mean/median/min/max characters per page and
+            counts of empty and low-density pages
+        """
+        if not self.page_count:
+            return {
+                'total_chars': 0,
+                'mean_chars': 0.0,
+                'median_chars': 0.0,
+                'min_chars': 0,
+                'max_chars': 0,
+                'empty_pages': 0,
+                'low_density_pages': 0
+            }
+
+        lengths = np.array([len(self.get(i).strip()) for i in range(self.page_count)])
+        stats = {
+            'total_chars': int(lengths.sum()),
+            'mean_chars': float(lengths.mean()),
+            'median_chars': float(np.median(lengths)),
+            'min_chars': int(lengths.min()),
+            'max_chars': int(lengths.max()),
+            'empty_pages': int((lengths == 0).sum()),
+            'low_density_pages': int((lengths < LOW_DENSITY_CHARS).sum())
+        }
+        debug_print(f"Page text stats: {stats}")
+        return stats
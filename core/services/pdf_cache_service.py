@@ -0,0 +1,348 @@
+"""
+PDF cache service for reusing downloaded PDFs across research sessions.
+PDFs are stored content-addressed (by SHA-256) on disk and looked up by their
+normalized URL. The cache is bounded by a byte budget with LRU eviction, and
+stale entries are revalidated with ETag / Last-Modified conditional requests.
+The cache directory may be shared by several processes (web server and research
+workers): the JSON index is re-read and rewritten under an fcntl file lock, so every
+process sees the others' entries and the byte budget covers all of them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional
+from django.conf import settings
+from ..utils.debug import debug_print
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Without fcntl (Windows) the index is only shared between the threads of one process
+    FCNTL_AVAILABLE = False
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_cache_key(url: str) -> str:
+    """Normalize a PDF URL so equivalent links share one cache entry."""
+    parsed = urllib.parse.urlsplit(url.strip())
+    scheme = (parsed.scheme or 'https').lower()
+    netloc = parsed.netloc.lower()
+    path = parsed.path.rstrip('/') or '/'
+
+    # arXiv serves the same file for /pdf/<id>, /pdf/<id>.pdf and /abs/<id>
+    if netloc in ('arxiv.org', 'www.arxiv.org', 'export.arxiv.org'):
+        match = re.match(r'^/(?:pdf|abs)/(.+?)(?:\.pdf)?$', path)
+        if match:
+            return f"https://arxiv.org/pdf/{match.group(1)}"
+
+    return urllib.parse.urlunsplit((scheme, netloc, path, parsed.query, ''))
+
+
+class PDFCache:
+    """Thread- and process-safe, size-bounded, content-addressed on-disk PDF cache."""
+
+    INDEX_FILENAME = 'index.json'
+    LOCK_FILENAME = 'index.lock'
+
+    def __init__(self, cache_dir: str, max_bytes: int, revalidate_after: int):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / 'blobs'
+        self.tmp_dir = self.cache_dir / 'tmp'
+        self.index_path = self.cache_dir / self.INDEX_FILENAME
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._lock = threading.RLock()
+        # Blob access times recorded by lookups, written with this process's next index update
+        self._pending_access: Dict[str, float] = {}
+        self._index_stat = None
+
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.cache_dir / self.LOCK_FILENAME, 'a+')
+        with self._locked():
+            self._index = self._prune_missing_blobs(self._read_index())
+            self._save_index()
+
+    # ------------------------------------------------------------------
+    # Index persistence
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _locked(self):
+        """Hold the index lock against other threads and, with fcntl, other processes."""
+        with self._lock:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _stat_index(self):
+        try:
+            stat = self.index_path.stat()
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except OSError:
+            return None
+
+    def _read_index(self) -> Dict[str, Any]:
+        """Read the URL/blob index from disk. Caller must hold the lock."""
+        index = {'urls': {}, 'blobs': {}}
+        self._index_stat = self._stat_index()
+        try:
+            if self._index_stat is not None:
+                with open(self.index_path, 'r') as f:
+                    loaded = json.load(f)
+                index['urls'] = loaded.get('urls', {})
+                index['blobs'] = loaded.get('blobs', {})
+        except Exception as e:
+            logger.warning(f"Could not load PDF cache index, starting empty: {e}")
+        return index
+
+    def _refresh_index(self) -> Dict[str, Any]:
+        """
+        Re-read the index if another process rewrote it, and merge this process's
+        unsaved access times. Caller must hold the lock.
+        """
+        if self._stat_index() != self._index_stat:
+            self._index = self._read_index()
+        blobs = self._index['blobs']
+        for sha256, accessed in self._pending_access.items():
+            if sha256 in blobs:
+                blobs[sha256]['last_access'] = max(blobs[sha256].get('last_access', 0), accessed)
+        return self._index
+
+    def _prune_missing_blobs(self, index: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop entries whose blobs are gone."""
+        index['blobs'] = {
+            sha: info for sha, info in index['blobs'].items()
+            if self._blob_path(sha).exists()
+        }
+        index['urls'] = {
+            url: entry for url, entry in index['urls'].items()
+            if entry.get('sha256') in index['blobs']
+        }
+        return index
+
+    def _save_index(self) -> None:
+        """Atomically write the (refreshed) index to disk. Caller must hold the lock."""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.json')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+            self._index_stat = self._stat_index()
+            self._pending_access.clear()
+        except Exception as e:
+            logger.error(f"Error saving PDF cache index: {e}")
+
+    # ------------------------------------------------------------------
+    # Lookup and storage
+    # ------------------------------------------------------------------
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def owns(self, path: str) -> bool:
+        """Return True if the given file path lives inside the cache."""
+        try:
+            return Path(path).resolve().is_relative_to(self.blob_dir.resolve())
+        except Exception:
+            return False
+
+    def new_temp_path(self) -> str:
+        """Create a temp file on the cache filesystem so stores are a cheap rename."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.pdf')
+        os.close(fd)
+        return tmp_path
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cache entry for a URL (with its blob path), or None on a miss.
+
+        The blob can still be evicted by another process before the caller opens it;
+        callers treat a path that cannot be opened as a miss (see forget).
+        """
+        key = normalize_cache_key(url)
+        with self._locked():
+            index = self._refresh_index()
+            entry = index['urls'].get(key)
+            if not entry:
+                return None
+
+            sha256 = entry['sha256']
+            path = self._blob_path(sha256)
+            if not path.exists():
+                # Blob was removed behind our back - forget the entry
+                index['urls'].pop(key, None)
+                index['blobs'].pop(sha256, None)
+                self._save_index()
+                return None
+
+            self._pending_access[sha256] = time.time()
+            return {**entry, 'path': str(path)}
+
+    def forget(self, url: str) -> None:
+        """Drop a URL whose cached blob could not be opened."""
+        with self._locked():
+            index = self._refresh_index()
+            entry = index['urls'].pop(normalize_cache_key(url), None)
+            if entry and not self._blob_path(entry['sha256']).exists():
+                index['blobs'].pop(entry['sha256'], None)
+            self._save_index()
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Return True if an entry was validated recently enough to skip revalidation."""
+        return time.time() - entry.get('validated_at', 0) < self.revalidate_after
+
+    def mark_validated(self, url: str, etag: str = None, last_modified: str = None) -> None:
+        """Record a successful revalidation (HTTP 304) for a URL."""
+        key = normalize_cache_key(url)
+        with self._locked():
+            entry = self._refresh_index()['urls'].get(key)
+            if not entry:
+                return
+            entry['validated_at'] = time.time()
+            if etag:
+                entry['etag'] = etag
+            if last_modified:
+                entry['last_modified'] = last_modified
+            self._save_index()
+
+    def store(self, url: str, source_path: str, etag: str = None, last_modified: str = None) -> str:
+        """
+        Move a downloaded file into the cache and index it under the URL.
+
+        Args:
+            url: URL the file was downloaded from
+            source_path: Path of the downloaded file (consumed by this call)
+            etag: ETag response header, if any
+            last_modified: Last-Modified response header, if any
+
+        Returns:
+            Path of the cached blob
+        """
+        sha = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+        sha256 = sha.hexdigest()
+        size = os.path.getsize(source_path)
+        blob_path = self._blob_path(sha256)
+
+        with self._locked():
+            index = self._refresh_index()
+            if blob_path.exists():
+                # Same content already cached under another URL
+                os.remove(source_path)
+            else:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source_path, blob_path)
+
+            now = time.time()
+            index['blobs'][sha256] = {'size': size, 'last_access': now}
+            index['urls'][normalize_cache_key(url)] = {
+                'sha256': sha256,
+                'etag': etag,
+                'last_modified': last_modified,
+                'validated_at': now
+            }
+            self._evict(keep=sha256)
+            self._save_index()
+
+        debug_print(f"Cached PDF {url} as {sha256[:12]} ({size / (1024*1024):.2f} MB)")
+        return str(blob_path)
+
+    def store_bytes(self, url: str, data, etag: str = None, last_modified: str = None) -> str:
+        """
+        Write an in-memory PDF into the cache and index it under the URL.
+
+        Args:
+            url: URL the PDF was downloaded from
+            data: PDF content as bytes, bytearray or memoryview
+            etag: ETag response header, if any
+            last_modified: Last-Modified response header, if any
+
+        Returns:
+            Path of the cached blob
+        """
+        temp_path = self.new_temp_path()
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return self.store(url, temp_path, etag=etag, last_modified=last_modified)
+
+    def _evict(self, keep: str = None) -> None:
+        """Evict least recently used blobs until the byte budget is met. Caller must hold the lock (refreshed index)."""
+        blobs = self._index['blobs']
+        total = sum(info['size'] for info in blobs.values())
+        if total <= self.max_bytes:
+            return
+
+        for sha256, info in sorted(blobs.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            try:
+                self._blob_path(sha256).unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"Could not evict cached PDF {sha256}: {e}")
+                continue
+            total -= info['size']
+            del blobs[sha256]
+            self._index['urls'] = {
+                url: entry for url, entry in self._index['urls'].items()
+                if entry['sha256'] != sha256
+            }
+            debug_print(f"Evicted cached PDF {sha256[:12]} ({info['size']} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return basic cache statistics."""
+        with self._locked():
+            index = self._refresh_index()
+            return {
+                'urls': len(index['urls']),
+                'blobs': len(index['blobs']),
+                'bytes': sum(info['size'] for info in index['blobs'].values()),
+                'max_bytes': self.max_bytes
+            }
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> Optional[PDFCache]:
+    """Return the process-wide PDF cache, or None if caching is disabled."""
+    global _pdf_cache
+    if not getattr(settings, 'PDF_CACHE_ENABLED', True):
+        return None
+
+    if _pdf_cache is None:
+        with _pdf_cache_lock:
+            if _pdf_cache is None:
+                try:
+                    _pdf_cache = PDFCache(
+                        getattr(settings, 'PDF_CACHE_DIR', os.path.join(settings.BASE_DIR, 'pdf_cache')),
+                        getattr(settings, 'PDF_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024),
+                        getattr(settings, 'PDF_CACHE_REVALIDATE_AFTER', 24 * 60 * 60)
+                    )
+                except Exception as e:
+                    logger.error(f"Could not initialize PDF cache, caching disabled: {e}")
+                    return None
+    return _pdf_cache
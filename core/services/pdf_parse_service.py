@@ -0,0 +1,133 @@
+"""
+PDF parse service running PyMuPDF page extraction in a process pool.
+Parsing is CPU-bound and holds the GIL, so it is moved out of the paper worker
+threads into separate processes. Results come back compactly as one joined text
+buffer plus a page offsets array, which keeps pickling cheap.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import threading
+import concurrent.futures
+from array import array
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+from django.conf import settings
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class InvalidPDFError(ValueError):
+    """Raised when the downloaded bytes are not a valid PDF document."""
+
+
+@dataclass
+class ParsedPDF:
+    """Per-page text of a PDF stored as one string plus page boundary offsets."""
+    text: str
+    offsets: array  # page_count + 1 boundaries into text
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def page_text(self, index: int) -> str:
+        """Return the text of a page (0-based)."""
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+
+def parse_pdf(data: bytes = None, path: str = None) -> ParsedPDF:
+    """
+    Extract the text of every page of a PDF.
+
+    Runs inside pool worker processes, so it only depends on PyMuPDF.
+
+    Args:
+        data: PDF bytes (used when the PDF is held in memory)
+        path: Path of a PDF file on disk (preferred - avoids sending bytes to the worker)
+
+    Returns:
+        ParsedPDF with joined page text, page offsets and raw PDF metadata
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(path) if path else fitz.open(stream=data, filetype="pdf")
+    try:
+        if not doc.is_pdf:
+            raise InvalidPDFError("Not a valid PDF file")
+
+        texts = [page.get_text() for page in doc]
+        offsets = array('q', [0])
+        position = 0
+        for text in texts:
+            position += len(text)
+            offsets.append(position)
+
+        metadata = {key: value for key, value in (doc.metadata or {}).items() if value}
+        return ParsedPDF(text="".join(texts), offsets=offsets, metadata=metadata)
+    finally:
+        doc.close()
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[concurrent.futures.ProcessPoolExecutor]:
+    """Return the process-wide parse pool, or None if process parsing is disabled."""
+    global _parse_pool
+    processes = getattr(settings, 'PDF_PARSE_PROCESSES', 2)
+    if not processes:
+        return None
+
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                # spawn avoids forking a process that already runs worker threads
+                _parse_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                atexit.register(_parse_pool.shutdown, wait=False, cancel_futures=True)
+                debug_print(f"Started PDF parse pool with {processes} processes")
+    return _parse_pool
+
+
+def _reset_parse_pool() -> None:
+    """Drop a broken pool so the next call starts a fresh one."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def parse_pdf_in_pool(data: bytes = None, path: str = None, timeout: float = None) -> ParsedPDF:
+    """
+    Parse a PDF in the process pool, falling back to the calling thread if no pool is available.
+
+    Args:
+        data: PDF bytes
+        path: Path of a PDF file on disk
+        timeout: Maximum seconds to wait for the worker
+
+    Returns:
+        ParsedPDF result
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return parse_pdf(data=data, path=path)
+
+    try:
+        future = pool.submit(parse_pdf, data, path)
+        return future.result(timeout=timeout)
+    except BrokenProcessPool as e:
+        # A worker died (e.g. OOM on a huge PDF) - restart the pool and parse locally this time
+        logger.error(f"PDF parse pool broken, restarting: {e}")
+        _reset_parse_pool()
+        return parse_pdf(data=data, path=path)
@@ -2,27 +2,55 @@
 PDF service for processing PDFs and extracting information.
 """
 
+import asyncio
 import logging
 import os
 import tempfile
 import requests
 import re
-import hashlib
 import mimetypes
+import mmap
 import time
-from typing import List, Dict, Any
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
 import fitz  # PyMuPDF
+import numpy as np
+from channels.db import database_sync_to_async
 from tenacity import retry, stop_after_attempt, wait_exponential
 from django.conf import settings
+from django.db import connection
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
-from .embedding_service import get_embedding, validate_note_relevance, calculate_similarity, get_google_embeddings_batch, calculate_cosine_similarities
+from .document_store_service import (
+    document_exists, document_metadata, document_page_store, find_document,
+    load_page_embeddings, save_document, save_document_metadata, save_page_embeddings
+)
+from .embedding_service import (
+    GOOGLE_EMBEDDING_MODEL, calculate_similarity, calculate_cosine_similarities, cosine_scores,
+    get_embedding_async, get_google_embeddings_batch_async, get_google_query_embedding_async,
+    validate_note_relevance_async
+)
 from .llm_service import LLM
+from .pdf_cache_service import get_pdf_cache
+from .page_text_service import PageTextStore
+from .pdf_parse_service import InvalidPDFError, get_parse_pool, parse_pdf_in_pool
+from ..utils.async_runtime import run_sync
 from ..utils.debug import debug_print
+from ..utils.stage_stats import stage_stats
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Prefetched PDFs (see prefetch_pdf): (session id, normalized URL) -> Future of a load_pdf() result.
+# Keyed per session so sessions sharing a paper never claim or discard each other's prefetch.
+_prefetched: "OrderedDict[tuple, concurrent.futures.Future]" = OrderedDict()
+_prefetch_lock = threading.Lock()
+_load_executor = None
+
+# Largest PDF that is downloaded at all
+MAX_PDF_BYTES = 50 * 1024 * 1024  # 50 MB
 
 
 def normalize_url(url: str) -> str:
@@ -33,63 +61,526 @@ def normalize_url(url: str) -> str:
         # Don't add .pdf - arXiv handles URLs correctly without extension
     return url
 
+class PDFSource:
+    """
+    A downloaded PDF held either in an in-memory buffer or memory-mapped from disk.
+    PyMuPDF opens both directly via fitz.open(stream=...), so no temp file is read back.
+    """
+    
+    def __init__(self, data: memoryview, path: str = None, owns_file: bool = False, mapped=None, file_handle=None):
+        self.data = data
+        # Size of the PDF, kept after the buffer is released
+        self.nbytes = data.nbytes if data is not None else 0
+        self.path = path
+        self.owns_file = owns_file
+        self._mapped = mapped
+        self._file_handle = file_handle
+    
+    @classmethod
+    def from_file(cls, path: str, owns_file: bool = False) -> 'PDFSource':
+        """Memory-map a PDF file on disk."""
+        file_handle = open(path, 'rb')
+        try:
+            mapped = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            file_handle.close()
+            raise
+        return cls(memoryview(mapped), path=path, owns_file=owns_file, mapped=mapped, file_handle=file_handle)
+    
+    @property
+    def size(self) -> int:
+        return self.data.nbytes if self.data is not None else 0
+    
+    @property
+    def in_memory(self) -> bool:
+        return self._mapped is None
+    
+    def open_document(self):
+        """Open the PDF with PyMuPDF without copying the buffer."""
+        return fitz.open(stream=self.data, filetype="pdf")
+    
+    def close(self) -> None:
+        """Release the buffer / mapping and remove the file if it is a temp file."""
+        try:
+            if self.data is not None:
+                self.data.release()
+        except BufferError:
+            # PyMuPDF still references the buffer - it is freed with the document
+            pass
+        self.data = None
+        
+        try:
+            if self._mapped is not None:
+                self._mapped.close()
+        except BufferError:
+            pass
+        self._mapped = None
+        
+        if self._file_handle is not None:
+            self._file_handle.close()
+            self._file_handle = None
+        
+        if self.owns_file:
+            release_pdf(self.path)
+            self.owns_file = False
+
+def _read_response_body(response, expected_size: int, max_size: int, in_memory_limit: int, temp_path_factory):
+    """
+    Stream a response body into a single preallocated buffer, spilling to disk if it grows too large.
+    
+    Args:
+        response: Streaming requests response
+        expected_size: Content-Length if known, else None
+        max_size: Hard cap on the body size
+        in_memory_limit: Largest body kept in memory
+        temp_path_factory: Callable returning a temp file path for spilled bodies
+        
+    Returns:
+        Tuple of (buffer, length, spill_path) - exactly one of buffer or spill_path is set
+    """
+    if expected_size and expected_size <= in_memory_limit:
+        capacity = expected_size
+    else:
+        capacity = min(1024 * 1024, in_memory_limit)
+    
+    buffer = bytearray(capacity)
+    length = 0
+    spill_file = None
+    spill_path = None
+    
+    try:
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if not chunk:
+                continue
+            chunk_length = len(chunk)
+            if length + chunk_length > max_size:
+                raise ValueError(f"PDF exceeds maximum size of {max_size / (1024*1024):.0f} MB")
+            
+            if spill_file is not None:
+                spill_file.write(chunk)
+            elif length + chunk_length <= len(buffer):
+                buffer[length:length + chunk_length] = chunk
+            elif length + chunk_length <= in_memory_limit:
+                # Unknown or wrong Content-Length - grow the buffer geometrically
+                new_capacity = min(max(len(buffer) * 2, length + chunk_length), in_memory_limit)
+                buffer.extend(bytes(new_capacity - len(buffer)))
+                buffer[length:length + chunk_length] = chunk
+            else:
+                # Too large to keep in memory - continue on disk and memory-map later
+                spill_path = temp_path_factory()
+                spill_file = open(spill_path, 'wb')
+                spill_file.write(memoryview(buffer)[:length])
+                spill_file.write(chunk)
+                buffer = None
+            length += chunk_length
+    except Exception:
+        if spill_file is not None:
+            spill_file.close()
+            release_pdf(spill_path)
+        raise
+    
+    if spill_file is not None:
+        spill_file.close()
+        return None, length, spill_path
+    
+    return buffer, length, None
+
+def _new_spill_path() -> str:
+    """Create a temp file path for PDFs too large to keep in memory."""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    temp_file.close()
+    return temp_file.name
+
+def _download_headers(cached_entry: Dict[str, Any] = None) -> Dict[str, str]:
+    """Request headers of a PDF download, conditional when a cached copy is revalidated."""
+    headers = {
+        'User-Agent': 'ResearchAssistantBot/1.0 (Educational Research Tool; mailto:research@example.com)',
+        'Accept': 'application/pdf'
+    }
+    if cached_entry:
+        # Revalidate the cached copy instead of downloading it again
+        if cached_entry.get('etag'):
+            headers['If-None-Match'] = cached_entry['etag']
+        if cached_entry.get('last_modified'):
+            headers['If-Modified-Since'] = cached_entry['last_modified']
+    return headers
+
+def _check_head_response(url: str, response_headers) -> bool:
+    """
+    Pre-download checks on the headers of a HEAD response.
+    
+    Returns:
+        False if the PDF is too large to download
+    """
+    content_type = response_headers.get('Content-Type', '')
+    if not content_type.lower().startswith('application/pdf'):
+        logger.warning(f"URL does not appear to be a PDF: {url} (Content-Type: {content_type})")
+        debug_print(f"WARNING: URL content type is {content_type}, not application/pdf")
+        # Still proceed, but with warning
+    
+    # Add file size limit
+    content_length = response_headers.get('Content-Length')
+    if content_length and int(content_length) > MAX_PDF_BYTES:
+        logger.error(f"PDF too large: {url} ({int(content_length) / (1024*1024):.2f} MB)")
+        debug_print(f"ERROR: PDF too large: {int(content_length) / (1024*1024):.2f} MB (max: 50 MB)")
+        return False
+    return True
+
+def _expected_body_size(response_headers) -> int:
+    """Content-Length of a response, trusted only for identity-encoded bodies (None if unknown)."""
+    if response_headers.get('Content-Encoding'):
+        return None
+    try:
+        return int(response_headers.get('Content-Length') or 0) or None
+    except ValueError:
+        return None
+
+def _finish_download(url: str, cache, buffer, length: int, spill_path: str, etag: str, last_modified: str) -> PDFSource:
+    """Store a downloaded body in the PDF cache (best effort) and wrap it in a PDFSource."""
+    if buffer is not None:
+        data = memoryview(buffer)[:length]
+        if cache:
+            try:
+                cache.store_bytes(url, data, etag=etag, last_modified=last_modified)
+            except Exception as e:
+                # Caching is best effort
+                logger.warning(f"Could not cache PDF {url}: {e}")
+        debug_print(f"Downloaded PDF into memory ({length / (1024*1024):.2f} MB)")
+        return PDFSource(data)
+    
+    debug_print(f"PDF larger than in-memory limit ({length / (1024*1024):.2f} MB), memory-mapping from disk")
+    if cache:
+        try:
+            cached_path = cache.store(url, spill_path, etag=etag, last_modified=last_modified)
+            return PDFSource.from_file(cached_path)
+        except Exception as e:
+            # Caching is best effort - fall back to the plain temp file
+            logger.warning(f"Could not cache PDF {url}: {e}")
+    return PDFSource.from_file(spill_path, owns_file=True)
+
+def _open_cached(cache, url: str, cached_entry: Dict[str, Any]) -> Optional[PDFSource]:
+    """
+    Memory-map a cached PDF found by cache.lookup.
+    
+    Returns:
+        The PDFSource, or None (and the URL is dropped from the cache) if another
+        process evicted the blob since the lookup
+    """
+    try:
+        return PDFSource.from_file(cached_entry['path'])
+    except FileNotFoundError:
+        debug_print(f"Cached PDF was evicted before it could be opened: {url}")
+        cache.forget(url)
+        return None
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-def download_pdf(url: str) -> str:
-    """Download a PDF from a URL and return the local path."""
+def download_pdf(url: str) -> PDFSource:
+    """
+    Download a PDF from a URL and return it as a PDFSource.
+    
+    PDFs up to PDF_IN_MEMORY_MAX_BYTES are streamed into one preallocated buffer and
+    never read back from disk; larger ones are written out and memory-mapped.
+    Uses the on-disk PDF cache when enabled: fresh entries are memory-mapped without
+    any network access, stale entries are revalidated with a conditional request,
+    and new downloads are stored in the cache for later sessions.
+    """
     debug_print(f"Downloading PDF from: {url}")
     
-    # Add delay to respect arXiv rate limits (1 request per 3 seconds)
-    # Increased to 2 seconds due to parallel workers
-    time.sleep(1)
+    cache = get_pdf_cache()
+    cached_entry = cache.lookup(url) if cache else None
+    
+    if cached_entry and cache.is_fresh(cached_entry):
+        pdf_source = _open_cached(cache, url, cached_entry)
+        if pdf_source is not None:
+            debug_print(f"PDF cache hit (fresh): {cached_entry['path']}")
+            return pdf_source
+        cached_entry = None
     
     try:
-        headers = {
-            'User-Agent': 'ResearchAssistantBot/1.0 (Educational Research Tool; mailto:research@example.com)',
-            'Accept': 'application/pdf'
-        }
+        headers = _download_headers(cached_entry)
+        in_memory_limit = getattr(settings, 'PDF_IN_MEMORY_MAX_BYTES', 16 * 1024 * 1024)
         
-        # Add content-type validation
-        try:
-            response = requests.head(url, headers=headers, timeout=10)
-            content_type = response.headers.get('Content-Type', '')
-            if not content_type.lower().startswith('application/pdf'):
-                logger.warning(f"URL does not appear to be a PDF: {url} (Content-Type: {content_type})")
-                debug_print(f"WARNING: URL content type is {content_type}, not application/pdf")
-                # Still proceed, but with warning
+        if not cached_entry:
+            # Add delay to respect arXiv rate limits, only needed for real downloads
+            time.sleep(1)
             
-            # Add file size limit
-            max_size = 50 * 1024 * 1024  # 50 MB
-            content_length = response.headers.get('Content-Length')
-            if content_length and int(content_length) > max_size:
-                logger.error(f"PDF too large: {url} ({int(content_length) / (1024*1024):.2f} MB)")
-                debug_print(f"ERROR: PDF too large: {int(content_length) / (1024*1024):.2f} MB (max: 50 MB)")
-                return None
-        except Exception as e:
-            logger.warning(f"Could not perform pre-download checks: {e}")
-            debug_print(f"WARNING: Pre-download checks failed: {str(e)}")
-            # Continue with download attempt
+            # Add content-type validation
+            try:
+                if not _check_head_response(url, requests.head(url, headers=headers, timeout=10).headers):
+                    return None
+            except Exception as e:
+                logger.warning(f"Could not perform pre-download checks: {e}")
+                debug_print(f"WARNING: Pre-download checks failed: {str(e)}")
+                # Continue with download attempt
         
         # Get the file
         response = requests.get(url, headers=headers, timeout=30, stream=True)
-        response.raise_for_status()
         
-        # Use a more secure temp file with hash-based naming
-        file_hash = hashlib.md5(url.encode()).hexdigest()
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file_hash}.pdf")
+        if cached_entry and response.status_code == 304:
+            response.close()
+            cache.mark_validated(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            debug_print(f"PDF cache hit (revalidated): {cached_entry['path']}")
+            # Evicted by another process since the lookup: download it again
+            return _open_cached(cache, url, cached_entry) or download_pdf(url)
         
-        # Stream the content to the file
-        for chunk in response.iter_content(chunk_size=8192):
-            temp_file.write(chunk)
+        response.raise_for_status()
         
-        temp_file.close()
-        debug_print(f"Successfully downloaded PDF to: {temp_file.name}")
-        return temp_file.name
+        buffer, length, spill_path = _read_response_body(
+            response,
+            _expected_body_size(response.headers),
+            MAX_PDF_BYTES,
+            in_memory_limit,
+            cache.new_temp_path if cache else _new_spill_path
+        )
+        return _finish_download(
+            url, cache, buffer, length, spill_path,
+            response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
     
     except Exception as e:
         logger.error(f"Failed to download PDF {url}: {e}")
         debug_print(f"ERROR downloading PDF: {str(e)}")
+        if cached_entry:
+            # Serve the stale copy rather than failing the paper
+            debug_print(f"Revalidation failed, using stale cached PDF: {cached_entry['path']}")
+            return _open_cached(cache, url, cached_entry)
         return None
 
+def release_pdf(pdf_path: str) -> None:
+    """Remove a downloaded PDF file unless it belongs to the PDF cache."""
+    if not pdf_path or not os.path.exists(pdf_path):
+        return
+    cache = get_pdf_cache()
+    if cache and cache.owns(pdf_path):
+        return
+    try:
+        os.remove(pdf_path)
+        debug_print(f"Removed temporary file: {pdf_path}")
+    except Exception as e:
+        debug_print(f"Failed to remove temporary file: {str(e)}")
+
+def open_page_store(pdf_source: PDFSource) -> PageTextStore:
+    """
+    Parse a downloaded PDF into a PageTextStore.
+    
+    With the parse process pool enabled, every page is extracted in a worker process
+    (file-backed sources are passed by path, in-memory ones as bytes). Otherwise the
+    document is opened in this thread and pages are extracted lazily on first use.
+    Raises InvalidPDFError if the content is not a PDF.
+    """
+    if get_parse_pool() is not None:
+        if pdf_source.in_memory:
+            parsed = parse_pdf_in_pool(data=bytes(pdf_source.data))
+        else:
+            parsed = parse_pdf_in_pool(path=pdf_source.path)
+        debug_print(f"Parsed {parsed.page_count} pages in parse pool ({len(parsed.text)} characters)")
+        return PageTextStore.from_parsed(parsed)
+    
+    doc = pdf_source.open_document()
+    if not doc.is_pdf:
+        doc.close()
+        raise InvalidPDFError("Not a valid PDF file")
+    return PageTextStore(doc)
+
+def _load_error(message: str, title: str) -> Dict[str, Any]:
+    """Error result of a paper whose PDF could not be loaded."""
+    return {
+        'status': 'error',
+        'error_message': message,
+        'title': title,
+        'authors': [],
+        'harvard_reference': '',
+        'notes': []
+    }
+
+def load_pdf(pdf_url: str) -> tuple:
+    """
+    Download and parse a PDF (URL already normalized).
+    
+    Returns:
+        Tuple of (pdf_source, page_store, error_result); on failure only error_result
+        is set, holding the error result process_pdf returns for the paper
+    """
+    with stage_stats('download').track():
+        pdf_source = download_pdf(pdf_url)
+    
+    if not pdf_source:
+        debug_print("Failed to download PDF")
+        return None, None, _load_error('Failed to download PDF', 'Download Error')
+    
+    # Open PDF and extract metadata
+    debug_print(f"Opening PDF ({pdf_source.size / (1024*1024):.2f} MB, {'in memory' if pdf_source.in_memory else 'memory-mapped'})")
+    
+    # Parse and verify it's a valid PDF
+    try:
+        with stage_stats('parse').track():
+            page_store = open_page_store(pdf_source)
+    except InvalidPDFError:
+        debug_print(f"ERROR: Not a valid PDF file: {pdf_url}")
+        pdf_source.close()
+        return None, None, _load_error('Not a valid PDF file', 'Invalid PDF')
+    except Exception as e:
+        debug_print(f"ERROR: Could not open as PDF: {str(e)}")
+        pdf_source.close()
+        return None, None, _load_error(f'Could not open as PDF: {str(e)}', 'PDF Error')
+    
+    if get_parse_pool() is not None:
+        # Text is fully extracted - the PDF bytes are no longer needed
+        pdf_source.close()
+    
+    return pdf_source, page_store, None
+
+async def load_pdf_async(pdf_url: str) -> tuple:
+    """
+    load_pdf for code running on the event loop: loading runs in a worker thread.
+    
+    Returns:
+        Tuple of (pdf_source, page_store, error_result) as load_pdf
+    """
+    return await _extract_remaining_pages(await asyncio.to_thread(load_pdf, pdf_url))
+
+async def _extract_remaining_pages(loaded):
+    """
+    Extract in a worker thread the pages a load_pdf() result left to lazy extraction
+    (no parse pool), so its page store can be read on the event loop.
+    """
+    if loaded and not loaded[2] and loaded[1].is_lazy:
+        await asyncio.to_thread(loaded[1].page_lengths)
+    return loaded
+
+def _register_prefetch(pdf_url: str, session_id: str, limit_in_flight: bool = False):
+    """
+    Reserve a prefetch slot for a session's URL.
+    
+    The oldest finished prefetches nobody picked up are dropped beyond
+    PDF_PREFETCH_MAX_PAPERS. With limit_in_flight, no slot is reserved while that many
+    prefetches are still loading (backpressure for lookahead prefetching).
+    
+    Returns:
+        Tuple of (prefetch key, new Future or None if the URL is already prefetched
+        for the session or no slot is free), or None for an invalid URL
+    """
+    try:
+        URLValidator()(pdf_url)
+    except ValidationError:
+        return None
+    
+    key = (session_id, normalize_url(pdf_url))
+    max_entries = getattr(settings, 'PDF_PREFETCH_MAX_PAPERS', 8)
+    with _prefetch_lock:
+        if key in _prefetched:
+            return key, None
+        finished = [k for k, f in _prefetched.items() if f.done()]
+        if limit_in_flight and len(_prefetched) - len(finished) >= max_entries:
+            return key, None
+        future = concurrent.futures.Future()
+        _prefetched[key] = future
+        for k in finished[:max(0, len(_prefetched) - max_entries)]:
+            _close_loaded_pdf(_prefetched.pop(k).result())
+    return key, future
+
+def _run_prefetch(pdf_url: str, future: concurrent.futures.Future) -> bool:
+    """Load a registered prefetch and publish the result to its Future."""
+    if document_exists(pdf_url):
+        # Stored by an earlier session - process_pdf reads it from the document store
+        future.set_result(None)
+        return True
+    try:
+        loaded = load_pdf(pdf_url)
+    except Exception as e:
+        logger.error(f"Error prefetching PDF {pdf_url}: {e}")
+        loaded = None
+    future.set_result(loaded)
+    debug_print(f"Prefetched PDF {pdf_url}: {'ok' if loaded and not loaded[2] else 'failed'}")
+    return bool(loaded and not loaded[2])
+
+def prefetch_pdf(pdf_url: str, session_id: str) -> bool:
+    """
+    Download and parse a PDF ahead of processing, e.g. a session's direct URLs while its
+    search questions are still being generated. process_pdf picks up the result (waiting
+    for it if the prefetch is still running) instead of downloading the PDF again.
+    
+    Args:
+        pdf_url: PDF URL
+        session_id: Session the paper is processed for; only that session claims the result
+        
+    Returns:
+        True if the PDF was loaded successfully
+    """
+    registered = _register_prefetch(pdf_url, session_id)
+    if registered is None:
+        return False
+    key, future = registered
+    if future is None:
+        return True
+    return _run_prefetch(key[1], future)
+
+def _get_load_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the process-wide executor of the download/parse stage."""
+    global _load_executor
+    if _load_executor is None:
+        with _prefetch_lock:
+            if _load_executor is None:
+                _load_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PDF_LOAD_WORKERS', 4),
+                    thread_name_prefix="pdf-load"
+                )
+    return _load_executor
+
+def _run_scheduled_prefetch(pdf_url: str, future: concurrent.futures.Future) -> bool:
+    try:
+        with stage_stats('prefetch', getattr(settings, 'PDF_LOAD_WORKERS', 4)).track():
+            return _run_prefetch(pdf_url, future)
+    finally:
+        # The document store lookup opens a DB connection on this executor thread - release it
+        connection.close()
+
+def schedule_prefetch(pdf_url: str, session_id: str) -> bool:
+    """
+    Queue a PDF for download and parsing on the download/parse stage's own executor
+    (PDF_LOAD_WORKERS threads), so it is ready by the time a paper worker reaches it.
+    
+    Returns:
+        False if the prefetch buffer is full (PDF_PREFETCH_MAX_PAPERS still loading),
+        True if the PDF is queued or already prefetched
+    """
+    registered = _register_prefetch(pdf_url, session_id, limit_in_flight=True)
+    if registered is None:
+        return True  # Invalid URLs fail later in process_pdf; nothing to prefetch
+    key, future = registered
+    if future is None:
+        return key in _prefetched
+    _get_load_executor().submit(_run_scheduled_prefetch, key[1], future)
+    return True
+
+async def take_prefetched_pdf_async(pdf_url: str, session_id: str):
+    """
+    Claim a session's prefetched result for a (normalized) URL, awaiting it if it is still loading.
+    
+    Returns:
+        load_pdf() result tuple, or None if the URL was not prefetched (or prefetching failed)
+    """
+    with _prefetch_lock:
+        future = _prefetched.pop((session_id, pdf_url), None)
+    if future is None:
+        return None
+    debug_print(f"Using prefetched PDF: {pdf_url}")
+    return await _extract_remaining_pages(await asyncio.wrap_future(future))
+
+def discard_prefetched_pdf(pdf_url: str, session_id: str) -> None:
+    """Drop a session's prefetch of a (normalized) URL that is no longer needed, releasing it once loaded."""
+    with _prefetch_lock:
+        future = _prefetched.pop((session_id, pdf_url), None)
+    if future is not None:
+        future.add_done_callback(lambda done: _close_loaded_pdf(done.result()))
+
+def _close_loaded_pdf(loaded) -> None:
+    """Release an unclaimed load_pdf() result."""
+    if loaded and not loaded[2]:
+        pdf_source, page_store, _ = loaded
+        page_store.close()
+        pdf_source.close()
+
 def get_metadata(doc) -> Dict[str, Any]:
     """Extract metadata from a PDF document."""
     debug_print("Extracting PDF metadata")
@@ -105,29 +596,13 @@ def get_metadata(doc) -> Dict[str, Any]:
         debug_print(f"ERROR extracting metadata: {str(e)}")
         return {}
         
-def extract_enhanced_metadata_with_llm(doc, max_pages: int = 3) -> Dict[str, Any]:
-    """
-    Extract enhanced metadata from the first few pages of a PDF using LLM.
-    This provides better title, authors, year, and generates a Harvard reference and summary.
-    """
-    debug_print(f"Extracting enhanced metadata using LLM from first {max_pages} pages")
+def _metadata_request(page_store: PageTextStore, max_pages: int) -> tuple:
+    """Return the (prompt, output schema, system prompt) of the metadata extraction LLM call."""
+    # Extract text from first few pages
+    page_count = min(max_pages, len(page_store))
+    first_pages_text = page_store.pages_block(0, page_count - 1)
     
-    try:
-        # Get basic metadata first (as fallback)
-        basic_metadata = get_metadata(doc)
-        
-        # Extract text from first few pages
-        page_count = min(max_pages, len(doc))
-        first_pages_text = ""
-        
-        for i in range(page_count):
-            page_text = doc[i].get_text()
-            first_pages_text += f"[PAGE {i+1}]\n{page_text}\n[END PAGE {i+1}]\n"
-        
-        # Prepare prompt for LLM
-        llm = LLM(model="openai:gpt-4o")
-        
-        system_prompt = """
+    system_prompt = """
         You are an academic metadata extraction assistant. Extract the following information from the first few pages of an academic paper:
         1. Title: The full title of the paper
         2. Authors: The complete list of authors
@@ -137,68 +612,87 @@ def extract_enhanced_metadata_with_llm(doc, max_pages: int = 3) -> Dict[str, Any
         Return ONLY a JSON object with these keys: title, authors (as array), year, summary. 
         If you cannot determine a field, use null for that field.
         """
-        
-        # Define output schema
-        output_schema = {
-            "type": "object",
-            "properties": {
-                "title": {"type": "string"},
-                "authors": {"type": "array", "items": {"type": "string"}},
-                "year": {"type": ["string", "number", "null"]},
-                "summary": {"type": "string"}
-            }
+    
+    # Define output schema
+    output_schema = {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "authors": {"type": "array", "items": {"type": "string"}},
+            "year": {"type": ["string", "number", "null"]},
+            "summary": {"type": "string"}
         }
+    }
+    return first_pages_text, output_schema, system_prompt
+
+def _enhanced_metadata(result: Dict[str, Any], basic_metadata: Dict[str, Any], total_pages: int) -> Dict[str, Any]:
+    """Build the enhanced metadata, including the Harvard reference, from the LLM extraction result."""
+    title = result.get('title') or basic_metadata.get('title', 'Unknown Document')
+    authors = result.get('authors') or []
+    year = str(result.get('year') or "Unknown")
+    summary = result.get('summary') or ""
+    
+    # Format author string for Harvard reference
+    if len(authors) == 1:
+        author_str = authors[0]
+    elif len(authors) == 2:
+        author_str = f"{authors[0]} and {authors[1]}"
+    elif len(authors) > 2:
+        author_str = f"{authors[0]} et al."
+    else:
+        author_str = "Unknown"
+    
+    # Create Harvard reference
+    harvard_ref = f"{author_str} ({year}). {title}."
+    
+    return {
+        'title': title,
+        'authors': authors,
+        'year': year,
+        'summary': summary,
+        'harvard_reference': harvard_ref,
+        'basic_metadata': basic_metadata,  # Keep the original metadata as fallback
+        'total_pages': total_pages,
+        'llm_extracted': True
+    }
+
+def _basic_metadata_fallback(page_store: PageTextStore) -> Dict[str, Any]:
+    """Enhanced metadata built from the PDF's own metadata when the LLM extraction failed."""
+    basic_metadata = get_metadata(page_store)
+    
+    return {
+        'title': basic_metadata.get('title', 'Unknown Document'),
+        'authors': basic_metadata.get('author', '').split(', ') if basic_metadata.get('author') else [],
+        'year': 'Unknown',
+        'summary': '',
+        'harvard_reference': format_harvard_reference(basic_metadata),
+        'basic_metadata': basic_metadata,
+        'total_pages': len(page_store),
+        'llm_extracted': False
+    }
+
+async def extract_enhanced_metadata_with_llm_async(page_store: PageTextStore, max_pages: int = 3) -> Dict[str, Any]:
+    """
+    Extract enhanced metadata from the first few pages of a PDF using LLM.
+    This provides better title, authors, year, and generates a Harvard reference and summary.
+    The page store must already hold the extracted text (see load_pdf_async).
+    """
+    debug_print(f"Extracting enhanced metadata using LLM from first {max_pages} pages")
+    
+    try:
+        basic_metadata = get_metadata(page_store)
+        prompt, output_schema, system_prompt = _metadata_request(page_store, max_pages)
         
-        # Call LLM for structured extraction
-        result = llm.structured_output(first_pages_text, output_schema, system_prompt)
+        llm = LLM(model="openai:gpt-4o")
+        result = await llm.structured_output_async(prompt, output_schema, system_prompt)
         debug_print(f"LLM extraction result: {result}")
         
-        # Generate Harvard reference from the extracted metadata
-        title = result.get('title') or basic_metadata.get('title', 'Unknown Document')
-        authors = result.get('authors') or []
-        year = str(result.get('year') or "Unknown")
-        summary = result.get('summary') or ""
-        
-        # Format author string for Harvard reference
-        if len(authors) == 1:
-            author_str = authors[0]
-        elif len(authors) == 2:
-            author_str = f"{authors[0]} and {authors[1]}"
-        elif len(authors) > 2:
-            author_str = f"{authors[0]} et al."
-        else:
-            author_str = "Unknown"
-        
-        # Create Harvard reference
-        harvard_ref = f"{author_str} ({year}). {title}."
-        
-        # Return enhanced metadata
-        return {
-            'title': title,
-            'authors': authors,
-            'year': year,
-            'summary': summary,
-            'harvard_reference': harvard_ref,
-            'basic_metadata': basic_metadata,  # Keep the original metadata as fallback
-            'total_pages': len(doc)
-        }
+        return _enhanced_metadata(result, basic_metadata, len(page_store))
         
     except Exception as e:
         logger.error(f"Error extracting enhanced metadata: {e}")
         debug_print(f"ERROR extracting enhanced metadata: {str(e)}")
-        
-        # Fall back to basic metadata
-        basic_metadata = get_metadata(doc)
-        
-        return {
-            'title': basic_metadata.get('title', 'Unknown Document'),
-            'authors': basic_metadata.get('author', '').split(', ') if basic_metadata.get('author') else [],
-            'year': 'Unknown',
-            'summary': '',
-            'harvard_reference': format_harvard_reference(basic_metadata),
-            'basic_metadata': basic_metadata,
-            'total_pages': len(doc)
-        }
+        return _basic_metadata_fallback(page_store)
 
 def format_harvard_reference(metadata: Dict[str, Any]) -> str:
     """Format a Harvard-style reference from metadata."""
@@ -243,16 +737,8 @@ def format_harvard_reference(metadata: Dict[str, Any]) -> str:
 
 
 
-def extract_information_from_text(text: str, search_terms:List[str], queries: List[str], extract_citations: bool = True) -> List[Dict[str, Any]]:
-    """Extract information from text using LLM."""
-    debug_print(f"Extracting information from text of length: {len(text)}")
-    if not text or not queries:
-        debug_print("No text or queries provided")
-        return []
-    
-    # Initialize LLM
-    llm = LLM(model='openai:gpt-4o-mini')
-    
+def _extraction_request(text: str, search_terms: List[str], queries: List[str], extract_citations: bool) -> tuple:
+    """Return the (prompt, output schema, system prompt) of the information extraction LLM call."""
     # Create system prompt
     system_prompt = f"""
 
@@ -332,39 +818,51 @@ Remember: Academic papers are full of useful information even if they don't prov
             "required": ["content", "page_number", "matches_topic", "justification"]
         }
     }
+    return page_text, output_schema, system_prompt
+
+def _extracted_items(result) -> List[Dict[str, Any]]:
+    """Extracted items of an extraction response, accounting for the formats the LLM might return."""
+    # Enhanced debugging
+    debug_print(f"LLM raw response type: {type(result)}")
+    if isinstance(result, dict):
+        debug_print(f"Response keys: {result.keys()}")
+    
+    extracted_items = []
+    
+    if isinstance(result, list):
+        # Direct array response
+        extracted_items = result
+    elif isinstance(result, dict):
+        # Check for different possible keys - handle {"type":"array","items":[...]}
+        if "items" in result:
+            extracted_items = result["items"]
+        else:
+            # Try to find any array in the response
+            for key, value in result.items():
+                if isinstance(value, list):
+                    extracted_items = value
+                    break
+    
+    debug_print(f"Extracted {len(extracted_items)} items from text")
+    if len(extracted_items) == 0:
+        debug_print("WARNING: LLM returned empty list")
+    
+    return extracted_items
+
+async def extract_information_from_text_async(text: str, search_terms: List[str], queries: List[str], extract_citations: bool = True) -> List[Dict[str, Any]]:
+    """Extract information from text using LLM, without blocking the event loop."""
+    debug_print(f"Extracting information from text of length: {len(text)}")
+    if not text or not queries:
+        debug_print("No text or queries provided")
+        return []
+    
+    llm = LLM(model='openai:gpt-4o-mini')
+    page_text, output_schema, system_prompt = _extraction_request(text, search_terms, queries, extract_citations)
     
     try:
-        # Extract information
         debug_print("Calling LLM for information extraction")
-        result = llm.structured_output(page_text, output_schema, system_prompt)
-        
-        # Enhanced debugging
-        debug_print(f"LLM raw response type: {type(result)}")
-        if isinstance(result, dict):
-            debug_print(f"Response keys: {result.keys()}")
-        
-        # Handle the response - account for various formats the LLM might return
-        extracted_items = []
-        
-        if isinstance(result, list):
-            # Direct array response
-            extracted_items = result
-        elif isinstance(result, dict):
-            # Check for different possible keys - handle {"type":"array","items":[...]}
-            if "items" in result:
-                extracted_items = result["items"]
-            else:
-                # Try to find any array in the response
-                for key, value in result.items():
-                    if isinstance(value, list):
-                        extracted_items = value
-                        break
-        
-        debug_print(f"Extracted {len(extracted_items)} items from text")
-        if len(extracted_items) == 0:
-            debug_print("WARNING: LLM returned empty list")
-        
-        return extracted_items
+        result = await llm.structured_output_async(page_text, output_schema, system_prompt)
+        return _extracted_items(result)
     
     except Exception as e:
         logger.error(f"Error extracting information: {e}")
@@ -445,13 +943,133 @@ def format_note(item: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     return result
-def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[float], original_queries: List[str], explanation: str = "", extract_citations: bool = True) -> Dict[str, Any]:
+_global_extraction_slots = None
+
+def _get_global_extraction_slots() -> asyncio.Semaphore:
     """
-    Process a PDF URL and extract relevant information.
+    Return the process-wide semaphore capping concurrent chunk extraction LLM calls.
+    Papers are processed on the shared background loop, so one semaphore covers all of them.
+    """
+    global _global_extraction_slots
+    if _global_extraction_slots is None:
+        _global_extraction_slots = asyncio.Semaphore(getattr(settings, 'CHUNK_EXTRACTION_GLOBAL_CONCURRENCY', 16))
+    return _global_extraction_slots
+
+async def _extract_chunk(chunk_text: str, search_terms: List[str], queries: List[str], extract_citations: bool) -> List[Dict[str, Any]]:
+    """Extract notes from one chunk while holding a global extraction slot."""
+    async with _get_global_extraction_slots():
+        extracted_items = await extract_information_from_text_async(chunk_text, search_terms, queries, extract_citations)
+    return [format_note(item) for item in extracted_items]
+
+async def extract_chunks_concurrently(
+    page_store: PageTextStore,
+    chunks: List[tuple],
+    search_terms: List[str],
+    queries: List[str],
+    extract_citations: bool = True,
+    deadline: float = None
+) -> tuple:
+    """
+    Run information extraction for all chunks of a paper concurrently.
+    
+    Concurrency is capped per paper by CHUNK_EXTRACTION_CONCURRENCY and across all
+    papers by CHUNK_EXTRACTION_GLOBAL_CONCURRENCY. Notes are merged in page order.
+    
+    Args:
+        page_store: Page text store of the document
+        chunks: List of (first_page, last_page) tuples (0-based)
+        search_terms: Search terms for context
+        queries: User queries
+        extract_citations: Whether to extract citations
+        deadline: Absolute time (time.time()) after which unfinished chunks are cancelled
+        
+    Returns:
+        Tuple of (notes from completed chunks in page order, timed_out flag)
+    """
+    if not chunks:
+        return [], False
+    
+    max_concurrent = max(1, min(getattr(settings, 'CHUNK_EXTRACTION_CONCURRENCY', 4), len(chunks)))
+    debug_print(f"Extracting {len(chunks)} chunks with up to {max_concurrent} concurrent LLM calls")
+    paper_slots = asyncio.Semaphore(max_concurrent)
+    
+    async def extract(chunk):
+        async with paper_slots:
+            return await _extract_chunk(page_store.pages_block(chunk[0], chunk[1]), search_terms, queries, extract_citations)
+    
+    tasks = []
+    for i, chunk in enumerate(chunks):
+        debug_print(f"Submitting chunk {i+1}/{len(chunks)}: pages {chunk[0]+1}-{chunk[1]+1}")
+        tasks.append(asyncio.ensure_future(extract(chunk)))
+    
+    timeout = max(0.0, deadline - time.time()) if deadline else None
+    done, not_done = await asyncio.wait(tasks, timeout=timeout)
+    for task in not_done:
+        task.cancel()
+    
+    chunk_notes = [None] * len(chunks)
+    for i, task in enumerate(tasks):
+        if task not in done:
+            continue
+        try:
+            chunk_notes[i] = task.result()
+            debug_print(f"Extracted {len(chunk_notes[i])} notes from chunk {i+1}")
+        except Exception as e:
+            logger.error(f"Error extracting chunk {i+1}: {e}")
+            debug_print(f"ERROR extracting chunk {i+1}: {str(e)}")
+    
+    # Chunks are created in page order, so merging by index keeps notes in page order
+    notes = [note for notes_list in chunk_notes if notes_list for note in notes_list]
+    return notes, bool(not_done)
+
+def _page_embedding_matrix(page_count: int, page_embeddings: Dict[int, List[float]]) -> np.ndarray:
+    """Stack per-page embeddings into a (pages, dimensions) matrix with zero rows for pages without one."""
+    dimensions = len(next(iter(page_embeddings.values())))
+    matrix = np.zeros((page_count, dimensions), dtype=np.float32)
+    for index, embedding in page_embeddings.items():
+        matrix[index] = embedding
+    return matrix
+
+async def _relevant_stored_pages(document_id: int, page_store: PageTextStore, user_query: str, relevance_threshold: float) -> Optional[List[int]]:
+    """
+    Score the pages of a stored document against the query using its stored page embeddings.
+    
+    Returns:
+        Indices of the relevant pages, or None if the document has no stored page
+        embeddings or the query could not be embedded
+    """
+    stored_embeddings = await database_sync_to_async(load_page_embeddings)(document_id, GOOGLE_EMBEDDING_MODEL)
+    if stored_embeddings is None or stored_embeddings.shape[0] != len(page_store):
+        return None
+    
+    with stage_stats('embed').track():
+        query_embedding = await get_google_query_embedding_async(user_query)
+    if query_embedding is None or len(query_embedding) != stored_embeddings.shape[1]:
+        return None
+    
+    similarities = cosine_scores(query_embedding, stored_embeddings)
+    relevant_pages = []
+    for index, similarity in enumerate(similarities):
+        if page_store.get(index).strip() and similarity > relevance_threshold:
+            debug_print(f"Page {index+1} is relevant (score: {similarity:.4f}, stored embedding)")
+            relevant_pages.append(index)
+    debug_print(f"Scored {len(page_store)} pages with stored embeddings")
+    return relevant_pages
+
+async def process_pdf_async(pdf_url: str, search_terms: List[str], query_embedding: List[float], original_queries: List[str], explanation: str = "", extract_citations: bool = True, intent_embedding: List[float] = None, session_id: str = None) -> Dict[str, Any]:
+    """
+    Process a PDF URL and extract relevant information, without blocking the event loop.
     
     Implements the two-path strategy based on document size:
     - Simple Path for documents <= 8 pages: Process all at once
     - Advanced Path for documents > 8 pages: Use embeddings to find relevant pages
+    
+    intent_embedding is the session-wide embedding of the user's intent used for final
+    note validation; it is computed here only when the caller does not provide it.
+    session_id selects the PDF prefetched for the session (see prefetch_pdf), if any.
+    
+    Page text, metadata and page embeddings come from the document store when an earlier
+    session processed the same paper, and are stored there otherwise.
     """
     debug_print(f"Processing PDF: {pdf_url}")
     
@@ -475,63 +1093,36 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
     start_time = time.time()
     
     try:
-        # Normalize URL and download PDF
+        # Normalize URL, then use the document stored by an earlier session, the
+        # prefetched PDF, or download and parse it now
         pdf_url = normalize_url(pdf_url)
-        pdf_path = download_pdf(pdf_url)
-        
-        if not pdf_path:
-            debug_print("Failed to download PDF")
-            return {
-                'status': 'error',
-                'error_message': 'Failed to download PDF',
-                'title': 'Download Error',
-                'authors': [],
-                'harvard_reference': '',
-                'notes': []
-            }
-        
-        # Open PDF and extract metadata
-        debug_print(f"Opening PDF: {pdf_path}")
-        
-        # Verify it's a valid PDF
-        try:
-            doc = fitz.open(pdf_path)
-            # Check if it's a valid PDF
-            if not doc.is_pdf:
-                debug_print(f"ERROR: Not a valid PDF file: {pdf_path}")
-                try:
-                    os.remove(pdf_path)
-                except:
-                    pass
-                return {
-                    'status': 'error',
-                    'error_message': 'Not a valid PDF file',
-                    'title': 'Invalid PDF',
-                    'authors': [],
-                    'harvard_reference': '',
-                    'notes': []
-                }
-        except Exception as e:
-            debug_print(f"ERROR: Could not open as PDF: {str(e)}")
-            try:
-                os.remove(pdf_path)
-            except:
-                pass
-            return {
-                'status': 'error',
-                'error_message': f'Could not open as PDF: {str(e)}',
-                'title': 'PDF Error',
-                'authors': [],
-                'harvard_reference': '',
-                'notes': []
-            }
-        
-        page_count = len(doc)
+        document = await database_sync_to_async(find_document)(pdf_url)
+        if document is not None:
+            discard_prefetched_pdf(pdf_url, session_id)
+            page_store = document_page_store(document)
+            pdf_source = PDFSource(None)
+            pdf_source.nbytes = document.pdf_bytes  # Size of the originally downloaded PDF
+            enhanced_metadata = document_metadata(document)
+        else:
+            prefetched = await take_prefetched_pdf_async(pdf_url, session_id)
+            pdf_source, page_store, error_result = prefetched or await load_pdf_async(pdf_url)
+            if error_result:
+                return error_result
+            enhanced_metadata = None
+        
+        page_count = len(page_store)
         debug_print(f"PDF has {page_count} pages")
         
-        # Extract enhanced metadata using LLM
-        enhanced_metadata = extract_enhanced_metadata_with_llm(doc)
+        if enhanced_metadata is None:
+            # Extract enhanced metadata using LLM (page text is shared via the store)
+            with stage_stats('metadata').track():
+                enhanced_metadata = await extract_enhanced_metadata_with_llm_async(page_store)
+            if document is None:
+                document = await database_sync_to_async(save_document)(pdf_url, page_store, enhanced_metadata, pdf_source.nbytes)
+            else:
+                await database_sync_to_async(save_document_metadata)(document.id, enhanced_metadata)
         debug_print(f"Enhanced metadata extracted: {enhanced_metadata['title']}")
+        document_id = document.id if document is not None else None
         
         # Process the document based on its size
         notes = []
@@ -542,16 +1133,13 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
             debug_print(f"Using Simple Path for document with {page_count} pages")
             
             # Extract text from all pages
-            all_text = ""
+            page_blocks = []
             for i in range(page_count):
                 # Check for timeout
                 if time.time() - start_time > max_processing_time:
                     debug_print(f"ERROR: Processing timeout reached ({max_processing_time} seconds)")
-                    doc.close()
-                    try:
-                        os.remove(pdf_path)
-                    except:
-                        pass
+                    page_store.close()
+                    pdf_source.close()
                     return {
                         'status': 'error',
                         'error_message': f'Processing timeout after {max_processing_time} seconds',
@@ -564,11 +1152,12 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
                         'notes': []
                     }
                 
-                page_text = doc[i].get_text()
-                all_text += f"[PAGE {i+1}]\n{page_text}\n[END PAGE {i+1}]\n"
+                page_blocks.append(page_store.page_block(i))
+            all_text = "".join(page_blocks)
             
             # Extract information using LLM
-            extracted_items = extract_information_from_text(all_text, search_terms, original_queries, extract_citations)
+            with stage_stats('extract').track():
+                extracted_items = await extract_information_from_text_async(all_text, search_terms, original_queries, extract_citations)
             notes = [format_note(item) for item in extracted_items]
             debug_print(f"Extracted {len(notes)} notes using Simple Path")
             
@@ -580,26 +1169,36 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
             relevance_threshold = settings.RELEVANCE_THRESHOLD if hasattr(settings, 'RELEVANCE_THRESHOLD') else 0.15
             debug_print(f"Using relevance threshold: {relevance_threshold}")
             
+            # Prepare query from original queries and search terms
+            query_parts = original_queries + search_terms
+            user_query = " ".join(query_parts)
+            
+            # Page embeddings stored by an earlier session: only the query is embedded
+            stored_relevant_pages = None
+            if document_id is not None:
+                stored_relevant_pages = await _relevant_stored_pages(document_id, page_store, user_query, relevance_threshold)
+            
             # Prepare all pages for batch embedding processing
-            relevant_pages = []
+            relevant_pages = stored_relevant_pages if stored_relevant_pages is not None else []
+            page_embeddings = {}  # Page index -> Google embedding, stored with the document
+            embeddings_complete = True
             
             # Optimal batch size for memory efficiency - process 20 pages at a time
             # This balances API efficiency with memory usage
             batch_size = 20
-            debug_print(f"Processing {page_count} pages in batches of {batch_size} using Google embeddings")
+            batch_starts = range(0, page_count, batch_size) if stored_relevant_pages is None else []
+            if batch_starts:
+                debug_print(f"Processing {page_count} pages in batches of {batch_size} using Google embeddings")
             
-            for batch_start in range(0, page_count, batch_size):
+            for batch_start in batch_starts:
                 batch_end = min(batch_start + batch_size, page_count)
                 debug_print(f"Processing page batch {batch_start+1}-{batch_end}/{page_count} with Google embeddings")
                 
                 # Check for timeout
                 if time.time() - start_time > max_processing_time:
                     debug_print(f"ERROR: Processing timeout reached ({max_processing_time} seconds)")
-                    doc.close()
-                    try:
-                        os.remove(pdf_path)
-                    except:
-                        pass
+                    page_store.close()
+                    pdf_source.close()
                     return {
                         'status': 'error',
                         'error_message': f'Processing timeout after {max_processing_time} seconds',
@@ -617,7 +1216,7 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
                 page_indices = []
                 
                 for i in range(batch_start, batch_end):
-                    page_text = doc[i].get_text()
+                    page_text = page_store.get(i)
                     if page_text.strip():  # Only process non-empty pages
                         batch_documents.append({
                             'content': page_text.strip(),
@@ -631,20 +1230,18 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
                     debug_print(f"No valid pages in batch {batch_start+1}-{batch_end}")
                     continue
                 
-                # Prepare query from original queries and search terms
-                query_parts = original_queries + search_terms
-                user_query = " ".join(query_parts)
-                
                 # Use Google embeddings for batch processing (much faster than individual calls)
                 debug_print(f"Generating Google embeddings for {len(batch_documents)} pages in batch")
-                doc_embeddings, query_embedding = get_google_embeddings_batch(batch_documents, user_query)
+                with stage_stats('embed').track():
+                    doc_embeddings, query_embedding = await get_google_embeddings_batch_async(batch_documents, user_query)
                 
                 if doc_embeddings is None or query_embedding is None:
                     debug_print("Google embeddings failed, falling back to OpenAI for this batch")
+                    embeddings_complete = False
                     # Fallback to original method for this batch
                     for i, doc_idx in enumerate(page_indices):
                         page_text = batch_documents[i]['content']
-                        page_embedding = get_embedding(page_text)
+                        page_embedding = await get_embedding_async(page_text)
                         similarity = calculate_similarity(page_embedding, query_embedding)
                         debug_print(f"Page {doc_idx+1} has similarity score: {similarity:.4f} (OpenAI fallback)")
                         
@@ -659,6 +1256,7 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
                     # Process similarity results
                     for i, similarity in enumerate(similarities):
                         doc_idx = page_indices[i]
+                        page_embeddings[doc_idx] = doc_embeddings[i]
                         debug_print(f"Page {doc_idx+1} has similarity score: {similarity:.4f} (Google embeddings)")
                         
                         if similarity > relevance_threshold:
@@ -673,15 +1271,17 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
                 
                 debug_print(f"Completed batch {batch_start+1}-{batch_end}, found {len([p for p in relevant_pages if batch_start <= p < batch_end])} relevant pages")
             
+            if document_id is not None and batch_starts and embeddings_complete and page_embeddings:
+                await database_sync_to_async(save_page_embeddings)(
+                    document_id, GOOGLE_EMBEDDING_MODEL, _page_embedding_matrix(page_count, page_embeddings)
+                )
+            
             debug_print(f"Found {len(relevant_pages)} relevant pages total: {relevant_pages}")
             
             if not relevant_pages:
                 debug_print("No relevant pages found")
-                doc.close()
-                try:
-                    os.remove(pdf_path)
-                except:
-                    pass
+                page_store.close()
+                pdf_source.close()
                 
                 return {
                     'status': 'no_relevant_info',
@@ -691,74 +1291,62 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
                     'summary': enhanced_metadata['summary'],
                     'harvard_reference': enhanced_metadata['harvard_reference'],
                     'total_pages': enhanced_metadata['total_pages'],
-                    'notes': []
+                    'notes': [],
+                    'document_id': document_id
                 }
             
             # Group relevant pages into logical chunks for content extraction
             chunks = create_chunks(relevant_pages)
             
-            # Process each chunk
-            for i, chunk in enumerate(chunks):
-                # Check for timeout
-                if time.time() - start_time > max_processing_time:
-                    debug_print(f"ERROR: Processing timeout reached ({max_processing_time} seconds)")
-                    doc.close()
-                    try:
-                        os.remove(pdf_path)
-                    except:
-                        pass
-                    
-                    # Return partial results if we have any
-                    if notes:
-                        return {
-                            'status': 'partial_success',
-                            'error_message': f'Processing timeout after {max_processing_time} seconds - partial results returned',
-                            'title': enhanced_metadata['title'],
-                            'authors': enhanced_metadata['authors'],
-                            'year': enhanced_metadata['year'],
-                            'summary': enhanced_metadata['summary'],
-                            'harvard_reference': enhanced_metadata['harvard_reference'],
-                            'total_pages': enhanced_metadata['total_pages'],
-                            'notes': notes
-                        }
-                    else:
-                        return {
-                            'status': 'error',
-                            'error_message': f'Processing timeout after {max_processing_time} seconds',
-                            'title': enhanced_metadata['title'],
-                            'authors': enhanced_metadata['authors'],
-                            'year': enhanced_metadata['year'],
-                            'summary': enhanced_metadata['summary'],
-                            'harvard_reference': enhanced_metadata['harvard_reference'],
-                            'total_pages': enhanced_metadata['total_pages'],
-                            'notes': []
-                        }
-                
-                debug_print(f"Processing chunk {i+1}/{len(chunks)}: pages {chunk[0]+1}-{chunk[1]+1}")
-                
-                # Extract text from pages in this chunk
-                chunk_text = ""
-                for page_num in range(chunk[0], chunk[1] + 1):
-                    page_text = doc[page_num].get_text()
-                    chunk_text += f"[PAGE {page_num+1}]\n{page_text}\n[END PAGE {page_num+1}]\n"
-                
-                # Extract information from this chunk
-                extracted_items = extract_information_from_text(chunk_text, search_terms, original_queries, extract_citations)
-                chunk_notes = [format_note(item) for item in extracted_items]
-                notes.extend(chunk_notes)
-                debug_print(f"Extracted {len(chunk_notes)} notes from chunk {i+1}")
+            # Extract all chunks concurrently, bounded per paper and globally
+            with stage_stats('extract').track():
+                notes, timed_out = await extract_chunks_concurrently(
+                    page_store,
+                    chunks,
+                    search_terms,
+                    original_queries,
+                    extract_citations,
+                    deadline=start_time + max_processing_time
+                )
+            
+            if timed_out:
+                debug_print(f"ERROR: Processing timeout reached ({max_processing_time} seconds)")
+                page_store.close()
+                pdf_source.close()
                 
-                # Memory management - explicitly clear large variables
-                chunk_text = None
-                extracted_items = None
+                # Return partial results if we have any
+                if notes:
+                    return {
+                        'status': 'partial_success',
+                        'error_message': f'Processing timeout after {max_processing_time} seconds - partial results returned',
+                        'title': enhanced_metadata['title'],
+                        'authors': enhanced_metadata['authors'],
+                        'year': enhanced_metadata['year'],
+                        'summary': enhanced_metadata['summary'],
+                        'harvard_reference': enhanced_metadata['harvard_reference'],
+                        'total_pages': enhanced_metadata['total_pages'],
+                        'notes': notes,
+                        'document_id': document_id
+                    }
+                else:
+                    return {
+                        'status': 'error',
+                        'error_message': f'Processing timeout after {max_processing_time} seconds',
+                        'title': enhanced_metadata['title'],
+                        'authors': enhanced_metadata['authors'],
+                        'year': enhanced_metadata['year'],
+                        'summary': enhanced_metadata['summary'],
+                        'harvard_reference': enhanced_metadata['harvard_reference'],
+                        'total_pages': enhanced_metadata['total_pages'],
+                        'notes': []
+                    }
+        
+        # Text density stats for later stages (scheduling, monitoring)
+        page_stats = page_store.density_stats()
         
         # Close and clean up
-        doc.close()
-        try:
-            os.remove(pdf_path)
-            debug_print(f"Removed temporary file: {pdf_path}")
-        except Exception as e:
-            debug_print(f"Failed to remove temporary file: {str(e)}")
+        page_store.close()
+        pdf_source.close()
         
         # Log performance metrics
         processing_time = time.time() - start_time
@@ -766,17 +1354,16 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
 
         # Apply final validation if we have notes and an explanation
         if notes and explanation:
-            # Import here to avoid circular imports
-            from .embedding_service import validate_note_relevance
-            
             debug_print(f"Performing final note validation with explanation: '{explanation[:300]}' (truncated)")
             debug_print(f"Number of notes to validate: {len(notes)}")
-            validated_notes, filtered_notes = validate_note_relevance(
-                notes, 
-                original_queries, 
-                explanation, 
-                threshold=0.05
-            )
+            with stage_stats('validate').track():
+                validated_notes, filtered_notes = await validate_note_relevance_async(
+                    notes, 
+                    original_queries, 
+                    explanation, 
+                    threshold=0.05,
+                    intent_embedding=intent_embedding
+                )
             
             # Log statistics
             debug_print(f"Note validation: {len(validated_notes)}/{len(notes)} passed final relevance check")
@@ -798,7 +1385,10 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
             'harvard_reference': enhanced_metadata['harvard_reference'],
             'total_pages': enhanced_metadata['total_pages'],
             'notes': notes,
-            'processing_time': processing_time
+            'page_stats': page_stats,
+            'pdf_bytes': pdf_source.nbytes,
+            'processing_time': processing_time,
+            'document_id': document_id
         }
         
         debug_print(f"PDF processing complete: {result['status']}, {len(notes)} notes extracted in {processing_time:.2f} seconds")
@@ -808,14 +1398,14 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
         logger.error(f"Error processing PDF {pdf_url}: {e}", exc_info=True)
         debug_print(f"ERROR processing PDF: {str(e)}")
         
-        # Cleanup if PDF path exists
-        if locals().get('pdf_path') and os.path.exists(pdf_path):
+        # Cleanup if the PDF was downloaded
+        if locals().get('pdf_source'):
             try:
-                if locals().get('doc'):
-                    doc.close()
-                os.remove(pdf_path)
+                if locals().get('page_store'):
+                    page_store.close()
             except:
                 pass
+            pdf_source.close()
         
         # Log performance failure
         processing_time = time.time() - start_time
@@ -829,4 +1419,20 @@ def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[flo
             'harvard_reference': '',
             'notes': [],
             'processing_time': processing_time
-        }
\ No newline at end of file
+        }
+
+def process_pdf(pdf_url: str, search_terms: List[str], query_embedding: List[float], original_queries: List[str], explanation: str = "", extract_citations: bool = True, intent_embedding: List[float] = None, session_id: str = None) -> Dict[str, Any]:
+    """
+    Process a PDF URL and extract relevant information.
+    Synchronous facade over process_pdf_async, run on the shared background event loop.
+    """
+    return run_sync(process_pdf_async(
+        pdf_url,
+        search_terms,
+        query_embedding,
+        original_queries,
+        explanation,
+        extract_citations,
+        intent_embedding,
+        session_id
+    ))
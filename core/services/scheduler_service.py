@@ -0,0 +1,479 @@
+"""
+Cost-aware scheduling of paper processing.
+Within a session, papers are ordered by expected value per unit of cost: value is the
+pre-filter relevance score, cost is the predicted processing time from the page count
+of earlier sessions or the size of a cached PDF, and a per-page processing rate
+learned from the papers processed so far. No network request is made for the estimate.
+Across sessions, one process-wide worker pool shares its threads (or, with the async
+runner, its slots for paper coroutines) fairly by predicted cost.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from ..models import Paper
+from .pdf_cache_service import get_pdf_cache
+from .pdf_service import normalize_url
+from ..utils.async_runtime import get_background_loop
+from ..utils.debug import debug_print
+from ..utils.stage_stats import stage_stats
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CostModel:
+    """
+    Predicts paper processing time as base_seconds + pages * seconds_per_page.
+    The per-page rate and the PDF bytes per page are exponentially weighted
+    averages over completed papers.
+    """
+
+    def __init__(self, base_seconds: float = 10.0, seconds_per_page: float = 2.5,
+                 bytes_per_page: float = 70 * 1024, default_pages: int = 12, alpha: float = 0.2):
+        self.base_seconds = base_seconds
+        self.seconds_per_page = seconds_per_page
+        self.bytes_per_page = bytes_per_page
+        self.default_pages = default_pages
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def observe(self, pages: int, seconds: float, pdf_bytes: int = None) -> None:
+        """Update the rates with a completed paper."""
+        if not pages or pages <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            per_page = max(seconds - self.base_seconds, 0.0) / pages
+            self.seconds_per_page += self.alpha * (per_page - self.seconds_per_page)
+            if pdf_bytes:
+                self.bytes_per_page += self.alpha * (pdf_bytes / pages - self.bytes_per_page)
+
+    def estimate_pages(self, pages: int = None, pdf_bytes: int = None) -> float:
+        """Best guess of the page count from a known count or the PDF size."""
+        if pages:
+            return pages
+        if pdf_bytes:
+            return max(1.0, pdf_bytes / self.bytes_per_page)
+        return self.default_pages
+
+    def predict(self, pages: int = None, pdf_bytes: int = None) -> float:
+        """Predicted processing time in seconds."""
+        return self.base_seconds + self.estimate_pages(pages, pdf_bytes) * self.seconds_per_page
+
+
+_cost_model: Optional[CostModel] = None
+_cost_model_lock = threading.Lock()
+
+
+def get_cost_model() -> CostModel:
+    """Return the process-wide cost model."""
+    global _cost_model
+    if _cost_model is None:
+        with _cost_model_lock:
+            if _cost_model is None:
+                _cost_model = CostModel()
+    return _cost_model
+
+
+def estimate_paper_costs(urls: List[str]) -> Dict[str, float]:
+    """
+    Predict the processing time of papers.
+
+    Page counts come from earlier sessions that processed the same URL, sizes from
+    the PDF cache; other papers get the model's default page count.
+
+    Args:
+        urls: Paper URLs
+
+    Returns:
+        Dictionary mapping URL -> predicted seconds
+    """
+    model = get_cost_model()
+    if not urls:
+        return {}
+
+    pages = {}
+    try:
+        for url, total_pages in Paper.objects.filter(url__in=urls, total_pages__gt=0).values_list('url', 'total_pages'):
+            pages[url] = total_pages
+    except Exception as e:
+        logger.error(f"Error reading page count history: {e}")
+
+    sizes = {}
+    cache = get_pdf_cache()
+    for url in urls:
+        if url in pages:
+            continue
+        entry = cache.lookup(normalize_url(url)) if cache else None
+        if entry:
+            try:
+                sizes[url] = os.path.getsize(entry['path'])
+            except OSError:
+                pass
+
+    return {url: model.predict(pages.get(url), sizes.get(url)) for url in urls}
+
+
+class PaperScheduler:
+    """
+    Priority queue of one session's papers.
+
+    Papers come out in order of priority class (user-provided URLs first), then
+    value per predicted second. With a time budget, a paper whose predicted cost no
+    longer fits in the remaining time is dropped when it reaches the front, so long
+    low-value papers are deferred first and dropped last.
+    """
+
+    def __init__(self, time_budget: float = None, on_drop: Callable[[str], None] = None):
+        self.time_budget = time_budget or None
+        self.on_drop = on_drop
+        # Called (without the scheduler lock held) after every put() and close()
+        self.on_change: Optional[Callable[[], None]] = None
+        self.started_at = time.monotonic()
+        self.dropped = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+    @property
+    def closed(self) -> bool:
+        with self._condition:
+            return self._closed
+
+    def _changed(self) -> None:
+        if self.on_change:
+            self.on_change()
+
+    def put(self, paper_id: str, value: float, cost: float, priority_class: int = 1, url: str = None) -> None:
+        """
+        Queue a paper.
+
+        Args:
+            paper_id: Paper to process
+            value: Expected value (relevance score)
+            cost: Predicted processing time in seconds
+            priority_class: Lower classes are always served first (0 = user-provided URLs)
+            url: Paper URL, used to prefetch the PDFs of upcoming papers
+        """
+        entry = (priority_class, -value / max(cost, 1.0), next(self._sequence), paper_id, cost, url)
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            self._condition.notify()
+        self._changed()
+
+    def close(self) -> None:
+        """No more papers will be queued; get() returns None once the queue is empty."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._changed()
+
+    def peek_cost(self) -> Optional[float]:
+        """Predicted cost of the paper at the front of the queue, or None if it is empty."""
+        with self._condition:
+            return self._heap[0][4] if self._heap else None
+
+    def upcoming_urls(self, count: int) -> List[str]:
+        """URLs of the next papers in queue order (without removing them)."""
+        with self._condition:
+            return [entry[5] for entry in heapq.nsmallest(count, self._heap) if entry[5]]
+
+    def _next(self, block: bool) -> Optional[Tuple[str, float]]:
+        while True:
+            with self._condition:
+                while block and not self._heap and not self._closed:
+                    self._condition.wait()
+                if not self._heap:
+                    return None
+                priority_class, _, _, paper_id, cost, _ = heapq.heappop(self._heap)
+
+            if self.time_budget and priority_class > 0:
+                remaining = self.time_budget - (time.monotonic() - self.started_at)
+                if cost > remaining:
+                    with self._condition:
+                        self.dropped += 1
+                    debug_print(f"Dropping paper {paper_id}: predicted {cost:.0f}s, {max(remaining, 0):.0f}s of budget left")
+                    if self.on_drop:
+                        try:
+                            self.on_drop(paper_id)
+                        except Exception as e:
+                            logger.error(f"Error dropping paper {paper_id}: {e}")
+                    continue
+            return paper_id, cost
+
+    def get(self) -> Optional[str]:
+        """
+        Block until a paper is available and return its id, or None when closed and empty.
+        """
+        item = self._next(block=True)
+        return item[0] if item else None
+
+    def try_get(self) -> Optional[Tuple[str, float]]:
+        """Return the next (paper_id, predicted cost) without waiting, or None if the queue is empty."""
+        return self._next(block=False)
+
+
+class _PoolSession:
+    """Bookkeeping of one session attached to the paper worker pool."""
+
+    def __init__(self, key: str, scheduler: PaperScheduler, handler: Callable[[str], None], weight: float,
+                 prefetch: Callable[[str], bool] = None):
+        self.key = key
+        self.scheduler = scheduler
+        self.handler = handler
+        self.prefetch = prefetch
+        self.weight = max(weight, 0.01)
+        self.virtual_time = 0.0  # Predicted seconds of work served so far, divided by weight
+        self.running = 0
+        self.dispatched = 0
+        self.done = threading.Event()
+
+
+class PaperWorkerPool:
+    """
+    Process-wide pool of paper worker threads shared by all sessions.
+
+    Sessions attach their PaperScheduler; idle workers take the next paper from the
+    session with the least weighted work served so far (start-time fair queueing on
+    predicted paper cost), so a session with hundreds of papers cannot starve one with
+    a few URLs, and a session alone can still use the whole pool.
+    """
+
+    # Handlers are plain functions run on the worker threads
+    is_async = False
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._sessions: Dict[str, _PoolSession] = {}
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def _ensure_started(self) -> None:
+        """Start the worker threads on first use. Caller must hold the condition."""
+        if self._threads:
+            return
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"paper-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def attach(self, key: str, scheduler: PaperScheduler, handler: Callable[[str], None],
+               weight: float = 1.0, prefetch: Callable[[str], bool] = None) -> _PoolSession:
+        """
+        Serve a session's scheduler from the pool.
+
+        Args:
+            key: Session identifier (used for queue depth reporting)
+            scheduler: The session's paper queue; the session is finished once it is closed and drained
+            handler: Processes one paper id
+            weight: Relative share of the pool while several sessions have papers queued
+            prefetch: Starts loading a paper URL ahead of processing; returns False when
+                the prefetch buffer is full. Called for the next PDF_PREFETCH_AHEAD papers
+                whenever a paper of the session is dispatched.
+
+        Returns:
+            Handle for wait()
+        """
+        session = _PoolSession(key, scheduler, handler, weight, prefetch)
+        scheduler.on_change = self._wake
+        with self._condition:
+            self._ensure_started()
+            # Start at the current virtual time: no credit for time spent before attaching
+            session.virtual_time = self._virtual_time
+            self._sessions[key] = session
+            self._condition.notify_all()
+        return session
+
+    def wait(self, session: _PoolSession, timeout: float = None) -> bool:
+        """Wait until the session's scheduler is closed, drained and its last paper has finished."""
+        self._wake()
+        return session.done.wait(timeout)
+
+    def _wake(self) -> None:
+        with self._condition:
+            for session in list(self._sessions.values()):
+                self._check_finished(session)
+            self._condition.notify_all()
+
+    def _check_finished(self, session: _PoolSession) -> None:
+        """Detach a finished session. Caller must hold the condition."""
+        if session.running == 0 and session.scheduler.closed and not len(session.scheduler):
+            self._sessions.pop(session.key, None)
+            session.done.set()
+
+    def _select(self) -> Optional[_PoolSession]:
+        """Pick the backlogged session with the smallest virtual time and charge it. Caller must hold the condition."""
+        best, best_start, best_cost = None, None, None
+        for session in self._sessions.values():
+            cost = session.scheduler.peek_cost()
+            if cost is None:
+                continue
+            start = max(session.virtual_time, self._virtual_time)
+            if best is None or start < best_start:
+                best, best_start, best_cost = session, start, cost
+        if best is None:
+            return None
+        best.virtual_time = best_start + best_cost / best.weight
+        self._virtual_time = best_start
+        best.running += 1
+        return best
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                session = self._select()
+                while session is None:
+                    self._condition.wait()
+                    session = self._select()
+
+            try:
+                item = session.scheduler.try_get()
+                if item is not None:
+                    session.dispatched += 1
+                    self._prefetch_upcoming(session)
+                    with stage_stats('process', self.workers).track():
+                        session.handler(item[0])
+            except Exception as e:
+                logger.error(f"Error processing paper for session {session.key}: {e}")
+            finally:
+                with self._condition:
+                    session.running -= 1
+                    self._check_finished(session)
+                    self._condition.notify_all()
+
+    def _prefetch_upcoming(self, session: _PoolSession) -> None:
+        """Start loading the PDFs of a session's next papers while this one is processed."""
+        if not session.prefetch:
+            return
+        for url in session.scheduler.upcoming_urls(getattr(settings, 'PDF_PREFETCH_AHEAD', 4)):
+            try:
+                if not session.prefetch(url):
+                    break  # Prefetch buffer full
+            except Exception as e:
+                logger.error(f"Error prefetching {url}: {e}")
+
+    def queue_depths(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-session load of this process's pool.
+
+        Returns:
+            Dictionary mapping session key -> {'queued', 'running', 'dispatched', 'weight'}
+        """
+        with self._condition:
+            return {
+                key: {
+                    'queued': len(session.scheduler),
+                    'running': session.running,
+                    'dispatched': session.dispatched,
+                    'weight': session.weight
+                }
+                for key, session in self._sessions.items()
+            }
+
+
+class AsyncPaperPool(PaperWorkerPool):
+    """
+    Paper pool whose papers run as coroutines on the shared background event loop.
+
+    Sessions are served with the same fair queueing as PaperWorkerPool, but a paper in
+    flight costs no thread: a dispatcher task starts up to `workers` paper coroutines
+    at once, which wait on downloads, LLM and embedding calls concurrently.
+    Handlers are coroutine functions taking a paper id.
+    """
+
+    is_async = True
+
+    def __init__(self, workers: int):
+        super().__init__(workers)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = set()
+
+    def _ensure_started(self) -> None:
+        """Start the dispatcher on the background loop on first use. Caller must hold the condition."""
+        if self._loop is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._loop = get_background_loop()
+        asyncio.run_coroutine_threadsafe(self._dispatch_loop(), self._loop)
+
+    def attach(self, *args, **kwargs) -> _PoolSession:
+        session = super().attach(*args, **kwargs)
+        # Papers queued before attaching are dispatched without waiting for the next put
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return session
+
+    def _wake(self) -> None:
+        super()._wake()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _dispatch_loop(self) -> None:
+        slots = asyncio.Semaphore(self.workers)
+        while True:
+            await slots.acquire()
+            while True:
+                # Cleared before selecting, so a wake-up during the selection is not lost
+                self._wakeup.clear()
+                with self._condition:
+                    session = self._select()
+                if session is not None:
+                    break
+                await self._wakeup.wait()
+
+            task = asyncio.ensure_future(self._run_paper(session, slots))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_paper(self, session: _PoolSession, slots: asyncio.Semaphore) -> None:
+        try:
+            # Taking a paper may drop others that no longer fit the time budget (a DB delete)
+            item = await sync_to_async(session.scheduler.try_get)()
+            if item is not None:
+                session.dispatched += 1
+                self._prefetch_upcoming(session)
+                with stage_stats('process', self.workers).track():
+                    await session.handler(item[0])
+        except Exception as e:
+            logger.error(f"Error processing paper for session {session.key}: {e}")
+        finally:
+            slots.release()
+            with self._condition:
+                session.running -= 1
+                self._check_finished(session)
+            self._wakeup.set()
+
+
+_paper_pool: Optional[PaperWorkerPool] = None
+_paper_pool_lock = threading.Lock()
+
+
+def get_paper_pool() -> PaperWorkerPool:
+    """
+    Return the process-wide paper pool: an AsyncPaperPool with ASYNC_PAPERS_IN_FLIGHT slots
+    when PAPER_RUNNER is 'async', otherwise a PaperWorkerPool of PAPER_POOL_WORKERS threads.
+    """
+    global _paper_pool
+    if _paper_pool is None:
+        with _paper_pool_lock:
+            if _paper_pool is None:
+                if getattr(settings, 'PAPER_RUNNER', 'async') == 'async':
+                    _paper_pool = AsyncPaperPool(getattr(settings, 'ASYNC_PAPERS_IN_FLIGHT', 100))
+                else:
+                    _paper_pool = PaperWorkerPool(getattr(settings, 'PAPER_POOL_WORKERS', 8))
+    return _paper_pool
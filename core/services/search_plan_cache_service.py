@@ -0,0 +1,307 @@
+"""
+Semantic cache for generated search plans.
+A search plan is what the LLM derives from a session's topics and info queries:
+the structured arXiv search terms, the expanded research questions and the short
+explanation of what the user wants. Plans are stored with an embedding of the
+normalized (topics, info queries) text; a new session reuses the plan of the most
+similar earlier session when the cosine similarity reaches SEARCH_PLAN_CACHE_SIMILARITY.
+The nearest-neighbour search is one matrix-vector product over an in-memory matrix of
+all cached plan embeddings, reloaded from the database every SEARCH_PLAN_CACHE_REFRESH seconds.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from ..models import SearchPlanCacheEntry
+from .embedding_service import get_embedding, OPENAI_EMBEDDING_MODEL
+from ..utils.debug import debug_print
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Check the entry limit after this many stored plans
+EVICTION_CHECK_INTERVAL = 50
+
+_stats = {'hits': 0, 'exact_hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0}
+_stats_lock = threading.Lock()
+_stores_since_eviction_check = 0
+
+# In-memory nearest-neighbour index: keys[i] has unit vector matrix[i] and expiry expires[i] (epoch seconds)
+_index = {'keys': [], 'matrix': None, 'expires': np.zeros(0), 'loaded_at': 0.0}
+_index_lock = threading.Lock()
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def cache_enabled() -> bool:
+    """Return True if search plans should be served from and stored in the cache."""
+    return getattr(settings, 'SEARCH_PLAN_CACHE_ENABLED', True)
+
+
+def plan_text(topics: List[str], info_queries: List[str]) -> str:
+    """
+    Normalize topics and info queries into the text that is embedded and hashed.
+
+    Case, surrounding whitespace, duplicates and order do not change the plan text.
+    """
+    def normalize(items):
+        return sorted({" ".join(str(item).lower().split()) for item in items or [] if str(item).strip()})
+
+    return f"Topics: {'; '.join(normalize(topics))}\nQuestions: {'; '.join(normalize(info_queries))}"
+
+
+def _plan_key(text: str) -> str:
+    return hashlib.sha256(f"{OPENAI_EMBEDDING_MODEL}|{text}".encode('utf-8')).hexdigest()
+
+
+def embed_plan(text: str) -> Optional[np.ndarray]:
+    """Return the unit-length float32 embedding of a plan text, or None if embedding failed."""
+    vector = np.asarray(get_embedding(text), dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if not norm:
+        return None
+    return vector / norm
+
+
+def _expiry_seconds(expires_at) -> float:
+    return expires_at.timestamp() if expires_at is not None else float('inf')
+
+
+def _load_index() -> None:
+    """Reload the in-memory index from the database. Caller must hold _index_lock."""
+    rows = list(
+        SearchPlanCacheEntry.objects
+        .filter(embedding_model=OPENAI_EMBEDDING_MODEL)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+        .order_by('-last_used_at')
+        .values_list('key', 'dimensions', 'embedding', 'expires_at')
+        [:getattr(settings, 'SEARCH_PLAN_CACHE_MAX_ENTRIES', 5000)]
+    )
+    dimensions = rows[0][1] if rows else 0
+    rows = [row for row in rows if row[1] == dimensions]
+
+    _index['keys'] = [row[0] for row in rows]
+    _index['matrix'] = (
+        np.frombuffer(b"".join(bytes(row[2]) for row in rows), dtype=np.float32).reshape(len(rows), dimensions).copy()
+        if rows else None
+    )
+    _index['expires'] = np.array([_expiry_seconds(row[3]) for row in rows], dtype=np.float64)
+    _index['loaded_at'] = time.monotonic()
+    debug_print(f"Loaded {len(rows)} cached search plans into the similarity index")
+
+
+def _nearest(vector: np.ndarray) -> Tuple[Optional[str], float]:
+    """Return the key and cosine similarity of the most similar unexpired cached plan."""
+    with _index_lock:
+        if time.monotonic() - _index['loaded_at'] > getattr(settings, 'SEARCH_PLAN_CACHE_REFRESH', 300):
+            _load_index()
+        matrix, keys, expires = _index['matrix'], _index['keys'], _index['expires']
+
+    if matrix is None or matrix.shape[1] != vector.shape[0]:
+        return None, 0.0
+
+    # Rows and query are unit vectors, so the dot products are the cosine similarities
+    similarities = matrix @ vector
+    similarities[expires <= time.time()] = -1.0
+    best = int(np.argmax(similarities))
+    return keys[best], float(similarities[best])
+
+
+def _use_entry(key: str) -> Optional[Dict[str, Any]]:
+    """Load a cached plan by key and record the hit; None if it is gone or expired."""
+    now = timezone.now()
+    entry = (
+        SearchPlanCacheEntry.objects
+        .filter(key=key)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+        .values('search_structure', 'generated_questions', 'explanation', 'plan_text')
+        .first()
+    )
+    if entry is not None:
+        SearchPlanCacheEntry.objects.filter(key=key).update(hit_count=F('hit_count') + 1, last_used_at=now)
+    return entry
+
+
+def find_cached_plan(topics: List[str], info_queries: List[str]) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+    """
+    Look up a reusable search plan for a session's topics and info queries.
+
+    An identical plan text is found by key without embedding; otherwise the plan text
+    is embedded and compared against every cached plan at once.
+
+    Args:
+        topics: Session topics
+        info_queries: Session info queries
+
+    Returns:
+        Tuple of (plan, embedding). plan is None on a miss, otherwise a dict with
+        'search_structure', 'expanded_questions' (the session's own info queries followed
+        by the cached generated questions), 'explanation' and 'similarity'. embedding is
+        the plan embedding for store_plan, or None when it was not needed or failed.
+    """
+    if not cache_enabled() or not (topics or info_queries):
+        return None, None
+
+    text = plan_text(topics, info_queries)
+    similarity, vector = 1.0, None
+    try:
+        entry = _use_entry(_plan_key(text))
+        if entry is not None:
+            _count('exact_hits')
+        else:
+            vector = embed_plan(text)
+            if vector is None:
+                _count('misses')
+                return None, None
+            key, similarity = _nearest(vector)
+            threshold = getattr(settings, 'SEARCH_PLAN_CACHE_SIMILARITY', 0.95)
+            entry = _use_entry(key) if key is not None and similarity >= threshold else None
+    except Exception as e:
+        logger.error(f"Error reading search plan cache: {e}")
+        _count('misses')
+        return None, vector
+
+    if entry is None:
+        _count('misses')
+        debug_print(f"Search plan cache miss (best similarity {similarity:.3f})")
+        return None, vector
+
+    _count('hits')
+    debug_print(f"Search plan cache hit (similarity {similarity:.3f}): {entry['plan_text']!r}")
+    return {
+        'search_structure': entry['search_structure'],
+        'expanded_questions': list(info_queries) + [
+            question for question in entry['generated_questions'] if question not in info_queries
+        ],
+        'explanation': entry['explanation'],
+        'similarity': similarity
+    }, vector
+
+
+def store_plan(topics: List[str], info_queries: List[str], vector: Optional[np.ndarray],
+               search_structure: Dict[str, Any], expanded_questions: List[str], explanation: str,
+               ttl: Optional[int] = None) -> None:
+    """
+    Cache a generated search plan.
+
+    Only the LLM-generated questions are stored, so a session that reuses the plan
+    gets its own info queries in front of them instead of the original session's.
+
+    Args:
+        topics: Session topics
+        info_queries: Session info queries
+        vector: Plan embedding from find_cached_plan (computed here if None)
+        search_structure: Structured search terms
+        expanded_questions: Expanded questions (info queries plus generated questions)
+        explanation: Explanation of what the user wants to learn
+        ttl: Seconds until the entry expires (defaults to SEARCH_PLAN_CACHE_TTL, None/0 = never)
+    """
+    global _stores_since_eviction_check
+    generated_questions = [question for question in expanded_questions if question not in info_queries]
+    # Fallback plans (no generated questions) are not worth reusing
+    if not cache_enabled() or not (topics or info_queries) or not generated_questions:
+        return
+    if ttl is None:
+        ttl = getattr(settings, 'SEARCH_PLAN_CACHE_TTL', 30 * 24 * 60 * 60)
+
+    text = plan_text(topics, info_queries)
+    key = _plan_key(text)
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl) if ttl else None
+    try:
+        if vector is None:
+            vector = embed_plan(text)
+            if vector is None:
+                return
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        SearchPlanCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'plan_text': text,
+                'embedding_model': OPENAI_EMBEDDING_MODEL,
+                'dimensions': vector.shape[0],
+                'embedding': vector.tobytes(),
+                'search_structure': search_structure,
+                'generated_questions': generated_questions,
+                'explanation': explanation,
+                'last_used_at': now,
+                'expires_at': expires_at
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error writing search plan cache: {e}")
+        return
+    _count('stores')
+
+    # Make the plan findable in this process without waiting for the next reload
+    with _index_lock:
+        matrix = _index['matrix']
+        if matrix is None or matrix.shape[1] == vector.shape[0]:
+            if key in _index['keys']:
+                row = _index['keys'].index(key)
+                matrix[row] = vector
+                _index['expires'][row] = _expiry_seconds(expires_at)
+            else:
+                _index['keys'] = _index['keys'] + [key]
+                _index['matrix'] = vector[None, :] if matrix is None else np.vstack([matrix, vector])
+                _index['expires'] = np.append(_index['expires'], _expiry_seconds(expires_at))
+
+    with _stats_lock:
+        _stores_since_eviction_check += 1
+        if _stores_since_eviction_check < EVICTION_CHECK_INTERVAL:
+            return
+        _stores_since_eviction_check = 0
+    try:
+        evict()
+    except Exception as e:
+        logger.error(f"Error evicting search plan cache entries: {e}")
+
+
+def evict(max_entries: int = None) -> int:
+    """
+    Delete expired plans, then least recently used ones beyond the entry limit.
+
+    Args:
+        max_entries: Maximum number of plans to keep (defaults to SEARCH_PLAN_CACHE_MAX_ENTRIES)
+
+    Returns:
+        Number of evicted plans
+    """
+    if max_entries is None:
+        max_entries = getattr(settings, 'SEARCH_PLAN_CACHE_MAX_ENTRIES', 5000)
+
+    evicted, _ = SearchPlanCacheEntry.objects.filter(
+        Q(expires_at__isnull=False) & Q(expires_at__lte=timezone.now())
+    ).delete()
+
+    excess = SearchPlanCacheEntry.objects.count() - max_entries
+    if excess > 0:
+        oldest = list(SearchPlanCacheEntry.objects.order_by('last_used_at').values_list('key', flat=True)[:excess])
+        deleted, _ = SearchPlanCacheEntry.objects.filter(key__in=oldest).delete()
+        evicted += deleted
+
+    if evicted:
+        _count('evicted', evicted)
+        with _index_lock:
+            _load_index()
+        debug_print(f"Evicted {evicted} cached search plans")
+    return evicted
+
+
+def get_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of this process and the current hit rate."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
@@ -6,13 +6,17 @@ Enhanced with structured search terms and field-specific queries.
 
 import logging
 import json
-import time
 import urllib.parse
 import requests
 import re
+import concurrent.futures
 import arxiv as arxiv_pkg
 from typing import List, Dict, Any
+from django.conf import settings
+from django.db import connection
 from .llm_service import LLM
+from .arxiv_api_service import arxiv_results, get_cached_search, store_search, remember_metadata
+from .arxiv_index_service import get_arxiv_index
 from ..utils.debug import debug_print
 
 
@@ -266,29 +270,92 @@ KEY SUCCESS FACTORS:
 
 
 
-def search_arxiv_with_structured_queries(search_structure: Dict, max_results=100, original_topics=None, original_queries=None) -> Dict[str, Any]:
+def _run_arxiv_query(query: str, results_per_query: int) -> tuple:
     """
-    Enhanced arXiv search using structured queries with result limiting and rate limiting.
-    Now returns both URLs and metadata to eliminate duplicate API calls.
+    Run one arXiv query against the configured search backend:
+    'api' (arXiv API), 'local' (local FTS index only) or 'local_first'
+    (local index, falling back to the API when it finds nothing).
+    API results are served from the query cache when possible.
     
-    Args:
-        search_structure: Dictionary of structured search terms
-        max_results: Maximum number of results to return (default: 400)
-        original_topics: Optional list of original user topics to include directly in search
-        original_queries: Optional list of original user queries to include directly in search
-        
     Returns:
-        Dict containing:
-        - 'urls': List of arXiv PDF URLs (limited to max_results)
-        - 'metadata': Dict mapping URLs to metadata (id, title, abstract, authors, date)
+        Tuple of (list of PDF URLs in relevance order, dict mapping PDF URL to metadata)
     """
-    # 🔍 DEBUG: Log input parameters
-    print(f"🔍 ARXIV DEBUG - Input search_structure: {search_structure}")
-    print(f"🔍 ARXIV DEBUG - Original topics: {original_topics}")
-    print(f"🔍 ARXIV DEBUG - Original queries: {original_queries}")
-    print(f"🔍 ARXIV DEBUG - Max results requested: {max_results}")
+    # 🔍 DEBUG: Log ArXiv query details
+    print(f"🔍 ARXIV DEBUG - Query: '{query}' (max results: {results_per_query})")
+    
+    backend = getattr(settings, 'ARXIV_SEARCH_BACKEND', 'api')
+    if backend in ('local', 'local_first'):
+        index = get_arxiv_index()
+        if index is None:
+            logger.warning(f"ARXIV_SEARCH_BACKEND is '{backend}' but no local arXiv index exists - using the API")
+        else:
+            try:
+                local_results = index.search(query, results_per_query)
+            except Exception as e:
+                logger.error(f"Local arXiv index search failed for '{query}': {e}")
+                local_results = []
+            if local_results or backend == 'local':
+                print(f"✅ ARXIV DEBUG - Local index found {len(local_results)} results for query: '{query}'")
+                return [paper['url'] for paper in local_results], {paper['url']: paper for paper in local_results}
+    
+    try:
+        cached = get_cached_search(query, results_per_query)
+        if cached is not None:
+            print(f"✅ ARXIV DEBUG - Cache hit with {len(cached)} results for query: '{query}'")
+            return [paper['url'] for paper in cached], {paper['url']: paper for paper in cached}
+        
+        query_results, query_metadata = _fetch_arxiv_query(query, results_per_query)
+        store_search(query, results_per_query, [query_metadata[url] for url in query_results])
+        return query_results, query_metadata
+    finally:
+        # Search worker threads are short-lived - release their DB connection
+        connection.close()
+
+def _fetch_arxiv_query(query: str, results_per_query: int) -> tuple:
+    """Fetch one arXiv query through the shared rate-limited client."""
+    debug_print(f"Querying arXiv with: {query}")
+    
+    search = arxiv_pkg.Search(
+        query=query,
+        max_results=results_per_query,
+        sort_by=arxiv_pkg.SortCriterion.Relevance,
+        sort_order=arxiv_pkg.SortOrder.Descending
+    )
     
-    # Build queries from the structured terms
+    query_results = []
+    query_metadata = {}
+    result_count = 0
+    for result in arxiv_results(search):
+        try:
+            result_count += 1
+            # Extract arXiv ID and create PDF URL
+            arxiv_id = result.get_short_id()
+            pdf_url = f"https://arxiv.org/pdf/{arxiv_id}"
+            query_results.append(pdf_url)
+            
+            # Collect metadata (Method 2 approach)
+            query_metadata[pdf_url] = {
+                'id': arxiv_id,
+                'url': pdf_url,
+                'title': result.title,
+                'abstract': clean_abstract(result.summary),
+                'authors': [author.name for author in result.authors],
+                'date': result.published.strftime('%Y-%m-%d') if result.published else ""
+            }
+        except Exception as result_error:
+            print(f"❌ ARXIV DEBUG - Error processing individual result {result_count}: {result_error}")
+            debug_print(f"Error processing individual result: {result_error}")
+    
+    # 🔍 DEBUG: Log success results
+    print(f"✅ ARXIV DEBUG - Successfully found {len(query_results)} results for query: '{query}'")
+    debug_print(f"Found {len(query_results)} results for query: {query}")
+    return query_results, query_metadata
+
+def build_session_arxiv_queries(search_structure: Dict, original_topics=None, original_queries=None) -> List[str]:
+    """
+    Build the full list of arXiv queries for a session: the structured queries
+    followed by direct all-field searches for the user's original topics and queries.
+    """
     queries = build_arxiv_queries(search_structure)
     
     # Add direct searches for original topics and queries to ensure they're included
@@ -304,6 +371,36 @@ def search_arxiv_with_structured_queries(search_structure: Dict, max_results=100
                 # Add original queries as all-field searches
                 queries.append(f'all:"{query}"')
     
+    return queries
+
+def stream_arxiv_structured_queries(search_structure: Dict, max_results=100, original_topics=None, original_queries=None):
+    """
+    Run the structured arXiv queries concurrently and yield each query's results
+    as soon as that query completes, so callers can start working on the first
+    papers while the remaining queries are still waiting on the API.
+    
+    Stops issuing queries once max_results unique URLs have been yielded. Closing
+    the generator early cancels the queries that have not started yet.
+    
+    Args:
+        search_structure: Dictionary of structured search terms
+        max_results: Stop after this many unique URLs (default: 100)
+        original_topics: Optional list of original user topics to include directly in search
+        original_queries: Optional list of original user queries to include directly in search
+        
+    Yields:
+        Tuple of (query index, query, list of PDF URLs in relevance order, dict mapping URL to metadata)
+    """
+    # 🔍 DEBUG: Log input parameters
+    print(f"🔍 ARXIV DEBUG - Input search_structure: {search_structure}")
+    print(f"🔍 ARXIV DEBUG - Original topics: {original_topics}")
+    print(f"🔍 ARXIV DEBUG - Original queries: {original_queries}")
+    print(f"🔍 ARXIV DEBUG - Max results requested: {max_results}")
+    
+    queries = build_session_arxiv_queries(search_structure, original_topics, original_queries)
+    if not queries:
+        return
+    
     # 🔍 DEBUG: Log final queries being sent to ArXiv
     print(f"🔍 ARXIV DEBUG - Final {len(queries)} queries to send:")
     for idx, query in enumerate(queries):
@@ -311,11 +408,8 @@ def search_arxiv_with_structured_queries(search_structure: Dict, max_results=100
     
     debug_print(f"Searching arXiv with {len(queries)} structured queries (including original topics/queries)")
     
-    all_results = []
-    all_metadata = {}  # Dict mapping PDF URLs to metadata
-    
     # Calculate results per query - be more generous to get better coverage
-    if max_results and len(queries) > 0:
+    if max_results:
         # Increase results per query significantly for better coverage
         # For simple queries like "sports psychology", we want lots of results
         results_per_query = max(15, min(50, max_results // 2))  # At least 15, up to 50
@@ -325,87 +419,84 @@ def search_arxiv_with_structured_queries(search_structure: Dict, max_results=100
     debug_print(f"Fetching up to {results_per_query} results per query to reach target of {max_results}")
     debug_print(f"Using {len(queries)} queries, expecting to find {len(queries) * results_per_query} total results before deduplication")
     
-    # Process queries in order of creation (most specific first)
-    for i, query in enumerate(queries):
-        # Don't stop early - let all queries run to get maximum coverage
-        # We'll deduplicate later
-        
-        # Add delay between queries to respect arXiv rate limits
-        if i > 0:  # Don't delay the first request
-            debug_print(f"Waiting 2 seconds before next arXiv query to respect rate limits...")
-            time.sleep(2)
-
-        try:
-            # 🔍 DEBUG: Log ArXiv query details
-            print(f"🔍 ARXIV DEBUG - Query {i+1}/{len(queries)}: '{query}'")
-            print(f"🔍 ARXIV DEBUG - Max results per query: {results_per_query}")
-            
-            debug_print(f"Querying arXiv with: {query}")
-            
-            # Create arxiv search using the package for better performance
-            search = arxiv_pkg.Search(
-                query=query,
-                max_results=results_per_query,
-                sort_by=arxiv_pkg.SortCriterion.Relevance,
-                sort_order=arxiv_pkg.SortOrder.Descending
-            )
-            
-            # 🔍 DEBUG: Log before ArXiv API call
-            print(f"🔍 ARXIV DEBUG - About to call ArXiv API for query: '{query}'")
-            
-            query_results = []
-            result_count = 0
-            for result in search.results():
-                try:
-                    result_count += 1
-                    # Extract arXiv ID and create PDF URL
-                    arxiv_id = result.get_short_id()
-                    pdf_url = f"https://arxiv.org/pdf/{arxiv_id}"
-                    query_results.append(pdf_url)
-                    
-                    # Collect metadata (Method 2 approach)
-                    paper_metadata = {
-                        'id': arxiv_id,
-                        'url': pdf_url,
-                        'title': result.title,
-                        'abstract': clean_abstract(result.summary),
-                        'authors': [author.name for author in result.authors],
-                        'date': result.published.strftime('%Y-%m-%d') if result.published else ""
-                    }
-                    all_metadata[pdf_url] = paper_metadata
-                    
-                    # Rate limiting for compatibility with existing system
-                    time.sleep(0.1)
-                    
-                except Exception as result_error:
-                    print(f"❌ ARXIV DEBUG - Error processing individual result {result_count}: {result_error}")
-                    debug_print(f"Error processing individual result: {result_error}")
-            
-            # 🔍 DEBUG: Log success results
-            print(f"✅ ARXIV DEBUG - Successfully found {len(query_results)} results for query: '{query}'")
-            debug_print(f"Found {len(query_results)} results for query: {query}")
-            all_results.extend(query_results)
-            
-            # Respect result limit during query processing
-            if max_results and len(all_results) >= max_results:
-                debug_print(f"Reached target of {max_results} results, stopping search")
-                break
+    # Run all queries concurrently; the shared arXiv limiter paces the actual API requests
+    max_workers = max(1, min(getattr(settings, 'ARXIV_SEARCH_CONCURRENCY', 4), len(queries)))
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        future_to_index = {
+            executor.submit(_run_arxiv_query, query, results_per_query): i
+            for i, query in enumerate(queries)
+        }
+        seen_urls = set()
+        for future in concurrent.futures.as_completed(future_to_index):
+            i = future_to_index[future]
+            query = queries[i]
+            if future.cancelled():
+                continue
+            try:
+                query_results, query_metadata = future.result()
+            except Exception as e:
+                # 🔍 DEBUG: Enhanced ArXiv error logging
+                print(f"❌ ARXIV ERROR DEBUG - Query: '{query}'")
+                print(f"❌ ARXIV ERROR DEBUG - Error type: {type(e).__name__}")
+                print(f"❌ ARXIV ERROR DEBUG - Error message: {str(e)}")
+                print(f"❌ ARXIV ERROR DEBUG - Max results requested: {results_per_query}")
                 
-        except Exception as e:
-            # 🔍 DEBUG: Enhanced ArXiv error logging
-            print(f"❌ ARXIV ERROR DEBUG - Query: '{query}'")
-            print(f"❌ ARXIV ERROR DEBUG - Error type: {type(e).__name__}")
-            print(f"❌ ARXIV ERROR DEBUG - Error message: {str(e)}")
-            print(f"❌ ARXIV ERROR DEBUG - Max results requested: {results_per_query}")
+                # Check if it's a specific ArXiv API error
+                if hasattr(e, 'response'):
+                    print(f"❌ ARXIV ERROR DEBUG - HTTP Response: {e.response}")
+                if hasattr(e, 'status_code'):
+                    print(f"❌ ARXIV ERROR DEBUG - Status Code: {e.status_code}")
+                
+                logger.error(f"Error with query '{query}': {e}")
+                debug_print(f"ERROR: {str(e)}")
+                continue
             
-            # Check if it's a specific ArXiv API error
-            if hasattr(e, 'response'):
-                print(f"❌ ARXIV ERROR DEBUG - HTTP Response: {e.response}")
-            if hasattr(e, 'status_code'):
-                print(f"❌ ARXIV ERROR DEBUG - Status Code: {e.status_code}")
+            # Later metadata lookups by ID (e.g. pre-filtering) can reuse what the search returned
+            remember_metadata(list(query_metadata.values()))
+            seen_urls.update(query_results)
+            yield i, query, query_results, query_metadata
             
-            logger.error(f"Error with query '{query}': {e}")
-            debug_print(f"ERROR: {str(e)}")
+            # Respect result limit: queries that have not started yet are skipped
+            if max_results and len(seen_urls) >= max_results:
+                debug_print(f"Reached target of {max_results} unique results, cancelling remaining queries")
+                break
+    finally:
+        # In-flight queries finish in the background (and still fill the query cache)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def search_arxiv_with_structured_queries(search_structure: Dict, max_results=100, original_topics=None, original_queries=None) -> Dict[str, Any]:
+    """
+    Enhanced arXiv search using structured queries with result limiting and rate limiting.
+    Now returns both URLs and metadata to eliminate duplicate API calls.
+    
+    Args:
+        search_structure: Dictionary of structured search terms
+        max_results: Maximum number of results to return (default: 400)
+        original_topics: Optional list of original user topics to include directly in search
+        original_queries: Optional list of original user queries to include directly in search
+        
+    Returns:
+        Dict containing:
+        - 'urls': List of arXiv PDF URLs (limited to max_results)
+        - 'metadata': Dict mapping URLs to metadata (id, title, abstract, authors, date)
+    """
+    all_results = []
+    all_metadata = {}  # Dict mapping PDF URLs to metadata
+    
+    # Merge and deduplicate as results arrive
+    query_results_by_index = {}
+    for i, query, query_results, query_metadata in stream_arxiv_structured_queries(
+        search_structure, max_results, original_topics, original_queries
+    ):
+        query_results_by_index[i] = query_results
+        for pdf_url in query_results:
+            if pdf_url not in all_metadata and pdf_url in query_metadata:
+                all_metadata[pdf_url] = query_metadata[pdf_url]
+    
+    # Keep the query priority order (most specific first) for the final ranking
+    for i in sorted(query_results_by_index):
+        all_results.extend(query_results_by_index[i])
     
     # Remove duplicates
     unique_results = []
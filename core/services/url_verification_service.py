@@ -5,10 +5,9 @@ URL verification service for selecting relevant URLs using LLM.
 import logging
 import re
 import urllib.parse
-import requests
-import xml.etree.ElementTree as ET
 import traceback
 from .llm_service import LLM
+from .arxiv_api_service import fetch_arxiv_metadata, strip_arxiv_version
 from ..utils.debug import debug_print
 
 logger = logging.getLogger(__name__)
@@ -29,56 +28,46 @@ def extract_arxiv_id_from_url(url):
     
     return None
 
+def _format_arxiv_metadata(arxiv_id, metadata):
+    """Convert shared arXiv metadata into the title/summary format used here."""
+    if metadata is None:
+        return {"title": f"arXiv Paper {arxiv_id}", "summary": "No summary available"}
+    
+    title = metadata["title"] or f"arXiv Paper {arxiv_id}"
+    summary = metadata["abstract"] or "No summary available"
+    return {
+        "title": title,
+        "summary": summary[:500] + "..." if len(summary) > 500 else summary
+    }
+
 def get_arxiv_metadata(arxiv_id):
     """Get title and summary for an arXiv paper by ID."""
     try:
-        # Define arXiv API constants
-        BASE_URL = "http://export.arxiv.org/api/query"
-        NAMESPACE = {'atom': 'http://www.w3.org/2005/Atom', 'arxiv': 'http://arxiv.org/schemas/atom'}
-        
-        # Build the request URL
-        url = f"{BASE_URL}?id_list={arxiv_id}"
-        
-        # Make request
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        # Parse XML response
-        root = ET.fromstring(response.text)
-        
-        # Extract metadata
-        entry = root.find('.//atom:entry', NAMESPACE)
-        if entry is None:
-            return {"title": f"arXiv Paper {arxiv_id}", "summary": "No summary available"}
-        
-        # Get title
-        title_elem = entry.find('.//atom:title', NAMESPACE)
-        title = title_elem.text.strip() if title_elem is not None and title_elem.text else f"arXiv Paper {arxiv_id}"
-        
-        # Get summary
-        summary_elem = entry.find('.//atom:summary', NAMESPACE)
-        summary = summary_elem.text.strip() if summary_elem is not None and summary_elem.text else "No summary available"
-        
-        return {
-            "title": title,
-            "summary": summary[:500] + "..." if len(summary) > 500 else summary
-        }
+        metadata = fetch_arxiv_metadata([arxiv_id]).get(strip_arxiv_version(arxiv_id))
+        return _format_arxiv_metadata(arxiv_id, metadata)
     
     except Exception as e:
         logger.error(f"Error getting arXiv metadata for {arxiv_id}: {e}")
         return {"title": f"arXiv Paper {arxiv_id}", "summary": "Failed to retrieve summary"}
 
 def get_metadata_for_urls(urls):
-    """Get title and summary for a list of URLs."""
+    """Get title and summary for a list of URLs (arXiv metadata is fetched in batches)."""
     results = []
     
+    # Fetch all arXiv metadata up front with batched id_list requests
+    arxiv_ids = {url: extract_arxiv_id_from_url(url) for url in urls}
+    try:
+        arxiv_metadata = fetch_arxiv_metadata([arxiv_id for arxiv_id in arxiv_ids.values() if arxiv_id])
+    except Exception as e:
+        logger.error(f"Error fetching arXiv metadata: {e}")
+        arxiv_metadata = {}
+    
     for url in urls:
         try:
-            # For arXiv URLs, get metadata from API
-            arxiv_id = extract_arxiv_id_from_url(url)
+            arxiv_id = arxiv_ids[url]
             
             if arxiv_id:
-                metadata = get_arxiv_metadata(arxiv_id)
+                metadata = _format_arxiv_metadata(arxiv_id, arxiv_metadata.get(strip_arxiv_version(arxiv_id)))
                 results.append({
                     "url": url,
                     "title": metadata["title"],
@@ -8,19 +8,29 @@ import threading
 import uuid
 import json
 import time
-import concurrent.futures
+import queue
+import functools
 from typing import List, Dict, Any
-from django.db import transaction, close_old_connections
+from django.db import transaction, close_old_connections, connection
 from django.conf import settings
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-from .models import ResearchSession, Paper, Note
+from channels.db import database_sync_to_async
+from .models import ResearchSession, Paper, Note, ResearchJob
 from .services.monitoring_service import start_monitoring, get_current_monitor, finalize_monitoring
 from .services.llm_service import LLM
-from .services.search_service import generate_search_questions, generate_structured_search_terms, search_arxiv_with_structured_queries
-from .services.embedding_service import get_embedding
-from .services.pdf_service import process_pdf
+from .services.search_service import generate_search_questions, generate_structured_search_terms, build_session_arxiv_queries, stream_arxiv_structured_queries
+from .services.paper_filter_service import StreamingPaperFilter
+from .services.embedding_service import get_embedding, get_intent_embedding
+from .services.pdf_service import process_pdf, process_pdf_async, prefetch_pdf, schedule_prefetch
+from .services.search_plan_cache_service import find_cached_plan, store_plan, get_stats as search_plan_cache_stats
+from .services.llm_cache_service import get_stats as llm_cache_stats
+from .services.document_store_service import get_stats as document_store_stats
+from .services.job_queue_service import enqueue_session_job, start_embedded_worker
+from .services.scheduler_service import PaperScheduler, estimate_paper_costs, get_cost_model, get_paper_pool
 from .utils.debug import debug_print
+from .utils.stage_graph import StageGraph
+from .utils.stage_stats import stage_stats, all_stage_stats
 
 
 # Configure logging
@@ -73,47 +83,175 @@ def send_paper_update(session_id: str, paper_data: Dict[str, Any]):
 
 def process_research_session(session_id: str, settings_data=None):
     """
-    Process a research session in a background thread.
-    This is a simplified version that doesn't use Celery.
+    Queue a research session for processing by a research worker.
+    
+    The job is stored in the database, so it survives restarts of the web process;
+    it is run by `manage.py run_research_worker` or, with RESEARCH_WORKER_EMBEDDED,
+    by a worker inside this process.
     
     Args:
         session_id: The ID of the session to process
         settings_data: Optional settings data from the request
+        
+    Returns:
+        The queued ResearchJob
     """
-    # Start a new thread to process the session
-    thread = threading.Thread(
-        target=_process_research_session_thread,
-        args=(session_id, settings_data)
-    )
-    thread.daemon = True
-    thread.start()
+    job = enqueue_session_job(session_id, settings_data)
+    worker = start_embedded_worker(run_research_job)
+    if worker:
+        worker.wake()
+    return job
+
+def run_research_job(job: ResearchJob):
+    """
+    Run a claimed research job. A run that raises is retried by the worker, and a
+    retried job resumes the papers of the interrupted run.
     
-    return thread
+    Args:
+        job: Job claimed by a research worker
+    """
+    _process_research_session_thread(str(job.session_id), job.settings_data, resume=job.attempts > 1)
 
-def _process_paper_thread_safe(paper_id: str, search_terms: List[str], query_embedding: List[float], info_queries: List[str], explanation: str = ""):
-    """Thread-safe version of process_paper_thread that doesn't update session status."""
-    # Close old connections to ensure thread safety with Django's DB connections
-    close_old_connections()
+def _start_paper(paper_id: str, monitor) -> Paper:
+    """Mark a paper as processing and log the start for monitoring."""
+    # Get paper
+    paper = Paper.objects.get(id=paper_id)
     
-    monitor = get_current_monitor()
+    # Update status
+    paper.status = 'processing'
+    paper.save()
+    debug_print(f"Started processing paper {paper.id}: {paper.url}")
     
-    try:
-        # Get paper
-        paper = Paper.objects.get(id=paper_id)
-        
-        # Update status
-        paper.status = 'processing'
+    # Log PDF processing start for monitoring
+    if monitor:
+        monitor.log_pdf_processing_start(
+            str(paper.id),
+            paper.url,
+            "Processing...",  # Title will be updated after processing
+            0  # Pages will be updated after processing
+        )
+    return paper
+
+def _finish_paper(paper: Paper, result: Dict[str, Any], pdf_processing_time: float, monitor) -> Dict[str, Any]:
+    """Persist a paper's processing result and notes, and push the paper to the frontend."""
+    if result.get('status') in ('success', 'no_relevant_info'):
+        # Teach the scheduler's cost model how long papers take
+        get_cost_model().observe(result.get('total_pages', 0), pdf_processing_time, result.get('pdf_bytes'))
+    
+    # Update paper with results
+    with stage_stats('persist').track(), transaction.atomic():
+        paper.title = result.get('title', 'Unknown')
+        paper.authors = result.get('authors', [])
+        paper.year = result.get('year', '')
+        paper.summary = result.get('summary', '')
+        paper.harvard_reference = result.get('harvard_reference', '')
+        paper.total_pages = result.get('total_pages', 0)
+        paper.status = result.get('status', 'error')
+        paper.error_message = result.get('error_message', '')
+        paper.document_id = result.get('document_id')
         paper.save()
-        debug_print(f"Started processing paper {paper.id}: {paper.url}")
         
-        # Log PDF processing start for monitoring
+        # Log processing strategy and page data for monitoring
         if monitor:
-            monitor.log_pdf_processing_start(
+            strategy = "Simple Path" if paper.total_pages <= 8 else "Advanced Path"
+            monitor.log_processing_strategy(str(paper.id), strategy)
+            
+            # For Advanced Path, simulate relevant pages tracking (in real implementation, this comes from PDF service)
+            if paper.total_pages > 8 and result.get('status') == 'success':
+                # This would be provided by enhanced PDF processing monitoring
+                relevant_pages = []
+                page_similarities = {}
+                monitor.log_relevant_pages(str(paper.id), relevant_pages, page_similarities)
+        
+        # Create Note objects for each extracted note
+        notes_created = 0
+        if result.get('status') == 'success' and result.get('notes'):
+            for note_data in result.get('notes', []):
+                # Verify justification exists, add default if not
+                if 'justification' not in note_data:
+                    default_justification = f"This information relates to the search query '{note_data.get('search_criteria', 'unknown')}' and provides relevant details about {note_data.get('matches_topic', 'the topic')}."
+                    note_data['justification'] = default_justification
+                    debug_print(f"Added missing justification during note creation: {default_justification}")
+                
+                Note.objects.create(
+                    paper=paper,
+                    content=note_data.get('content', ''),
+                    page_number=note_data.get('page_number', 1),
+                    note_type=note_data.get('note_type', 'quote'),
+                    search_criteria=note_data.get('search_criteria', ''),
+                    matches_topic=note_data.get('matches_topic', ''),
+                    justification=note_data.get('justification', ''),  # Added justification field
+                    inline_citations=note_data.get('inline_citations', []),
+                    reference_list=note_data.get('reference_list', {}),
+                    relevance_score=note_data.get('relevance_score')  # Added relevance score field
+                )
+                notes_created += 1
+        
+        # Log PDF processing completion for monitoring
+        if monitor:
+            monitor.log_pdf_processing_complete(
                 str(paper.id),
-                paper.url,
-                "Processing...",  # Title will be updated after processing
-                0  # Pages will be updated after processing
+                notes_created,
+                pdf_processing_time,
+                result.get('status', 'error')
             )
+    
+    # Send real-time update to frontend via WebSocket
+    try:
+        # Prepare paper data for frontend
+        paper_data = {
+            'paper_id': str(paper.id),
+            'title': paper.title,
+            'authors': paper.authors,
+            'year': paper.year,
+            'summary': paper.summary,
+            'harvard_reference': paper.harvard_reference,
+            'total_pages': paper.total_pages,
+            'status': paper.status,
+            'notes_count': paper.notes.count(),
+            'notes': [note.to_frontend_format() for note in paper.notes.all()]
+        }
+        
+        # Send update to frontend
+        send_paper_update(str(paper.session.id), paper_data)
+    except Exception as e:
+        logger.error(f"Error sending paper update: {e}")
+    
+    debug_print(f"Completed processing paper {paper.id}")
+    return {
+        "paper_id": str(paper.id),
+        "status": result.get('status', 'error'),
+        "paper_data": {
+            "paper_id": str(paper.id),
+            "title": paper.title,
+            "status": paper.status,
+            "notes": [
+                note.to_frontend_format()
+                for note in paper.notes.all()
+            ]
+        }
+    }
+
+def _fail_paper(paper_id: str, error: Exception) -> Dict[str, Any]:
+    """Mark a paper whose processing raised as failed."""
+    try:
+        paper = Paper.objects.get(id=paper_id)
+        paper.status = 'error'
+        paper.error_message = str(error)
+        paper.save()
+        return {"paper_id": paper_id, "status": "error", "error": str(error)}
+    except:
+        return {"paper_id": paper_id, "status": "error", "error": "Unknown error and paper not found"}
+
+def _process_paper_thread_safe(paper_id: str, search_terms: List[str], query_embedding: List[float], info_queries: List[str], explanation: str = "", intent_embedding: List[float] = None):
+    """Thread-safe version of process_paper_thread that doesn't update session status."""
+    # Close old connections to ensure thread safety with Django's DB connections
+    close_old_connections()
+    
+    monitor = get_current_monitor()
+    
+    try:
+        paper = _start_paper(paper_id, monitor)
         
         # Process the PDF
         pdf_start_time = time.time()
@@ -122,116 +260,364 @@ def _process_paper_thread_safe(paper_id: str, search_terms: List[str], query_emb
             search_terms,
             query_embedding, 
             info_queries,
-            explanation
+            explanation,
+            intent_embedding=intent_embedding,
+            session_id=str(paper.session_id)
         )
-        pdf_processing_time = time.time() - pdf_start_time
+        return _finish_paper(paper, result, time.time() - pdf_start_time, monitor)
+    
+    except Exception as e:
+        logger.error(f"Error processing paper {paper_id}: {e}", exc_info=True)
+        return _fail_paper(paper_id, e)
+
+async def _process_paper_async(paper_id: str, search_terms: List[str], query_embedding: List[float], info_queries: List[str], explanation: str = "", intent_embedding: List[float] = None):
+    """
+    Coroutine version of _process_paper_thread_safe for the async paper runner.
+    The PDF is processed on the event loop; database work crosses over through database_sync_to_async,
+    which drops stale connections before and after each call like a request would.
+    """
+    monitor = get_current_monitor()
+    
+    try:
+        paper = await database_sync_to_async(_start_paper)(paper_id, monitor)
         
-        # Update paper with results
-        with transaction.atomic():
-            paper.title = result.get('title', 'Unknown')
-            paper.authors = result.get('authors', [])
-            paper.year = result.get('year', '')
-            paper.summary = result.get('summary', '')
-            paper.harvard_reference = result.get('harvard_reference', '')
-            paper.total_pages = result.get('total_pages', 0)
-            paper.status = result.get('status', 'error')
-            paper.error_message = result.get('error_message', '')
-            paper.save()
-            
-            # Log processing strategy and page data for monitoring
-            if monitor:
-                strategy = "Simple Path" if paper.total_pages <= 8 else "Advanced Path"
-                monitor.log_processing_strategy(str(paper.id), strategy)
-                
-                # For Advanced Path, simulate relevant pages tracking (in real implementation, this comes from PDF service)
-                if paper.total_pages > 8 and result.get('status') == 'success':
-                    # This would be provided by enhanced PDF processing monitoring
-                    relevant_pages = []
-                    page_similarities = {}
-                    monitor.log_relevant_pages(str(paper.id), relevant_pages, page_similarities)
+        pdf_start_time = time.time()
+        result = await process_pdf_async(
+            paper.url,
+            search_terms,
+            query_embedding,
+            info_queries,
+            explanation,
+            intent_embedding=intent_embedding,
+            session_id=str(paper.session_id)
+        )
+        return await database_sync_to_async(_finish_paper)(paper, result, time.time() - pdf_start_time, monitor)
+    
+    except Exception as e:
+        logger.error(f"Error processing paper {paper_id}: {e}", exc_info=True)
+        return await database_sync_to_async(_fail_paper)(paper_id, e)
+
+# Marks the end of a streaming pipeline queue
+_PIPELINE_DONE = object()
+
+def _search_stage(search_stream, search_queue: queue.Queue, stop_event: threading.Event, stats: Dict[str, Any]):
+    """Streaming pipeline stage 1: queue each arXiv query's results for pre-filtering as soon as it completes."""
+    start = time.time()
+    try:
+        for _, _, query_urls, query_metadata in search_stream:
+            stats['urls'].update(query_urls)
+            # Block while the pre-filter is behind, but give up once it needs no more papers
+            while not stop_event.is_set():
+                try:
+                    search_queue.put((query_urls, query_metadata), timeout=1)
+                    break
+                except queue.Full:
+                    continue
+            if stop_event.is_set():
+                break
+    except Exception as e:
+        logger.error(f"Error in streaming arXiv search: {e}", exc_info=True)
+    finally:
+        search_stream.close()
+        stats['duration'] = time.time() - start
+        search_queue.put(_PIPELINE_DONE)
+
+def _drop_paper(paper_id: str):
+    """Remove a paper the scheduler dropped because it no longer fits the session time budget."""
+    Paper.objects.filter(id=paper_id, status='pending').delete()
+
+def _run_streaming_pipeline(
+    session: ResearchSession,
+    monitor,
+    direct_urls: List[str],
+    search_structure: Dict,
+    expanded_questions: List[str],
+    explanation: str,
+    additional_search_terms: List[str],
+    process_args: tuple,
+    search_arxiv: bool = True,
+    existing_papers: List[tuple] = None,
+    max_papers: int = None
+):
+    """
+    Stream papers from arXiv search to processing so the first papers are being read
+    while later queries are still running.
+    
+    arXiv search (one batch per completed query) feeds the incremental pre-filter through
+    a bounded queue (PIPELINE_QUEUE_SIZE); the pre-filter de-duplicates URLs, creates Paper
+    rows and hands them to the cost-aware PaperScheduler, which the shared paper worker
+    pool serves in order of relevance per predicted second (up to max_papers search results).
+    Direct URLs skip the pre-filter and are always served first.
+    
+    Args:
+        session: Research session being processed
+        monitor: Process monitor for the session
+        direct_urls: User-provided URLs
+        search_structure: Structured search terms for the arXiv queries
+        expanded_questions: Expanded research questions for pre-filtering
+        explanation: Explanation of the user's research intent
+        additional_search_terms: Title and abstract terms for pre-filtering
+        process_args: Arguments after paper_id for _process_paper_thread_safe / _process_paper_async
+        search_arxiv: Whether to search arXiv (False in URL-only mode)
+        existing_papers: (paper_id, url, status) of papers an interrupted earlier run
+            created; pending ones are processed first, none are created again
+        max_papers: Search results to accept (default PREFILTER_MAX_PAPERS); direct
+            URLs are always processed and do not count
+    """
+    queue_size = getattr(settings, 'PIPELINE_QUEUE_SIZE', 8)
+    
+    scheduler = PaperScheduler(
+        time_budget=getattr(settings, 'SESSION_TIME_BUDGET', 0),
+        on_drop=_drop_paper
+    )
+    # Papers are processed by the process-wide worker pool, shared fairly with other sessions
+    pool = get_paper_pool()
+    if pool.is_async:
+        # Papers run as coroutines and download concurrently themselves - no prefetch threads needed
+        pool_session = pool.attach(
+            str(session.id),
+            scheduler,
+            lambda paper_id: _process_paper_async(paper_id, *process_args)
+        )
+    else:
+        pool_session = pool.attach(
+            str(session.id),
+            scheduler,
+            lambda paper_id: _process_paper_thread_safe(paper_id, *process_args),
+            # PDFs of the next papers download and parse on their own executor meanwhile
+            prefetch=functools.partial(schedule_prefetch, session_id=str(session.id))
+        )
+    debug_print(f"Using the shared {'async ' if pool.is_async else ''}pool of {pool.workers} workers for parallel paper processing")
+    
+    paper_filter = StreamingPaperFilter(
+        session.topics,
+        expanded_questions,
+        explanation,
+        additional_search_terms,
+        max_urls=max_papers
+    )
+    
+    def enqueue(urls: List[str], priority_class: int = 1):
+        costs = estimate_paper_costs(urls)
+        for url in urls:
+            paper = Paper.objects.create(session=session, url=url, status="pending")
+            if session.status != 'processing':
+                session.status = 'processing'
+                session.save()
+            scheduler.put(str(paper.id), paper_filter.scores.get(url, 1.0), costs[url], priority_class, url=url)
+    
+    search_thread = None
+    try:
+        if existing_papers:
+            paper_filter.add_existing_urls([url for _, url, _ in existing_papers], direct_urls)
+            pending = [(paper_id, url) for paper_id, url, status in existing_papers if status == 'pending']
+            costs = estimate_paper_costs([url for _, url in pending])
+            for paper_id, url in pending:
+                scheduler.put(str(paper_id), 1.0, costs[url], priority_class=0, url=url)
+            debug_print(f"Resuming {len(pending)} of {len(existing_papers)} papers from the interrupted run")
+        
+        if search_arxiv:
+            queries = build_session_arxiv_queries(search_structure, session.topics, session.info_queries)
+            search_queue = queue.Queue(maxsize=queue_size)
+            stop_event = threading.Event()
+            search_stats = {'urls': set(), 'duration': 0.0}
+            search_stream = stream_arxiv_structured_queries(
+                search_structure,
+                original_topics=session.topics,
+                original_queries=session.info_queries
+            )
+            search_thread = threading.Thread(
+                target=_search_stage,
+                args=(search_stream, search_queue, stop_event, search_stats),
+                name=f"arxiv-search-{session.id}",
+                daemon=True
+            )
+            search_thread.start()
+        
+        # Direct URLs are processed first, while the search is still running
+        new_direct_urls = paper_filter.add_direct_urls(direct_urls)
+        enqueue(new_direct_urls, priority_class=0)
+        debug_print(f"Queued {len(new_direct_urls)} direct URLs for processing")
+        
+        filter_start_time = time.time()
+        if search_arxiv:
+            while True:
+                batch = search_queue.get()
+                if batch is _PIPELINE_DONE:
+                    break
+                if paper_filter.is_full:
+                    continue  # Drain until the search stage notices the stop
+                try:
+                    enqueue(paper_filter.add_batch(*batch))
+                except Exception as e:
+                    logger.error(f"Error pre-filtering search results: {e}")
+                if paper_filter.is_full:
+                    debug_print(f"Accepted {paper_filter.max_urls} papers, stopping arXiv search")
+                    stop_event.set()
+            search_thread.join()
             
-            # Create Note objects for each extracted note
-            notes_created = 0
-            if result.get('status') == 'success' and result.get('notes'):
-                for note_data in result.get('notes', []):
-                    # Verify justification exists, add default if not
-                    if 'justification' not in note_data:
-                        default_justification = f"This information relates to the search query '{note_data.get('search_criteria', 'unknown')}' and provides relevant details about {note_data.get('matches_topic', 'the topic')}."
-                        note_data['justification'] = default_justification
-                        debug_print(f"Added missing justification during note creation: {default_justification}")
-                    
-                    Note.objects.create(
-                        paper=paper,
-                        content=note_data.get('content', ''),
-                        page_number=note_data.get('page_number', 1),
-                        note_type=note_data.get('note_type', 'quote'),
-                        search_criteria=note_data.get('search_criteria', ''),
-                        matches_topic=note_data.get('matches_topic', ''),
-                        justification=note_data.get('justification', ''),  # Added justification field
-                        inline_citations=note_data.get('inline_citations', []),
-                        reference_list=note_data.get('reference_list', {}),
-                        relevance_score=note_data.get('relevance_score')  # Added relevance score field
-                    )
-                    notes_created += 1
+            monitor.log_arxiv_search(queries, len(search_stats['urls']), search_stats['duration'])
+            debug_print(f"Found {len(search_stats['urls'])} papers from arXiv search using structured queries (including original topics/queries)")
             
-            # Log PDF processing completion for monitoring
+            monitor.log_pre_filtering(
+                paper_filter.papers_processed,
+                len(paper_filter.accepted_urls),
+                paper_filter.papers_filtered,
+                time.time() - filter_start_time
+            )
+            send_status_update(
+                str(session.id),
+                'processing',
+                f"Pre-filtered papers: {len(paper_filter.accepted_urls)} relevant, "
+                f"{paper_filter.papers_filtered} filtered out"
+            )
+        else:
+            debug_print(f"URL-only mode with {len(direct_urls)} URLs - skipping pre-filtering")
+            monitor.log_pre_filtering(len(direct_urls), len(direct_urls), 0, 0.0)
+    finally:
+        if search_thread is not None and search_thread.is_alive():
+            # Pre-filtering stopped early - stop the search and drain its queue so the
+            # search stage never blocks on a full queue nobody reads any more
+            stop_event.set()
+            while search_thread.is_alive():
+                try:
+                    search_queue.get(timeout=1)
+                except queue.Empty:
+                    pass
+        # Let the pool finish everything already queued, sampling how it is shared meanwhile
+        scheduler.close()
+        sample_interval = getattr(settings, 'MONITOR_POOL_SAMPLE_INTERVAL', 10)
+        while True:
             if monitor:
-                monitor.log_pdf_processing_complete(
-                    str(paper.id),
-                    notes_created,
-                    pdf_processing_time,
-                    result.get('status', 'error')
-                )
-        
-        # Send real-time update to frontend via WebSocket
+                monitor.log_pool_queue_depths(pool.queue_depths())
+            if pool.wait(pool_session, timeout=sample_interval):
+                break
+    
+    debug_print(f"Processed {len(paper_filter.accepted_urls) - scheduler.dropped} papers for session {session.id} "
+                f"({scheduler.dropped} dropped by the time budget)")
+
+def _db_stage(fn):
+    """Wrap a bootstrap stage so its worker thread releases its DB connection."""
+    def run(*args):
         try:
-            # Prepare paper data for frontend
-            paper_data = {
-                'paper_id': str(paper.id),
-                'title': paper.title,
-                'authors': paper.authors,
-                'year': paper.year,
-                'summary': paper.summary,
-                'harvard_reference': paper.harvard_reference,
-                'total_pages': paper.total_pages,
-                'status': paper.status,
-                'notes_count': paper.notes.count(),
-                'notes': [note.to_frontend_format() for note in paper.notes.all()]
-            }
-            
-            # Send update to frontend
-            send_paper_update(str(paper.session.id), paper_data)
-        except Exception as e:
-            logger.error(f"Error sending paper update: {e}")
+            return fn(*args)
+        finally:
+            connection.close()
+    return run
+
+def _usable_embedding(embedding: List[float], name: str):
+    """
+    Return a session-wide embedding, or None for the zero vector get_embedding returns
+    when the request fails, so each paper computes the embedding itself instead of
+    scoring every note against zeros.
+    """
+    if embedding is not None and not any(embedding):
+        logger.warning(f"Session {name} embedding failed - papers will compute it themselves")
+        return None
+    return embedding
+
+def _start_session_bootstrap(session: ResearchSession, llm: LLM, is_url_only_search: bool) -> StageGraph:
+    """
+    Start the session bootstrap stages concurrently.
+    
+    The search plan cache is consulted first; on a miss the structured search terms and
+    the expanded questions are generated in parallel and the new plan is cached. The
+    query and intent embeddings follow as soon as the questions exist, and the first
+    direct URLs are downloaded and parsed from the start (see prefetch_pdf).
+    
+    Args:
+        session: Research session being processed
+        llm: Shared LLM for both generation stages
+        is_url_only_search: Whether the session has direct URLs but no topics
         
-        debug_print(f"Completed processing paper {paper.id}")
-        return {
-            "paper_id": paper_id,
-            "status": result.get('status', 'error'),
-            "paper_data": {
-                "paper_id": str(paper.id),
-                "title": paper.title,
-                "status": paper.status,
-                "notes": [
-                    note.to_frontend_format()
-                    for note in paper.notes.all()
-                ]
-            }
-        }
+    Returns:
+        Started StageGraph with stages 'search_plan', 'search_structure', 'search_questions',
+        'store_search_plan', 'query_embedding', 'intent_embedding' and one 'prefetch:<n>'
+        per prefetched URL
+    """
+    topics = [] if is_url_only_search else session.topics
+    info_queries = session.info_queries
     
-    except Exception as e:
-        logger.error(f"Error processing paper {paper_id}: {e}", exc_info=True)
-        try:
-            paper = Paper.objects.get(id=paper_id)
-            paper.status = 'error'
-            paper.error_message = str(e)
-            paper.save()
-            return {"paper_id": paper_id, "status": "error", "error": str(e)}
-        except:
-            return {"paper_id": paper_id, "status": "error", "error": "Unknown error and paper not found"}
+    def search_structure(plan):
+        cached, _ = plan
+        return cached['search_structure'] if cached else generate_structured_search_terms(llm, topics, info_queries)
+    
+    def search_questions(plan):
+        cached, _ = plan
+        if cached:
+            return cached['expanded_questions'], cached['explanation']
+        return generate_search_questions(llm, topics, info_queries)
+    
+    def store_search_plan(plan, structure, questions):
+        cached, plan_embedding = plan
+        if not cached:
+            store_plan(topics, info_queries, plan_embedding, structure, questions[0], questions[1])
+    
+    bootstrap = StageGraph("bootstrap")
+    # Sessions with (nearly) the same topics and queries as an earlier one reuse its search plan
+    bootstrap.add('search_plan', _db_stage(lambda: find_cached_plan(topics, info_queries)))
+    bootstrap.add('search_structure', _db_stage(search_structure), deps=['search_plan'])
+    bootstrap.add('search_questions', _db_stage(search_questions), deps=['search_plan'])
+    bootstrap.add(
+        'store_search_plan',
+        _db_stage(store_search_plan),
+        deps=['search_plan', 'search_structure', 'search_questions']
+    )
+    bootstrap.add(
+        'query_embedding',
+        _db_stage(lambda questions: _usable_embedding(get_embedding(" ".join(questions[0])), 'query')),
+        deps=['search_questions']
+    )
+    # Embed the user's intent once for final note validation of every paper
+    bootstrap.add(
+        'intent_embedding',
+        _db_stage(lambda questions: _usable_embedding(get_intent_embedding(info_queries, questions[1]), 'intent')),
+        deps=['search_questions']
+    )
+    
+    # Direct URLs are processed first, so start on them right away
+    prefetch_count = getattr(settings, 'PDF_PREFETCH_MAX_PAPERS', 8)
+    for i, url in enumerate(session.direct_urls[:prefetch_count]):
+        bootstrap.add(f'prefetch:{i}', _db_stage(functools.partial(prefetch_pdf, url, str(session.id))))
+    
+    bootstrap.start()
+    return bootstrap
 
-def _process_research_session_thread(session_id: str, settings_data=None):
-    """Background thread to process a research session with parallel paper processing."""
+def _resume_session_papers(session: ResearchSession) -> List[tuple]:
+    """
+    Collect the papers of an interrupted run of a session; papers that were being
+    processed when it stopped are reset to pending.
+    
+    Returns:
+        List of (paper_id, url, status)
+    """
+    Paper.objects.filter(session=session, status='processing').update(status='pending')
+    return list(Paper.objects.filter(session=session).values_list('id', 'url', 'status'))
+
+def _max_search_papers(settings_data) -> int:
+    """
+    Number of search results a session processes: the request's maxSources setting
+    (at most PREFILTER_MAX_SOURCES), or PREFILTER_MAX_PAPERS if it is not set.
+    """
+    default = getattr(settings, 'PREFILTER_MAX_PAPERS', 60)
+    try:
+        if settings_data and settings_data.get('maxSources'):
+            return max(1, min(int(settings_data['maxSources']), getattr(settings, 'PREFILTER_MAX_SOURCES', 200)))
+    except (AttributeError, TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid maxSources setting: {e}")
+    return default
+
+def _process_research_session_thread(session_id: str, settings_data=None, resume: bool = False):
+    """
+    Process a research session with parallel paper processing.
+    An error that stops the run is re-raised after the session is marked as error,
+    so the job worker can retry it.
+    
+    Args:
+        session_id: The ID of the session to process
+        settings_data: Optional settings data from the request (maxSources caps the search results processed)
+        resume: Continue an interrupted run instead of starting from scratch
+    """
     try:
         # Close old connections to ensure thread safety
         close_old_connections()
@@ -259,19 +645,13 @@ def _process_research_session_thread(session_id: str, settings_data=None):
         debug_print(f"DEBUG - Session topics: {session.topics}")
         debug_print(f"DEBUG - Session direct URLs: {session.direct_urls}")
         
-        # Check if this is a URL-only search (no topics)
-        is_url_only_search = len(session.topics) == 0 and len(session.direct_urls) > 0
-        debug_print(f"DEBUG - is_url_only_search: {is_url_only_search}")
-        # Initialize LLM
-        llm = LLM()
-
         # Get direct URLs from the session
         direct_urls = session.direct_urls
         
         # Simple check for URL-only mode - no topics but has URLs
         is_url_only_search = len(session.topics) == 0 and len(direct_urls) > 0
+        debug_print(f"DEBUG - is_url_only_search: {is_url_only_search}")
 
-        # Handle URL-only searches more efficiently
         if is_url_only_search:
             debug_print(f"URL-only search detected with {len(direct_urls)} direct URLs, skipping ArXiv search")
             
@@ -281,233 +661,47 @@ def _process_research_session_thread(session_id: str, settings_data=None):
                 'searching',
                 f"Processing {len(direct_urls)} user-provided URLs directly (fast mode)"
             )
-            
-            # Skip ArXiv search completely
-            all_candidate_urls = direct_urls
-            arxiv_urls = []
-            
-            # Still need to generate expanded questions for PDF content extraction
-            expanded_questions, explanation = generate_search_questions(llm, [], session.info_queries)
-            
-            # Create empty search structure for compatibility with later code
-            search_structure = generate_structured_search_terms(llm, [], session.info_queries)
-            
-            # Log monitoring data
-            monitor.log_structured_search_terms(search_structure)
+        
+        # Generate search terms and questions in parallel while direct URLs download
+        bootstrap = _start_session_bootstrap(session, llm, is_url_only_search)
+        search_structure = bootstrap.result('search_structure')
+        expanded_questions, explanation = bootstrap.result('search_questions')
+        query_embedding = bootstrap.result('query_embedding')
+        intent_embedding = bootstrap.result('intent_embedding')
+        
+        monitor.log_structured_search_terms(search_structure)
+        if is_url_only_search:
             monitor.log_arxiv_search([], 0, 0.0)  # No arXiv search in URL-only mode
-            
-            # Generate query embedding for PDF processing
-            query_embedding = get_embedding(" ".join(expanded_questions))
         else:
-            # Original code for searches with topics
-            # Generate structured search terms for better ArXiv results
-            search_structure = generate_structured_search_terms(llm, session.topics, session.info_queries)
-            monitor.log_structured_search_terms(search_structure)
-            
             debug_print(f"Generated search structure with {len(search_structure.get('exact_phrases', []))} exact phrases, "
                 f"{len(search_structure.get('title_terms', []))} title terms, "
                 f"{len(search_structure.get('abstract_terms', []))} abstract terms, and "
                 f"{len(search_structure.get('general_terms', []))} general terms")
-            
-            # Generate expanded questions for embedding creation
-            expanded_questions, explanation = generate_search_questions(llm, session.topics, session.info_queries)
             debug_print(f"Generated expanded questions: {expanded_questions}")
-            
-            # Get query embedding for PDF processing
-            query_embedding = get_embedding(" ".join(expanded_questions))
-            
-            # Handle direct URLs first
-            direct_urls = session.direct_urls
-            
-            # Search ArXiv with structured queries for better results
-            arxiv_search_start = time.time()
-            arxiv_search_result = search_arxiv_with_structured_queries(
-                search_structure,
-                original_topics=session.topics,
-                original_queries=session.info_queries
-            )
-            arxiv_search_duration = time.time() - arxiv_search_start
-            
-            arxiv_urls = arxiv_search_result['urls']
-            arxiv_metadata = arxiv_search_result['metadata']
-            
-            # Monitor arXiv search
-            from .services.search_service import build_arxiv_queries
-            monitor.log_arxiv_search(
-                build_arxiv_queries(search_structure),
-                len(arxiv_urls),
-                arxiv_search_duration
-            )
-            
-            debug_print(f"Found {len(arxiv_urls)} papers from arXiv search using structured queries (including original topics/queries)")
-            
-            # Combine URLs, prioritizing direct URLs
-            all_candidate_urls = direct_urls + [url for url in arxiv_urls if url not in direct_urls]
         
-        if not all_candidate_urls:
-            session.status = 'completed'
-            session.save()
-            debug_print(f"No papers found for session {session_id}, marking as complete")
-            return
-            
-        # Try to get the maxSources setting from the passed settings_data
-        try:
-            max_urls = None
-            if settings_data and 'maxSources' in settings_data:
-                max_urls = int(settings_data['maxSources'])
-            else:
-                # Fallback to environment settings
-                max_urls = getattr(settings, 'MAX_PAPERS', 30)
-        except Exception as e:
-            logger.error(f"Error getting max_urls: {e}")
-            max_urls = 30  # Default fallback
-
-        max_urls = 200
-        debug_print(f"max_urls, {max_urls}")
-        debug_print(f"len(all_candidate_urls), {len(all_candidate_urls)}")
-    
-        # Apply URL limit if specified
-        if len(all_candidate_urls) > max_urls:
-            # Prioritize direct URLs
-            direct_url_count = len(direct_urls)
-            
-            if direct_url_count >= max_urls:
-                # If we have more direct URLs than max_urls, just take the first max_urls
-                selected_urls = direct_urls[:max_urls]
-            else:
-                # Take all direct URLs plus enough arXiv URLs to reach max_urls
-                arxiv_to_include = max_urls - direct_url_count
-                arxiv_selection = [url for url in all_candidate_urls if url not in direct_urls][:arxiv_to_include]
-                selected_urls = direct_urls + arxiv_selection
-            
-            debug_print(f"Limited URLs from {len(all_candidate_urls)} to {len(selected_urls)} based on maxSources setting")
-        else:
-            selected_urls = all_candidate_urls
-            debug_print(f"Using all {len(selected_urls)} candidate URLs")
-
-
-
-
         additional_search_terms = search_structure.get('title_terms', []) + search_structure.get('abstract_terms', [])
-        # Pre-filter papers based on metadata before creating database objects
-        try:
-            from .services.paper_filter_service import filter_paper_urls_with_metadata
-            
-            filter_start_time = time.time()
-            
-            # For URL-only mode, skip pre-filtering
-            if is_url_only_search:
-                debug_print(f"URL-only mode with {len(all_candidate_urls)} URLs - skipping pre-filtering")
-                relevant_urls = all_candidate_urls
-                
-                # Monitor URL-only filtering (no actual filtering)
-                filter_duration = time.time() - filter_start_time
-                monitor.log_pre_filtering(
-                    len(all_candidate_urls),
-                    len(all_candidate_urls),
-                    0,
-                    filter_duration
-                )
-            else:
-                # Regular pre-filtering for topic searches or many URLs with metadata
-                filter_result = filter_paper_urls_with_metadata(
-                    all_candidate_urls, 
-                    arxiv_metadata,  # Pass existing metadata to eliminate duplicate API calls
-                    session.topics,
-                    expanded_questions,
-                    explanation,
-                    additional_search_terms,
-                    direct_urls  # Pass direct URLs for prioritization
-                )
-                
-                filter_duration = time.time() - filter_start_time
-                debug_print(f"Pre-filtering results: {filter_result}")
-                
-                # Update with filter results
-                if filter_result.get('success'):
-                    debug_print(f"Pre-filtering completed: {filter_result.get('papers_relevant', 0)} relevant, "
-                        f"{filter_result.get('papers_filtered', 0)} filtered out")
-                    
-                    # Monitor pre-filtering results
-                    monitor.log_pre_filtering(
-                        filter_result.get('papers_processed', len(all_candidate_urls)),
-                        filter_result.get('papers_relevant', 0),
-                        filter_result.get('papers_filtered', 0),
-                        filter_duration
-                    )
-                    
-                    # Send pre-filtering stats via WebSocket
-                    send_status_update(
-                        str(session.id),
-                        'processing',
-                        f"Pre-filtered papers: {filter_result.get('papers_relevant', 0)} relevant, "
-                        f"{filter_result.get('papers_filtered', 0)} filtered out"
-                    )
-                    
-                    # Get the list of relevant URLs only
-                    relevant_urls = filter_result.get('relevant_urls', all_candidate_urls)
-                else:
-                    logger.warning(f"Pre-filtering failed: {filter_result.get('message', 'Unknown error')}")
-                    debug_print(f"Pre-filtering failed: {filter_result.get('message', 'Unknown error')}")
-                    # Use all selected URLs if filtering failed
-                    relevant_urls = all_candidate_urls
-        except Exception as e:
-            logger.error(f"Error during pre-filtering: {e}")
-            debug_print(f"Error during pre-filtering: {e}")
-            # Continue with all selected URLs if pre-filtering fails
-            relevant_urls = all_candidate_urls
+        search_terms = session.topics + additional_search_terms
         
-        # Create Paper objects only for relevant URLs
-        papers = []
-        with transaction.atomic():
-            for url in relevant_urls:
-                paper = Paper.objects.create(
-                    session=session,
-                    url=url,
-                    status="pending"
-                )
-                papers.append(paper)
-        
-        # Update session status
-        session.status = 'processing'
-        session.save()
-        debug_print(f"Created {len(papers)} paper objects from relevant URLs, proceeding to processing")
-        
-        # Get maximum number of workers from settings
-        # Reduced to 1 to prevent arXiv rate limiting
-        max_workers = 4  # Changed from getattr(settings, 'MAX_WORKERS', 6)
-        debug_print(f"Using {max_workers} workers for parallel paper processing")
-        
-        # Process papers with the thread pool
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Get all pending papers (already pre-filtered)
-            pending_papers = Paper.objects.filter(
-                session_id=session.id,
-                status='pending'
-            )
-            
-            debug_print(f"Processing {pending_papers.count()} papers")
-            search_terms = session.topics + additional_search_terms
-            # Submit all pending papers to the thread pool
-            future_to_paper = {
-                executor.submit(
-                    _process_paper_thread_safe,
-                    str(paper.id),
-                    search_terms,
-                    query_embedding,
-                    session.info_queries,
-                    explanation
-                ): paper for paper in pending_papers
-            }
-            
-            # Process results as they complete
-            for future in concurrent.futures.as_completed(future_to_paper):
-                paper = future_to_paper[future]
-                try:
-                    result = future.result()
-                    # Handle result, e.g., send update via WebSocket
-                except Exception as e:
-                    logger.error(f"Error processing paper: {e}")
+        _run_streaming_pipeline(
+            session,
+            monitor,
+            direct_urls,
+            search_structure,
+            expanded_questions,
+            explanation,
+            additional_search_terms,
+            process_args=(search_terms, query_embedding, session.info_queries, explanation, intent_embedding),
+            search_arxiv=not is_url_only_search,
+            existing_papers=_resume_session_papers(session) if resume else None,
+            max_papers=_max_search_papers(settings_data)
+        )
+        monitor.log_bootstrap_stages(bootstrap.timings)
+        monitor.log_pipeline_stages(all_stage_stats())
+        monitor.log_cache_stats({
+            'llm_response': llm_cache_stats(),
+            'search_plan': search_plan_cache_stats(),
+            'document_store': document_store_stats()
+        })
         
         # After all papers have been processed, check the final status and update session
         # This is now done in the main thread, avoiding race conditions
@@ -557,6 +751,8 @@ def _process_research_session_thread(session_id: str, settings_data=None):
             debug_print(f"Session {session_id} marked as error due to exception")
         except:
             logger.error(f"Failed to update session {session_id} status after error")
+        # Let the job worker retry the session (up to the job's max_attempts)
+        raise
     finally:
         # Always finalize monitoring to generate the report (development only)
         finalize_monitoring()
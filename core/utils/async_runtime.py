@@ -0,0 +1,71 @@
+"""
+Background event loop shared by synchronous code that needs to run coroutines.
+One long-lived loop runs in a daemon thread; worker threads submit coroutines to
+it instead of creating and tearing down an event loop per call with asyncio.run.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _stop_loop() -> None:
+    """Stop the background loop at interpreter exit."""
+    if _loop is not None and _loop.is_running():
+        _loop.call_soon_threadsafe(_loop.stop)
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background event loop, starting it on first use."""
+    global _loop, _thread
+    if _loop is None or _thread is None or not _thread.is_alive():
+        with _lock:
+            if _loop is None or _thread is None or not _thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run_forever():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                thread = threading.Thread(target=run_forever, name='async-runtime', daemon=True)
+                thread.start()
+                ready.wait()
+                _loop, _thread = loop, thread
+                atexit.register(_stop_loop)
+                logger.info("Started background event loop")
+    return _loop
+
+
+def run_sync(coro: Coroutine, timeout: float = None) -> Any:
+    """
+    Run a coroutine on the background loop and block until it finishes.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Maximum seconds to wait (the coroutine is cancelled on timeout)
+
+    Returns:
+        The coroutine's result (its exception is re-raised)
+    """
+    loop = get_background_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the background loop itself; await the coroutine instead")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
@@ -0,0 +1,82 @@
+"""
+Thread-safe token-bucket rate limiters shared across the whole process.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` acquisitions per second with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last update. Caller must hold the lock."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Block until tokens are available and take them.
+
+        Args:
+            tokens: Number of tokens to take
+            timeout: Maximum seconds to wait (None = wait indefinitely)
+
+        Returns:
+            True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: float = 1.0) -> TokenBucket:
+    """
+    Return the process-wide limiter registered under name, creating it on first use.
+
+    Args:
+        name: Limiter name, e.g. "arxiv"
+        rate: Allowed acquisitions per second (used on creation only)
+        capacity: Burst size (used on creation only)
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = TokenBucket(rate, capacity)
+                _limiters[name] = limiter
+                logger.info(f"Created rate limiter '{name}' ({rate}/s, burst {capacity})")
+    return limiter
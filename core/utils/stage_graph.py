@@ -0,0 +1,120 @@
+"""
+Small dependency-graph executor for running independent stages concurrently.
+Each stage starts as soon as all of its dependencies have finished and receives
+their results as positional arguments; every stage logs its start offset and duration.
+"""
+
+import concurrent.futures
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StageFailedError(Exception):
+    """Raised for a stage that was skipped because one of its dependencies failed."""
+
+
+class StageGraph:
+    """
+    A set of named stages with dependencies, run on a thread pool.
+
+    Example:
+        graph = StageGraph("bootstrap")
+        graph.add("questions", generate_questions)
+        graph.add("embedding", embed, deps=["questions"])
+        graph.start()
+        embedding = graph.result("embedding")
+    """
+
+    def __init__(self, name: str = "stages"):
+        self.name = name
+        self._stages: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+        self._futures: Dict[str, concurrent.futures.Future] = {}
+        self._start = None
+        # Stage name -> (seconds after start() was called, duration in seconds)
+        self.timings: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, name: str, fn: Callable, deps: Iterable[str] = ()) -> None:
+        """
+        Add a stage.
+
+        Args:
+            name: Unique stage name
+            fn: Callable receiving the results of deps, in order
+            deps: Names of stages that must finish first (they must already be added)
+        """
+        if self._start is not None:
+            raise RuntimeError("Cannot add stages after the graph has started")
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' already exists")
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, deps)
+
+    def _run_stage(self, name: str) -> Any:
+        fn, deps = self._stages[name]
+        args = []
+        for dep in deps:
+            try:
+                args.append(self._futures[dep].result())
+            except Exception as e:
+                raise StageFailedError(f"Stage '{name}' skipped because '{dep}' failed: {e}") from e
+
+        stage_start = time.monotonic()
+        status = "failed"
+        try:
+            result = fn(*args)
+            status = "ok"
+            return result
+        finally:
+            offset, duration = stage_start - self._start, time.monotonic() - stage_start
+            self.timings[name] = (offset, duration)
+            logger.info(f"{self.name} stage '{name}': started +{offset:.2f}s, took {duration:.2f}s ({status})")
+
+    def start(self, max_workers: int = None) -> None:
+        """
+        Start every stage in the background; each runs once its dependencies have succeeded.
+
+        Args:
+            max_workers: Thread pool size (default: one thread per stage)
+        """
+        self._start = time.monotonic()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers or max(1, len(self._stages)),
+            thread_name_prefix=self.name
+        )
+        # Stages are submitted in insertion order, so dependencies are always picked up first
+        for name in self._stages:
+            self._futures[name] = executor.submit(self._run_stage, name)
+        # Worker threads exit once the queued stages are done
+        executor.shutdown(wait=False)
+
+    def result(self, name: str, timeout: float = None) -> Any:
+        """
+        Wait for a stage and return its result.
+
+        Raises:
+            The stage's own exception, or StageFailedError if a dependency failed
+        """
+        return self._futures[name].result(timeout=timeout)
+
+    def wait(self) -> Dict[str, Any]:
+        """
+        Wait for every stage.
+
+        Returns:
+            Dictionary of stage name -> result for the stages that succeeded
+        """
+        concurrent.futures.wait(self._futures.values())
+        results = {
+            name: future.result()
+            for name, future in self._futures.items()
+            if future.exception() is None
+        }
+        logger.info(f"{self.name}: {len(results)}/{len(self._futures)} stages succeeded "
+                    f"in {time.monotonic() - self._start:.2f}s")
+        return results
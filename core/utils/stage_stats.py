@@ -0,0 +1,91 @@
+"""
+Process-wide utilization counters for the stages of paper processing.
+Each stage records how many items it handled, how long they took and how many are
+in flight, so a snapshot shows where papers spend their time and which stage's
+executor is saturated (concurrency close to capacity) or idle.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class StageStats:
+    """Counters of one pipeline stage."""
+
+    def __init__(self, name: str, capacity: int = None):
+        self.name = name
+        self.capacity = capacity  # Workers dedicated to the stage, if it has its own executor
+        self.items = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+        self._first_start: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        """Count the enclosed block as one item of work in this stage."""
+        start = time.monotonic()
+        with self._lock:
+            if self._first_start is None:
+                self._first_start = start
+            self.in_flight += 1
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.items += 1
+                self.errors += failed
+                self.busy_seconds += time.monotonic() - start
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current counters of the stage.
+
+        Returns:
+            Dictionary with items, errors, in_flight, busy_seconds, mean_seconds,
+            concurrency (average items in progress since first use), capacity and
+            utilization (concurrency / capacity, None without a dedicated executor)
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._first_start if self._first_start is not None else 0.0
+            concurrency = self.busy_seconds / elapsed if elapsed > 0 else 0.0
+            return {
+                'items': self.items,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'mean_seconds': round(self.busy_seconds / self.items, 3) if self.items else 0.0,
+                'concurrency': round(concurrency, 2),
+                'capacity': self.capacity,
+                'utilization': round(concurrency / self.capacity, 3) if self.capacity else None
+            }
+
+
+_stages: Dict[str, StageStats] = {}
+_stages_lock = threading.Lock()
+
+
+def stage_stats(name: str, capacity: int = None) -> StageStats:
+    """Return the process-wide counters of a stage, creating them on first use."""
+    stats = _stages.get(name)
+    if stats is None:
+        with _stages_lock:
+            stats = _stages.setdefault(name, StageStats(name, capacity))
+    if capacity and not stats.capacity:
+        stats.capacity = capacity
+    return stats
+
+
+def all_stage_stats() -> Dict[str, Dict[str, Any]]:
+    """Return a snapshot of every stage, by name."""
+    with _stages_lock:
+        stages = list(_stages.values())
+    return {stats.name: stats.snapshot() for stats in stages}
@@ -17,6 +17,7 @@ from django.http import JsonResponse
 from django.views import View
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.db.models import Count
 from .models import ResearchSession, Paper, Note, Project, Section, Group
 from .serializers import (
     ResearchRequestSerializer, 
@@ -181,23 +182,26 @@ class SessionStatusView(APIView):
             "totalPapers": 5,
             "completedPapers": 3,
             "progress": 0.6,
-            "isComplete": false
+            "isComplete": false,
+            "queuedPapers": 1,
+            "processingPapers": 1
         }
         """
         session = get_object_or_404(ResearchSession, id=session_id)
         
-        # Count papers and completed papers
-        total_papers = session.papers.count()
-        completed_papers = session.papers.filter(
-            status__in=['success', 'no_relevant_info', 'error']
-        ).count()
+        # Count papers by status (queue depth holds across all worker processes)
+        counts = dict(session.papers.order_by().values_list('status').annotate(count=Count('id')))
+        total_papers = sum(counts.values())
+        completed_papers = sum(counts.get(status, 0) for status in ['success', 'no_relevant_info', 'error'])
         
         return Response({
             'status': session.status,
             'totalPapers': total_papers,
             'completedPapers': completed_papers,
             'progress': completed_papers / total_papers if total_papers > 0 else 0,
-            'isComplete': session.status == 'completed'
+            'isComplete': session.status == 'completed',
+            'queuedPapers': counts.get('pending', 0),
+            'processingPapers': counts.get('processing', 0)
         })
 
 class WebSocketTestView(APIView):
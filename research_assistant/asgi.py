@@ -35,4 +35,13 @@ except Exception as e:
     
     # Create HTTP-only ASGI application
     application = get_asgi_application()
-    print("🔌 ASGI DEBUG - Using direct Django ASGI application")
\ No newline at end of file
+    print("🔌 ASGI DEBUG - Using direct Django ASGI application")
+
+# Pick up research sessions queued or interrupted before this process started
+# (only when sessions run inside the web process, see RESEARCH_WORKER_EMBEDDED)
+from django.conf import settings
+
+if getattr(settings, 'RESEARCH_WORKER_EMBEDDED', True):
+    from core.services.job_queue_service import start_embedded_worker
+    from core.tasks import run_research_job
+    start_embedded_worker(run_research_job)
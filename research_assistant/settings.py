@@ -390,6 +390,64 @@ IP_BLOCKLIST = []
 SMALL_DOC_PAGE_THRESHOLD = 8  # Documents with 8 or fewer pages use the simple path
 RELEVANCE_THRESHOLD = 0.18  # Cosine similarity threshold for identifying relevant pages
 MAX_WORKERS = 4  # Maximum number of parallel workers
+PAPER_POOL_WORKERS = int(os.environ.get('PAPER_POOL_WORKERS', 8))  # Paper processing threads per process, shared fairly by all sessions
+PAPER_RUNNER = os.environ.get('PAPER_RUNNER', 'async')  # 'async': papers run as coroutines on one event loop; 'threads': PAPER_POOL_WORKERS threads
+ASYNC_PAPERS_IN_FLIGHT = int(os.environ.get('ASYNC_PAPERS_IN_FLIGHT', 100))  # Papers processed concurrently per process by the async runner
+MONITOR_POOL_SAMPLE_INTERVAL = 10  # Seconds between samples of the paper pool's per-session queue depths in the session monitor
+RESEARCH_WORKER_EMBEDDED = os.environ.get('RESEARCH_WORKER_EMBEDDED', 'True') == 'True'  # Run queued sessions inside the web process; set False when running `manage.py run_research_worker`
+RESEARCH_WORKER_CONCURRENCY = int(os.environ.get('RESEARCH_WORKER_CONCURRENCY', 2))  # Sessions processed at the same time per worker process
+RESEARCH_WORKER_POLL_INTERVAL = 2.0  # Seconds between polls of an empty job queue
+RESEARCH_JOB_LEASE_SECONDS = 120  # A running job is recovered when its worker misses heartbeats for this long
+RESEARCH_JOB_MAX_ATTEMPTS = 3  # Runs of an interrupted session before it is marked as error
+RESEARCH_JOB_RETRY_DELAY = 10  # Seconds of backoff per attempt before an interrupted session is resumed
+SESSION_TIME_BUDGET = int(os.environ.get('SESSION_TIME_BUDGET', 0))  # Seconds of paper processing per session; papers predicted not to fit are dropped (0 = no limit)
+PREFILTER_LEXICAL_THRESHOLD = 0.5  # Without embeddings, keep papers containing at least this fraction of one topic's, question's or search term's words
+PREFILTER_MAX_PAPERS = 60  # Search results kept per session after pre-filtering (direct URLs are not counted)
+PREFILTER_MAX_SOURCES = 200  # Upper bound for a request's maxSources setting, which overrides PREFILTER_MAX_PAPERS
+PIPELINE_QUEUE_SIZE = 8  # Items buffered between streaming session stages (search -> pre-filter -> paper workers)
+CHUNK_EXTRACTION_CONCURRENCY = 4  # Concurrent chunk extraction LLM calls per paper (advanced path)
+CHUNK_EXTRACTION_GLOBAL_CONCURRENCY = 16  # Concurrent chunk extraction LLM calls across all papers
+ARXIV_SEARCH_CONCURRENCY = 4  # arXiv search queries issued concurrently per session
+ARXIV_REQUESTS_PER_SECOND = 1 / 3  # arXiv API policy: one request every three seconds (process-wide)
+ARXIV_REQUEST_BURST = 1
+ARXIV_ID_BATCH_SIZE = 100  # arXiv IDs per id_list metadata request
+ARXIV_METADATA_CACHE_SIZE = 5000  # Papers kept in the in-process arXiv metadata cache
+ARXIV_METADATA_CACHE_TTL = 24 * 60 * 60  # Seconds cached paper metadata stays valid
+ARXIV_QUERY_CACHE_ENABLED = os.environ.get('ARXIV_QUERY_CACHE_ENABLED', 'True') == 'True'
+ARXIV_QUERY_CACHE_TTL = 24 * 60 * 60  # Seconds a cached arXiv search result list stays valid
+ARXIV_SEARCH_BACKEND = os.environ.get('ARXIV_SEARCH_BACKEND', 'api')  # 'api', 'local' or 'local_first' (local index, then API)
+ARXIV_INDEX_PATH = os.environ.get('ARXIV_INDEX_PATH', str(BASE_DIR / 'arxiv_index.sqlite3'))  # Built with `manage.py load_arxiv_index`
+
+# PDF cache - downloaded PDFs are reused across sessions
+PDF_CACHE_ENABLED = os.environ.get('PDF_CACHE_ENABLED', 'True') == 'True'
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', str(BASE_DIR / 'pdf_cache'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))  # 2 GB
+PDF_CACHE_REVALIDATE_AFTER = 24 * 60 * 60  # Seconds before a cached PDF is revalidated (ETag / Last-Modified)
+PDF_IN_MEMORY_MAX_BYTES = 16 * 1024 * 1024  # PDFs up to this size are parsed from memory, larger ones are memory-mapped
+PDF_PREFETCH_MAX_PAPERS = 8  # Prefetched PDFs held at once: direct URLs while search terms are generated, then upcoming papers
+PDF_PREFETCH_AHEAD = 4  # Upcoming papers per session whose PDFs are prefetched while earlier papers are processed
+PDF_LOAD_WORKERS = int(os.environ.get('PDF_LOAD_WORKERS', 4))  # Threads of the download/parse stage that prefetches upcoming papers
+PDF_PARSE_PROCESSES = int(os.environ.get('PDF_PARSE_PROCESSES', 2))  # Worker processes for PyMuPDF page extraction (0 = parse in the paper thread)
+
+# Document store - a paper's page text, metadata and page embeddings are computed once and shared by all sessions
+DOCUMENT_STORE_ENABLED = os.environ.get('DOCUMENT_STORE_ENABLED', 'True') == 'True'
+
+# Embedding cache - embeddings are reused across sessions
+EMBEDDING_CACHE_ENABLED = os.environ.get('EMBEDDING_CACHE_ENABLED', 'True') == 'True'
+EMBEDDING_CACHE_DTYPE = os.environ.get('EMBEDDING_CACHE_DTYPE', 'float16')  # 'float16' or 'int8' (per-vector scale)
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get('EMBEDDING_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 256 MB of vector data
+
+# LLM response cache - opt-in, identical prompts reuse earlier responses
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'False') == 'True'
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 60 * 60))  # Seconds before a cached response expires (0 = never)
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000))
+
+# Search plan cache - sessions with near-identical topics and queries reuse the generated search terms and questions
+SEARCH_PLAN_CACHE_ENABLED = os.environ.get('SEARCH_PLAN_CACHE_ENABLED', 'True') == 'True'
+SEARCH_PLAN_CACHE_SIMILARITY = float(os.environ.get('SEARCH_PLAN_CACHE_SIMILARITY', 0.95))  # Minimum cosine similarity of the plan embeddings
+SEARCH_PLAN_CACHE_TTL = int(os.environ.get('SEARCH_PLAN_CACHE_TTL', 30 * 24 * 60 * 60))  # Seconds before a cached plan expires (0 = never)
+SEARCH_PLAN_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_PLAN_CACHE_MAX_ENTRIES', 5000))
+SEARCH_PLAN_CACHE_REFRESH = 300  # Seconds between reloads of the in-memory similarity index
 
 # ASGI Application
 ASGI_APPLICATION = 'research_assistant.asgi.application'